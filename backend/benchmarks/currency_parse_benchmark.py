@@ -0,0 +1,113 @@
+"""
+Microbenchmark da conversão de valores monetários ("R$ 1.234,56", "$ 12,00", "#DIV/0!"):
+caminho antigo (clean_value + is_dollar_value + to_float por célula, com o regex recompilado
+a cada chamada), parse_currency célula a célula e gravado em arrays numpy, e uma versão
+coluna a coluna com pandas (Series.str), em colunas de 4, 31 e 365 linhas.
+
+Uso: python benchmarks/currency_parse_benchmark.py [repetições]
+"""
+
+import os
+import re
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from currency import ERROR_VALUES, parse_currency
+
+
+def legacy_clean_value(val):
+    if val in [None, '', '#DIV/0!', '#N/A', '#VALUE!', '#REF!', '#NAME?']:
+        return '0,00'
+    return val
+
+
+def legacy_is_dollar_value(value_str):
+    value_str = str(value_str).strip()
+    return '$' in value_str and 'R$' not in value_str
+
+
+def legacy_to_float(val):
+    if not val:
+        return 0.0
+    val = str(val)
+    match = re.search(r'-?\d+[\d.,]*', val.replace('R$', '').replace(' ', ''))
+    if not match:
+        return 0.0
+    num = match.group(0).replace('.', '').replace(',', '.')
+    try:
+        return float(num)
+    except Exception:
+        return 0.0
+
+
+def legacy_column(values):
+    cleaned = [legacy_clean_value(v) for v in values]
+    return [legacy_to_float(v) for v in cleaned], [legacy_is_dollar_value(v) for v in cleaned]
+
+
+def numpy_column(values):
+    """parse_currency por célula, gravando em (valores float64, máscara de dólar)."""
+    values = list(values)
+    amounts = np.zeros(len(values), dtype=np.float64)
+    dollar_mask = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        amounts[i], dollar_mask[i] = parse_currency(value)
+    return amounts, dollar_mask
+
+
+def pandas_column(values):
+    series = pd.Series(values, dtype=object)
+    text = series.where(~(series.isna() | series.isin(ERROR_VALUES)), '0,00').astype(str).str.strip()
+    dollar_mask = (text.str.contains('$', regex=False) & ~text.str.contains('R$', regex=False)).to_numpy()
+    number = (text.str.replace('R$', '', regex=False)
+                  .str.replace(' ', '', regex=False)
+                  .str.extract(r'(-?\d+[\d.,]*)', expand=False)
+                  .str.replace('.', '', regex=False)
+                  .str.replace(',', '.', regex=False))
+    return pd.to_numeric(number, errors='coerce').fillna(0.0).to_numpy(dtype=np.float64), dollar_mask
+
+
+def build_column(rows: int):
+    """Mistura típica de uma aba: reais, dólares, zeros e erros de fórmula."""
+    column = []
+    for i in range(rows):
+        if i % 10 == 3:
+            column.append('#DIV/0!')
+        elif i % 10 == 7:
+            column.append('R$ 0,00')
+        elif i % 2:
+            column.append(f"$ {i * 7.31:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
+        else:
+            column.append(f"R$ {-i * 13.7:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
+    return column
+
+
+def run(rows: int, repeat: int) -> None:
+    column = build_column(rows)
+
+    expected_values, expected_mask = legacy_column(column)
+    for parse in (numpy_column, pandas_column):
+        values, mask = parse(column)
+        assert np.array_equal(values, np.array(expected_values)) and np.array_equal(mask, np.array(expected_mask))
+
+    legacy = timeit.timeit(lambda: legacy_column(column), number=repeat)
+    cells = timeit.timeit(lambda: [parse_currency(v) for v in column], number=repeat)
+    numpy = timeit.timeit(lambda: numpy_column(column), number=repeat)
+    pandas = timeit.timeit(lambda: pandas_column(column), number=repeat)
+
+    print(f"{rows:>4} linhas | antigo: {legacy / repeat * 1e6:8.1f} µs | "
+          f"parse_currency: {cells / repeat * 1e6:8.1f} µs ({legacy / cells:4.1f}x) | "
+          f"numpy: {numpy / repeat * 1e6:8.1f} µs | "
+          f"pandas: {pandas / repeat * 1e6:8.1f} µs ({legacy / pandas:4.2f}x)")
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for rows in (4, 31, 365):
+        run(rows, repeat)
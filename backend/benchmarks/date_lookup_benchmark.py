@@ -0,0 +1,87 @@
+"""
+Microbenchmark da busca da linha do dia em uma aba: busca antiga (varredura de trás para
+frente com até seis strptime por linha) contra o DateIndex, em abas de 31 e 365 linhas.
+
+Uso: python benchmarks/date_lookup_benchmark.py [repetições]
+"""
+
+import os
+import re
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from date_index import DateIndex
+
+FORMATS = ["%d/%m", "%d/%m/%Y", "%d/%m/%y", "%d-%m", "%d-%m-%Y", "%d-%m-%y"]
+
+
+def legacy_find_current_record(records, current_date):
+    """Busca usada em run_batch_processing/process_all_sheets antes do DateIndex."""
+    for r in reversed(records):
+        data_val = r.get('Data')
+        if not data_val:
+            continue
+        data_val_str = str(data_val).strip()
+        matched = False
+        if data_val_str == current_date:
+            matched = True
+        else:
+            for fmt in FORMATS:
+                try:
+                    dt_val = datetime.strptime(re.sub(r'\s+', '', data_val_str), fmt)
+                    dt_target = datetime.strptime(current_date, "%d/%m")
+                    if dt_val.day == dt_target.day and dt_val.month == dt_target.month:
+                        matched = True
+                        break
+                except Exception:
+                    continue
+            if not matched:
+                try:
+                    parts = re.split(r'[/-]', data_val_str)
+                    if len(parts) >= 2:
+                        d, m = int(parts[0]), int(parts[1])
+                        dt_target = datetime.strptime(current_date, "%d/%m")
+                        if d == dt_target.day and m == dt_target.month:
+                            matched = True
+                except Exception:
+                    pass
+        if matched:
+            return r
+    return None
+
+
+def build_tab(rows: int, start: date):
+    """Aba com uma linha por dia no formato DD/MM/AAAA (o mais comum nas planilhas)."""
+    return [
+        {'Data': (start + timedelta(days=i)).strftime('%d/%m/%Y'), 'Investimento': 'R$ 1.234,56', 'MC Geral': 'R$ 10,00'}
+        for i in range(rows)
+    ]
+
+
+def run(rows: int, repeat: int) -> None:
+    start = date(2025, 1, 1) if rows > 31 else date(2025, 10, 1)
+    records = build_tab(rows, start)
+    # Data alvo no meio da aba: a busca antiga percorre metade das linhas.
+    target_day = start + timedelta(days=rows // 2)
+    current_date = f"{target_day.day:02d}/{target_day.month:02d}"
+
+    assert legacy_find_current_record(records, current_date) is DateIndex(records).find(current_date)
+
+    legacy = timeit.timeit(lambda: legacy_find_current_record(records, current_date), number=repeat)
+    indexed = timeit.timeit(lambda: DateIndex(records).find(current_date), number=repeat)
+    index = DateIndex(records)
+    lookup = timeit.timeit(lambda: index.find(current_date), number=repeat)
+
+    print(f"{rows:>4} linhas | antiga: {legacy / repeat * 1e6:9.1f} µs | "
+          f"índice (montagem + busca): {indexed / repeat * 1e6:7.1f} µs ({legacy / indexed:5.1f}x) | "
+          f"busca em índice pronto: {lookup / repeat * 1e6:5.2f} µs")
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for rows in (31, 365):
+        run(rows, repeat)
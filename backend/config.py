@@ -9,6 +9,10 @@ SLACK_CHANNEL = os.getenv('SLACK_CHANNEL')
 
 # Google Sheets Configuration
 GOOGLE_SHEETS_URL = os.getenv('GOOGLE_SHEETS_URL')
+GOOGLE_CREDS_PATH = os.getenv('GOOGLE_CREDS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'google_service_account.json'))
+GOOGLE_API_TIMEOUT = float(os.getenv('GOOGLE_API_TIMEOUT', 60))
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv('GOOGLE_HTTP_POOL_SIZE', 10))
+GOOGLE_DRIVE_FILES_URL = os.getenv('GOOGLE_DRIVE_FILES_URL', 'https://www.googleapis.com/drive/v3/files')
 
 # File paths
 PROCESSED_DATA_FILE = 'data/processed_records.json'
@@ -18,3 +22,105 @@ LOG_FILE = 'logs/excel_to_slack.log'
 API_HOST = os.getenv('API_HOST', '0.0.0.0')
 API_PORT = int(os.getenv('API_PORT', 5000))
 API_DEBUG = os.getenv('API_DEBUG', 'false').lower() == 'true' 
+# Threads do waitress: cada stream SSE aberto ocupa uma thread enquanto o dashboard estiver aberto.
+API_THREADS = int(os.getenv('API_THREADS', 32))
+
+# Batch Processing Configuration
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 4))
+SITE_TIMEOUT_SECONDS = float(os.getenv('SITE_TIMEOUT_SECONDS', 180))
+
+# Google Sheets Read Configuration
+SHEETS_WINDOWED_READS = os.getenv('SHEETS_WINDOWED_READS', 'true').lower() == 'true'
+SHEETS_ROW_WINDOW = int(os.getenv('SHEETS_ROW_WINDOW', 40))
+SHEETS_ROW_MARGIN = int(os.getenv('SHEETS_ROW_MARGIN', 10))
+# O modifiedTime do Drive revalida os metadados quando o TTL vence. Com true, a revisão é
+# consultada em toda execução (uma chamada ao Drive por site) e abas renomeadas aparecem antes do TTL.
+SHEETS_REVISION_CHECK = os.getenv('SHEETS_REVISION_CHECK', 'false').lower() == 'true'
+
+# Google Sheets Rate Limit Configuration
+# Cota de leitura por usuário é de 60/min; 50/min + burst de 10 nunca passa de 60 em uma janela de um minuto.
+SHEETS_RATE_LIMIT_PER_MINUTE = float(os.getenv('SHEETS_RATE_LIMIT_PER_MINUTE', 50))
+SHEETS_RATE_BURST = int(os.getenv('SHEETS_RATE_BURST', 10))
+SHEETS_RATE_MAX_WAIT = float(os.getenv('SHEETS_RATE_MAX_WAIT', 120))
+
+# Local Storage Configuration
+LOCAL_DB_FILE = os.getenv('LOCAL_DB_FILE', 'data/carga_slack.sqlite3')
+SHEETS_METADATA_TTL = float(os.getenv('SHEETS_METADATA_TTL', 6 * 3600))
+PROCESSED_RETENTION_DAYS = int(os.getenv('PROCESSED_RETENTION_DAYS', 90))
+
+# Slack Dispatcher Configuration
+SLACK_TIMEOUT = float(os.getenv('SLACK_TIMEOUT', 10))
+SLACK_MAX_RETRIES = int(os.getenv('SLACK_MAX_RETRIES', 5))
+SLACK_MAX_RETRY_AFTER = float(os.getenv('SLACK_MAX_RETRY_AFTER', 60))
+
+# Slack Outbox Configuration
+OUTBOX_BASE_DELAY = float(os.getenv('OUTBOX_BASE_DELAY', 30))
+OUTBOX_MAX_DELAY = float(os.getenv('OUTBOX_MAX_DELAY', 1800))
+OUTBOX_MAX_AGE = float(os.getenv('OUTBOX_MAX_AGE', 24 * 3600))
+OUTBOX_CLAIM_TIMEOUT = float(os.getenv('OUTBOX_CLAIM_TIMEOUT', 300))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 15))
+OUTBOX_RETENTION = float(os.getenv('OUTBOX_RETENTION', 7 * 24 * 3600))
+OUTBOX_FLUSH_TIMEOUT = float(os.getenv('OUTBOX_FLUSH_TIMEOUT', 120))
+
+# MC Alert Configuration
+ALERT_CHANNEL_NAME = os.getenv('ALERT_CHANNEL_NAME', 'Alert')
+MC_ALERT_THRESHOLD = float(os.getenv('MC_ALERT_THRESHOLD', -100))
+ALERT_ROUTING_TTL = float(os.getenv('ALERT_ROUTING_TTL', 300))
+
+# Activity Log Writer Configuration
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 2))
+ACTIVITY_BATCH_SIZE = int(os.getenv('ACTIVITY_BATCH_SIZE', 200))
+ACTIVITY_MAX_BUFFER = int(os.getenv('ACTIVITY_MAX_BUFFER', 5000))
+
+# Dashboard Configuration
+DASHBOARD_TOP_N = int(os.getenv('DASHBOARD_TOP_N', 3))
+DASHBOARD_SUMMARY_TTL = float(os.getenv('DASHBOARD_SUMMARY_TTL', 600))
+
+# Change Detection Configuration
+CHANGE_DETECTION_ENABLED = os.getenv('CHANGE_DETECTION_ENABLED', 'true').lower() == 'true'
+# Horários (HH:MM, separados por vírgula) em que o resumo do squad é enviado mesmo sem alterações.
+SUMMARY_ALWAYS_POST_SLOTS = [slot.strip() for slot in os.getenv('SUMMARY_ALWAYS_POST_SLOTS', '').split(',') if slot.strip()]
+
+# Circuit Breaker Configuration
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3))
+CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', 6 * 3600))
+CIRCUIT_PROBE_TIMEOUT = float(os.getenv('CIRCUIT_PROBE_TIMEOUT', 900))
+
+# Scheduler Configuration
+SCHEDULER_TIMEZONE = os.getenv('SCHEDULER_TIMEZONE', 'America/Sao_Paulo')
+# Usados apenas quando a tabela schedule_slots não pode ser lida.
+SCHEDULER_DEFAULT_SLOTS = [slot.strip() for slot in os.getenv(
+    'SCHEDULER_DEFAULT_SLOTS', '00:10,03:10,06:10,09:10,12:10,15:10,18:10,21:10').split(',') if slot.strip()]
+SCHEDULER_CATCHUP_WINDOW = float(os.getenv('SCHEDULER_CATCHUP_WINDOW', 6 * 3600))
+SCHEDULER_REFRESH_INTERVAL = float(os.getenv('SCHEDULER_REFRESH_INTERVAL', 300))
+
+# Work Queue Configuration
+# 'local': o agendador processa todos os sites em threads; 'queue': um job por site na tabela
+# batch_jobs, executados pelo agendador e por quantos workers (--worker) estiverem rodando.
+BATCH_MODE = os.getenv('BATCH_MODE', 'local')
+QUEUE_WORKER_THREADS = int(os.getenv('QUEUE_WORKER_THREADS', 4))
+QUEUE_POLL_INTERVAL = float(os.getenv('QUEUE_POLL_INTERVAL', 2))
+QUEUE_CLAIM_TIMEOUT = float(os.getenv('QUEUE_CLAIM_TIMEOUT', SITE_TIMEOUT_SECONDS + 60))
+QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', 2))
+QUEUE_RUN_TIMEOUT = float(os.getenv('QUEUE_RUN_TIMEOUT', 1800))
+QUEUE_RETENTION_DAYS = int(os.getenv('QUEUE_RETENTION_DAYS', 7))
+
+# Manual Processing Configuration
+PROCESS_JOB_HISTORY = int(os.getenv('PROCESS_JOB_HISTORY', 20))
+
+# Live Feed (SSE) Configuration
+LIVE_FEED_INTERVAL = float(os.getenv('LIVE_FEED_INTERVAL', 3))
+LIVE_FEED_BATCH_SIZE = int(os.getenv('LIVE_FEED_BATCH_SIZE', 500))
+LIVE_FEED_BUFFER = int(os.getenv('LIVE_FEED_BUFFER', 2000))
+LIVE_FEED_HEARTBEAT = float(os.getenv('LIVE_FEED_HEARTBEAT', 15))
+# Streams simultâneos; acima disso a API responde 503. Precisa ficar abaixo de API_THREADS
+# para sobrar threads para as demais requisições.
+LIVE_FEED_MAX_STREAMS = int(os.getenv('LIVE_FEED_MAX_STREAMS', 16))
+# Quanto tempo um id faltante (transação ainda não confirmada) segura a leitura incremental.
+LIVE_FEED_GAP_GRACE = float(os.getenv('LIVE_FEED_GAP_GRACE', 30))
+# Validade do ticket de uso único que abre o stream (o EventSource não envia o token em cabeçalho).
+LIVE_FEED_TICKET_TTL = float(os.getenv('LIVE_FEED_TICKET_TTL', 30))
+
+# API Read Cache Configuration
+API_CACHE_TTL = float(os.getenv('API_CACHE_TTL', 60))
+API_CACHE_MAX_ENTRIES = int(os.getenv('API_CACHE_MAX_ENTRIES', 256))
@@ -0,0 +1,28 @@
+"""
+Migration do arquivo data/processed_records.json para a tabela processed_records (SQLite local).
+O DataManager também faz esta migração automaticamente na primeira execução; este script
+permite executá-la manualmente e conferir o resultado.
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from data_manager import DataManager
+
+def migrate():
+    print("Iniciando migração dos registros processados...")
+    try:
+        manager = DataManager()
+        data = manager.get_processed_data()
+        total = sum(len(records) for records in data.values())
+        print(f"✅ {total} registros disponíveis em {manager.db_file} ({len(data)} títulos)")
+        if os.path.exists(f"{manager.storage_file}.migrated"):
+            print(f"📁 Arquivo original preservado em {manager.storage_file}.migrated")
+    except Exception as e:
+        print(f"Erro na migração: {e}")
+
+if __name__ == "__main__":
+    migrate()
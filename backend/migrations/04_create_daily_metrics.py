@@ -0,0 +1,70 @@
+"""
+Migration que cria a tabela daily_metrics (métricas tipadas por site/data/slot) e adiciona
+as colunas metric_date e slot em processing_logs, usadas para ligar cada log às métricas
+da execução correspondente.
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from db_manager import DBManager, DAILY_METRICS_DDL
+
+LOG_COLUMNS = {
+    'metric_date': "ALTER TABLE processing_logs ADD COLUMN metric_date DATE NULL",
+    'slot': "ALTER TABLE processing_logs ADD COLUMN slot CHAR(5) NULL",
+}
+
+def migrate():
+    print("Iniciando migração das métricas diárias...")
+    db = DBManager()
+    db.connect()
+    conn = db._get_connection()
+    if not conn:
+        print("Erro na migração: não foi possível conectar ao banco de dados")
+        return
+
+    try:
+        cursor = conn.cursor()
+
+        print("Criando tabela 'daily_metrics' (se não existir)...")
+        cursor.execute(DAILY_METRICS_DDL)
+
+        for column, ddl in LOG_COLUMNS.items():
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'processing_logs'
+                AND COLUMN_NAME = %s
+            """, (column,))
+            if cursor.fetchone()[0]:
+                print(f"Coluna '{column}' já existe em processing_logs.")
+                continue
+            print(f"Adicionando coluna '{column}' em processing_logs...")
+            cursor.execute(ddl)
+
+        cursor.execute("""
+            SELECT COUNT(*)
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'processing_logs'
+            AND INDEX_NAME = 'idx_processing_logs_created_at'
+        """)
+        if not cursor.fetchone()[0]:
+            print("Criando índice em processing_logs.created_at...")
+            cursor.execute("CREATE INDEX idx_processing_logs_created_at ON processing_logs (created_at)")
+
+        conn.commit()
+        cursor.close()
+        print("✅ Migração concluída com sucesso!")
+
+    except Exception as e:
+        print(f"Erro na migração: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,51 @@
+"""
+Migration que cria as tabelas do agendador: schedule_slots (horários configuráveis, já com os
+oito horários usados até agora) e scheduler_runs (início e fim de cada execução).
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from db_manager import DBManager, SCHEDULE_SLOTS_DDL, SCHEDULER_RUNS_DDL
+
+DEFAULT_SLOTS = ['00:10', '03:10', '06:10', '09:10', '12:10', '15:10', '18:10', '21:10']
+
+def migrate():
+    print("Iniciando migração das tabelas do agendador...")
+    db = DBManager()
+    db.connect()
+    conn = db._get_connection()
+    if not conn:
+        print("Erro na migração: não foi possível conectar ao banco de dados")
+        return
+
+    try:
+        cursor = conn.cursor()
+
+        print("Criando tabela 'schedule_slots' (se não existir)...")
+        cursor.execute(SCHEDULE_SLOTS_DDL)
+
+        cursor.execute("SELECT COUNT(*) FROM schedule_slots")
+        if cursor.fetchone()[0] == 0:
+            print(f"Cadastrando horários padrão: {', '.join(DEFAULT_SLOTS)}")
+            cursor.executemany("INSERT INTO schedule_slots (slot) VALUES (%s)", [(slot,) for slot in DEFAULT_SLOTS])
+        else:
+            print("Tabela 'schedule_slots' já possui horários cadastrados.")
+
+        print("Criando tabela 'scheduler_runs' (se não existir)...")
+        cursor.execute(SCHEDULER_RUNS_DDL)
+
+        conn.commit()
+        cursor.close()
+        print("✅ Migração concluída com sucesso!")
+
+    except Exception as e:
+        print(f"Erro na migração: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,40 @@
+"""
+Migration que cria a tabela batch_jobs, usada no modo fila (BATCH_MODE=queue): um job por
+site em cada execução, disputado pelos workers com SELECT ... FOR UPDATE SKIP LOCKED (MySQL 8+).
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from db_manager import DBManager
+from work_queue import BATCH_JOBS_DDL
+
+def migrate():
+    print("Iniciando migração da tabela de jobs do lote...")
+    db = DBManager()
+    db.connect()
+    conn = db._get_connection()
+    if not conn:
+        print("Erro na migração: não foi possível conectar ao banco de dados")
+        return
+
+    try:
+        cursor = conn.cursor()
+
+        print("Criando tabela 'batch_jobs' (se não existir)...")
+        cursor.execute(BATCH_JOBS_DDL)
+
+        conn.commit()
+        cursor.close()
+        print("✅ Migração concluída com sucesso!")
+
+    except Exception as e:
+        print(f"Erro na migração: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,56 @@
+"""
+Migration que cria os índices usados pelas contagens de /api/dashboard/stats:
+sites (status) e daily_metrics (metric_date, site_name).
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from db_manager import DBManager
+
+INDEXES = {
+    ('sites', 'idx_sites_status'): "CREATE INDEX idx_sites_status ON sites (status)",
+    ('daily_metrics', 'idx_daily_metrics_date_site'):
+        "CREATE INDEX idx_daily_metrics_date_site ON daily_metrics (metric_date, site_name)",
+}
+
+def migrate():
+    print("Iniciando migração dos índices das estatísticas do dashboard...")
+    db = DBManager()
+    db.connect()
+    conn = db._get_connection()
+    if not conn:
+        print("Erro na migração: não foi possível conectar ao banco de dados")
+        return
+
+    try:
+        cursor = conn.cursor()
+
+        for (table, index), ddl in INDEXES.items():
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = %s
+                AND INDEX_NAME = %s
+            """, (table, index))
+            if cursor.fetchone()[0]:
+                print(f"Índice '{index}' já existe em {table}.")
+                continue
+            print(f"Criando índice '{index}' em {table}...")
+            cursor.execute(ddl)
+
+        conn.commit()
+        cursor.close()
+        print("✅ Migração concluída com sucesso!")
+
+    except Exception as e:
+        print(f"Erro na migração: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
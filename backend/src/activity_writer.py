@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+from db_manager import DBManager
+from local_store import LocalStore
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import ACTIVITY_FLUSH_INTERVAL, ACTIVITY_BATCH_SIZE, ACTIVITY_MAX_BUFFER
+
+# (site, status, mensagem, timestamp Unix, data da métrica, slot)
+ActivityRow = Tuple[str, str, str, float, Optional[str], Optional[str]]
+
+
+class ActivitySpool(LocalStore):
+    """
+    Área de espera em SQLite para logs que não puderam ser gravados no MySQL
+    (buffer cheio ou encerramento com o banco indisponível).
+    """
+
+    def _create_tables(self) -> None:
+        conn = self._get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS activity_log_spool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            site_name TEXT,
+            status TEXT,
+            message TEXT,
+            created_at REAL NOT NULL,
+            metric_date TEXT,
+            slot TEXT
+        )
+        """)
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(activity_log_spool)")}
+        for column in ('metric_date', 'slot'):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE activity_log_spool ADD COLUMN {column} TEXT")
+
+    def put(self, rows: List[ActivityRow]) -> None:
+        conn = self._get_connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO activity_log_spool (site_name, status, message, created_at, metric_date, slot) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def drain(self, limit: int, insert: Callable[[List[ActivityRow]], bool]) -> Optional[int]:
+        """
+        Grava os registros mais antigos com `insert` e só os remove se a gravação der certo.
+        A transação mantém o SQLite travado para que outro processo não grave os mesmos registros.
+        Retorna quantos foram gravados, ou None em caso de falha.
+        """
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, site_name, status, message, created_at, metric_date, slot "
+                "FROM activity_log_spool ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+            batch = [(row['site_name'], row['status'], row['message'], row['created_at'], row['metric_date'], row['slot'])
+                     for row in rows]
+            if rows and not insert(batch):
+                conn.execute("ROLLBACK")
+                return None
+            if rows:
+                conn.execute("DELETE FROM activity_log_spool WHERE id <= ?", (rows[-1]['id'],))
+            conn.execute("COMMIT")
+            return len(rows)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class ActivityLogWriter:
+    """
+    Gravador em lote para processing_logs.
+    log_activity apenas coloca o registro no buffer; uma thread em segundo plano grava
+    tudo com executemany a cada intervalo ou ao atingir o tamanho do lote. Se o MySQL
+    estiver indisponível, os registros continuam no buffer (o excedente vai para o
+    SQLite local) e são regravados depois.
+    """
+
+    def __init__(self, db: DBManager, flush_interval: float = ACTIVITY_FLUSH_INTERVAL,
+                 batch_size: int = ACTIVITY_BATCH_SIZE, max_buffer: int = ACTIVITY_MAX_BUFFER,
+                 spool: Optional[ActivitySpool] = None):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.spool = spool or ActivitySpool()
+        self._buffer: Deque[ActivityRow] = deque()
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._spool_pending = True
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='activity-writer', daemon=True)
+        self._thread.start()
+        logging.info("Gravador de logs de atividade iniciado")
+
+    def log_activity(self, site_name: str, status: str, message: str,
+                     metric_date: Optional[str] = None, slot: Optional[str] = None) -> bool:
+        with self._buffer_lock:
+            self._buffer.append((site_name, status, message, time.time(), metric_date, slot))
+            size = len(self._buffer)
+        if size >= self.batch_size:
+            self._wakeup.set()
+        if size > self.max_buffer:
+            self._spill_overflow()
+        return True
+
+    def pending_count(self) -> int:
+        with self._buffer_lock:
+            return len(self._buffer)
+
+    def flush(self) -> bool:
+        """Grava todo o buffer. Retorna False se algum lote falhar (os registros são mantidos)."""
+        with self._flush_lock:
+            # Registros guardados localmente são mais antigos que os do buffer: vão primeiro.
+            if not self._flush_spool():
+                return False
+            while True:
+                with self._buffer_lock:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                if not batch:
+                    return True
+                if not self.db.insert_activity_logs(batch):
+                    with self._buffer_lock:
+                        self._buffer.extendleft(reversed(batch))
+                    logging.warning(f"Falha ao gravar logs de atividade; {self.pending_count()} registros mantidos no buffer")
+                    return False
+
+    def close(self) -> None:
+        """Para a thread e grava o que restou; sem banco, o restante fica no SQLite local."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+        if not self.flush():
+            with self._buffer_lock:
+                remaining = list(self._buffer)
+                self._buffer.clear()
+            self._spool_rows(remaining)
+
+    def _spill_overflow(self) -> None:
+        with self._buffer_lock:
+            overflow = [self._buffer.popleft() for _ in range(len(self._buffer) - self.max_buffer)]
+        if overflow:
+            self._spool_rows(overflow)
+
+    def _spool_rows(self, rows: List[ActivityRow]) -> None:
+        if not rows:
+            return
+        try:
+            self.spool.put(rows)
+            self._spool_pending = True
+            logging.warning(f"{len(rows)} logs de atividade guardados no SQLite local para gravação posterior")
+        except Exception as e:
+            logging.error(f"Erro ao guardar logs de atividade no SQLite local ({len(rows)} registros perdidos): {e}")
+
+    def _flush_spool(self) -> bool:
+        if not self._spool_pending:
+            return True
+        try:
+            while True:
+                written = self.spool.drain(self.batch_size, self.db.insert_activity_logs)
+                if written is None:
+                    return False
+                if written:
+                    logging.info(f"{written} logs de atividade recuperados do SQLite local")
+                if written < self.batch_size:
+                    self._spool_pending = False
+                    return True
+        except Exception as e:
+            logging.error(f"Erro ao gravar logs de atividade guardados no SQLite local: {e}")
+            return False
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Erro no gravador de logs de atividade: {e}")
+
+
+_writer: Optional[ActivityLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_activity_writer(db: Optional[DBManager] = None) -> ActivityLogWriter:
+    """
+    Gravador único por processo. Na primeira chamada é iniciado, passa a receber
+    todos os DBManager.log_activity do processo e é gravado no encerramento.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            if db is None:
+                db = DBManager()
+                db.connect()
+            _writer = ActivityLogWriter(db)
+            DBManager._activity_writer = _writer
+            atexit.register(_writer.close)
+    _writer.start()
+    return _writer
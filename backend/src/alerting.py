@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from slack_outbox import get_outbox, get_outbox_drainer
+from dashboard_cache import RunMarker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import ALERT_CHANNEL_NAME, MC_ALERT_THRESHOLD, ALERT_ROUTING_TTL
+
+# Nome do marcador (run_marker) gravado quando os squads mudam.
+ROUTING_MARKER = 'alert_routing'
+
+
+class AlertRouting:
+    """
+    Cache em memória do webhook do canal de alertas.
+    A consulta ao banco acontece no máximo uma vez por TTL. Quando os squads são
+    editados, a API grava um marcador no SQLite compartilhado: o agendador, que roda
+    em outro processo, compara o marcador com o horário da sua leitura e relê o canal.
+    """
+
+    def __init__(self, channel_name: str = ALERT_CHANNEL_NAME, ttl_seconds: float = ALERT_ROUTING_TTL,
+                 marker: Optional[RunMarker] = None):
+        self.channel_name = channel_name
+        self.ttl_seconds = ttl_seconds
+        self.marker = marker or RunMarker()
+        self._lock = threading.Lock()
+        self._webhook_url: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+
+    def _is_valid(self) -> bool:
+        if self._loaded_at is None or time.time() - self._loaded_at >= self.ttl_seconds:
+            return False
+        changed_at = self.marker.changed_at(ROUTING_MARKER)
+        return changed_at is None or changed_at < self._loaded_at
+
+    def get_webhook(self, db) -> Optional[str]:
+        with self._lock:
+            if self._is_valid():
+                return self._webhook_url
+
+            webhook_url = self._load(db)
+            if webhook_url is None:
+                # Sem conexão: não guarda o resultado, tenta de novo na próxima chamada.
+                return self._webhook_url
+            self._webhook_url = webhook_url
+            self._loaded_at = time.time()
+            return webhook_url
+
+    def invalidate(self) -> None:
+        """Descarta o canal em cache neste processo e avisa os demais pelo marcador compartilhado."""
+        with self._lock:
+            self._webhook_url = None
+            self._loaded_at = None
+        self.marker.mark_changed(ROUTING_MARKER)
+        logging.info("[ALERT] Cache do canal de alertas invalidado")
+
+    def _load(self, db) -> Optional[str]:
+        conn = db._get_connection()
+        if not conn:
+            logging.error("[ALERT] Não foi possível obter conexão do pool")
+            return None
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT webhook_url FROM slack_channels WHERE name = %s", (self.channel_name,))
+            alert_channel = cursor.fetchone()
+            cursor.close()
+        finally:
+            conn.close()
+
+        if not alert_channel:
+            logging.error(f"[ALERT] ❌ Canal '{self.channel_name}' NÃO encontrado no banco de dados")
+            return ''
+        webhook_url = alert_channel.get('webhook_url') or ''
+        if not webhook_url:
+            logging.error(f"[ALERT] Canal '{self.channel_name}' existe mas webhook_url está VAZIO!")
+        return webhook_url
+
+
+class MCAlertBatch:
+    """
+    Acumula os alertas de MC negativa de uma execução e os envia em uma única
+    mensagem consolidada ao canal de alertas. Seguro para uso pelos workers do lote.
+    """
+
+    def __init__(self, db, date_str: str, slot: str, scope: str = 'batch',
+                 threshold: float = MC_ALERT_THRESHOLD, routing: Optional[AlertRouting] = None):
+        self.db = db
+        self.date_str = date_str
+        self.slot = slot
+        self.scope = scope
+        self.threshold = threshold
+        self.routing = routing or get_alert_routing()
+        self._lock = threading.Lock()
+        self._alerts: Dict[str, float] = {}
+
+    def check(self, site_name: str, mc_value: float) -> bool:
+        """Registra o alerta se a MC estiver no limite ou abaixo dele. O primeiro valor de cada site prevalece."""
+        if mc_value > self.threshold:
+            logging.debug(f"[ALERT CHECK] MC {mc_value} para {site_name} não requer alerta (> {self.threshold})")
+            return False
+        with self._lock:
+            self._alerts.setdefault(site_name, mc_value)
+        logging.info(f"[ALERT CHECK] Alerta registrado para {site_name} com MC {mc_value}")
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._alerts)
+
+    def format_message(self) -> str:
+        with self._lock:
+            alerts = sorted(self._alerts.items(), key=lambda item: item[1])
+        if len(alerts) == 1:
+            site_name, mc_value = alerts[0]
+            return f":rotating_light: *{site_name}* :rotating_light:\nMC: *R$ {mc_value:,.2f}*"
+        lines = [f":rotating_light: *{len(alerts)} sites com MC negativa* :rotating_light:"]
+        lines.extend(f"*{site_name}*: MC *R$ {mc_value:,.2f}*" for site_name, mc_value in alerts)
+        return "\n".join(lines)
+
+    def flush(self) -> bool:
+        """Enfileira a mensagem consolidada no outbox. Não faz nada se não houver alertas."""
+        if not len(self):
+            return False
+        try:
+            webhook_url = self.routing.get_webhook(self.db)
+        except Exception as e:
+            logging.error(f"[ALERT] Erro ao buscar o canal de alertas: {e}")
+            return False
+        if not webhook_url:
+            return False
+
+        alert_key = f"alert:{self.scope}:{self.date_str}:{self.slot}"
+        message = self.format_message()
+        logging.info(f"Enfileirando alerta consolidado ({alert_key}): {message}")
+        enqueued = get_outbox().enqueue(alert_key, webhook_url, message)
+        if enqueued:
+            get_outbox_drainer().wake()
+            logging.info(f"[ALERT] ✅ Alerta consolidado enfileirado para {len(self)} site(s)")
+        return enqueued
+
+
+_routing: Optional[AlertRouting] = None
+_routing_lock = threading.Lock()
+
+
+def get_alert_routing() -> AlertRouting:
+    global _routing
+    with _routing_lock:
+        if _routing is None:
+            _routing = AlertRouting()
+        return _routing
+
+
+def invalidate_alert_routing() -> None:
+    get_alert_routing().invalidate()
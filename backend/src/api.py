@@ -4,8 +4,9 @@ import logging
 import traceback
 import secrets
 import string
+from datetime import datetime
 from functools import wraps
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 
@@ -29,6 +30,14 @@ logger.info("Environment variables loaded")
 try:
     from db_manager import DBManager
     from auth_manager import AuthManager
+    from google_client import get_gspread_client
+    from alerting import invalidate_alert_routing
+    from dashboard_cache import get_summary_cache
+    from api_cache import get_api_cache
+    from circuit_breaker import get_circuit_breaker
+    from live_feed import get_live_feed, get_stream_tickets, parse_cursor, StreamLimitReached
+    from date_index import DateIndex
+    from config import DASHBOARD_TOP_N, API_THREADS, LIVE_FEED_MAX_STREAMS
     from utils.response_handler import ResponseHandler
     logger.info("All modules imported successfully")
 except Exception as e:
@@ -102,23 +111,64 @@ def token_required(f):
     return decorated
 
 
+# Leituras em cache afetadas por qualquer escrita em sites ou squads.
+CATALOG_CACHE_NAMESPACES = ('sites', 'site', 'squads', 'stats')
+
+
+def invalidate_catalog_cache():
+    get_api_cache().invalidate(*CATALOG_CACHE_NAMESPACES)
+
+
+def etag_response(data, etag):
+    """Resposta de sucesso com ETag; 304 sem corpo quando o If-None-Match do cliente já é a versão atual."""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response, _ = ResponseHandler.success(data)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_success(namespace, key, loader):
+    return etag_response(*get_api_cache().get_or_load(namespace, key, loader))
+
+
 from main import run_batch_processing
-import threading
+from process_jobs import get_job_registry
 
 @app.route('/api/process/manual', methods=['POST'])
 @token_required
 def manual_process():
 
     try:
-
-        thread = threading.Thread(target=run_batch_processing)
-        thread.start()
-        
-        return ResponseHandler.success({'message': 'Processamento manual iniciado com sucesso.'})
+        registry = get_job_registry()
+        active = registry.get_active()
+        if active is not None:
+            return ResponseHandler.success({'job': active.to_dict(include_sites=False), 'joined': True},
+                                           'Processamento manual já em andamento.')
+
+        if db.is_run_lock_free() is False:
+            return ResponseHandler.error('Já existe uma execução do lote em andamento (agendador).', 409, 'RUN_IN_PROGRESS')
+
+        job, created = registry.submit(lambda job: run_batch_processing(progress=job),
+                                       requested_by=request.user.get('username'))
+        message = 'Processamento manual iniciado com sucesso.' if created else 'Processamento manual já em andamento.'
+        return ResponseHandler.success({'job': job.to_dict(include_sites=False), 'joined': not created}, message,
+                                       202 if created else 200)
     except Exception as e:
         return ResponseHandler.error(str(e))
 
 
+@app.route('/api/process/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_process_job(job_id):
+    job = get_job_registry().get(job_id)
+    if job is None:
+        return ResponseHandler.error('Job não encontrado', 404)
+    return ResponseHandler.success({'job': job.to_dict()})
+
+
 
 @app.route('/api/auth/login', methods=['POST'])
 def login():
@@ -173,8 +223,11 @@ def get_sites():
         name_filter = request.args.get('name')
         squad_filter = request.args.get('squad')
         
-        sites_data = db.get_all_sites_detailed(name_filter, squad_filter)
-        return ResponseHandler.success({'sites': sites_data, 'total': len(sites_data)})
+        def load():
+            sites_data = db.get_all_sites_detailed(name_filter, squad_filter)
+            return {'sites': sites_data, 'total': len(sites_data)}
+
+        return cached_success('sites', (name_filter, squad_filter), load)
         
     except Exception as e:
         return ResponseHandler.error(str(e))
@@ -184,18 +237,23 @@ def get_sites():
 @token_required
 def get_site(name):
     try:
-        config = db.get_site_config(name)
-        
-        if not config.get('sheet_url'):
+        def load():
+            config = db.get_site_config(name)
+            if not config.get('sheet_url'):
+                return None
+            return {
+                'name': name,
+                'sheet_url': config.get('sheet_url'),
+                'indices': config.get('indices'),
+                'squad_name': config.get('squad_name'),
+                'has_webhook': bool(config.get('slack_webhook_url'))
+            }
+
+        site, etag = get_api_cache().get_or_load('site', name, load)
+        if site is None:
             return ResponseHandler.error('Site não encontrado', 404)
         
-        return ResponseHandler.success({
-            'name': name,
-            'sheet_url': config.get('sheet_url'),
-            'indices': config.get('indices'),
-            'squad_name': config.get('squad_name'),
-            'has_webhook': bool(config.get('slack_webhook_url'))
-        })
+        return etag_response(site, etag)
         
     except Exception as e:
         return ResponseHandler.error(str(e))
@@ -227,6 +285,7 @@ def create_site():
         )
         
         if success:
+            invalidate_catalog_cache()
             return ResponseHandler.success(None, 'Site criado com sucesso', 201)
         else:
             return ResponseHandler.error('Erro ao criar site', 500)
@@ -270,7 +329,11 @@ def update_site_by_id(site_id):
         success = db.update_site(site_id, data)
         
         if success:
+            invalidate_catalog_cache()
             updated_site = db.get_site_by_id(site_id)
+            # URL ou índices corrigidos: o site volta a ser processado já na próxima execução.
+            if updated_site:
+                get_circuit_breaker().reset(updated_site['name'])
             return ResponseHandler.success(updated_site, 'Site atualizado com sucesso')
         else:
             return ResponseHandler.error('Site não encontrado ou erro ao atualizar', 404)
@@ -289,6 +352,7 @@ def delete_site_by_id(site_id):
         success = db.delete_site_by_id(site_id)
         
         if success:
+            invalidate_catalog_cache()
             return ResponseHandler.success(None, 'Site removido com sucesso')
         else:
             return ResponseHandler.error('Site não encontrado ou erro ao remover', 404)
@@ -307,6 +371,7 @@ def delete_site(name):
         success = db.delete_site(name)
         
         if success:
+            invalidate_catalog_cache()
             return ResponseHandler.success(None, 'Site removido com sucesso')
         else:
             return ResponseHandler.error('Site não encontrado', 404)
@@ -317,6 +382,32 @@ def delete_site(name):
 
 
 
+@app.route('/api/circuits', methods=['GET'])
+@token_required
+def get_site_circuits():
+    try:
+        circuits = get_circuit_breaker().get_all()
+        return ResponseHandler.success({'circuits': circuits, 'total': len(circuits)})
+
+    except Exception as e:
+        return ResponseHandler.error(str(e))
+
+
+@app.route('/api/circuits/<name>/reset', methods=['POST'])
+@token_required
+def reset_site_circuit(name):
+    if request.user.get('role') != 'admin':
+        return ResponseHandler.error('Acesso negado', 403)
+
+    try:
+        if get_circuit_breaker().reset(name):
+            return ResponseHandler.success(None, 'Circuito reiniciado com sucesso')
+        return ResponseHandler.error('Nenhuma falha registrada para o site', 404)
+
+    except Exception as e:
+        return ResponseHandler.error(str(e))
+
+
 @app.route('/api/sheets/headers', methods=['POST'])
 @token_required
 def get_sheet_headers():
@@ -327,20 +418,7 @@ def get_sheet_headers():
         if not sheet_url:
             return ResponseHandler.error('URL da planilha é obrigatória', 400)
         
-        import gspread
-        import re
-        from google.oauth2.service_account import Credentials
-        from datetime import datetime
-        
-        SCOPES = [
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        creds_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'google_service_account.json')
-        
-        creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
-        gc = gspread.authorize(creds)
+        gc = get_gspread_client()
         spreadsheet = gc.open_by_url(sheet_url)
         
         worksheets = spreadsheet.worksheets()
@@ -355,7 +433,6 @@ def get_sheet_headers():
 
         current_month = datetime.now().month
         current_year = datetime.now().year
-        current_date = f"{datetime.now().day:02d}/{datetime.now().month:02d}"
         meses = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", 
                  "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
         
@@ -386,29 +463,12 @@ def get_sheet_headers():
 
         current_data_row = []
         if len(all_data) > header_row_index + 1:
-            for row in reversed(all_data[header_row_index + 1:]):
-                if not row or not any(cell.strip() for cell in row):
-                    continue
-                data_val = row[0].strip() if row[0] else ''
-                matched = False
-                if data_val == current_date:
-                    matched = True
-                else:
-                    try:
-                        parts = re.split(r'[/-]', data_val)
-                        if len(parts) >= 2:
-                            d, m = int(parts[0]), int(parts[1])
-                            if d == datetime.now().day and m == datetime.now().month:
-                                matched = True
-                    except:
-                        pass
-                if matched:
-                    current_data_row = row
-                    break
+            data_rows = all_data[header_row_index + 1:]
+            current_data_row = DateIndex(data_rows, key=0).find(datetime.now()) or []
             
 
             if not current_data_row:
-                for row in reversed(all_data[header_row_index + 1:]):
+                for row in reversed(data_rows):
                     if row and any(cell.strip() for cell in row):
                         current_data_row = row
                         break
@@ -448,17 +508,7 @@ def get_sheet_headers_by_name(sheet_name):
         if not sheet_url:
             return ResponseHandler.error('URL da planilha é obrigatória', 400)
         
-        import gspread
-        from google.oauth2.service_account import Credentials
-        
-        SCOPES = [
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        creds_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'google_service_account.json')
-        creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
-        gc = gspread.authorize(creds)
+        gc = get_gspread_client()
         spreadsheet = gc.open_by_url(sheet_url)
         
         target_sheet = None
@@ -537,6 +587,7 @@ def create_user():
     )
     
     if success:
+        get_api_cache().invalidate('stats')
         return ResponseHandler.success({'password': password}, 'Usuário criado com sucesso', 201)
     else:
         return ResponseHandler.error('Erro ao criar usuário. Email ou usuário já existem?', 500)
@@ -551,6 +602,7 @@ def delete_user(user_id):
     try:
         success = auth.delete_user(user_id)
         if success:
+            get_api_cache().invalidate('stats')
             return ResponseHandler.success(None, 'Usuário removido com sucesso')
         return ResponseHandler.error('Usuário não encontrado ou erro ao remover', 404)
     except Exception as e:
@@ -590,19 +642,7 @@ def test_site_mapping(name):
         if not sheet_url:
             return ResponseHandler.error('Site sem URL de planilha configurada', 400)
         
-        import gspread
-        from google.oauth2.service_account import Credentials
-        
-        SCOPES = [
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        creds_path = os.path.join(project_root, 'google_service_account.json')
-        
-        creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
-        gc = gspread.authorize(creds)
+        gc = get_gspread_client()
         spreadsheet = gc.open_by_url(sheet_url)
         
         worksheet = spreadsheet.get_worksheet(sheet_index)
@@ -663,15 +703,20 @@ def test_site_mapping(name):
 @token_required
 def get_dashboard_stats():
     try:
-        sites = db.get_all_sites()
-        users = auth.get_all_users()
-        
-        return ResponseHandler.success({
-            'total_sites': len(sites),
-            'total_users': len(users),
-            'sites_with_data': len(sites),
-            'last_update': None
-        })
+        metric_date = datetime.now().date().isoformat()
+        # Qualquer execução concluída (agendada ou manual) muda os números: entra na chave do cache.
+        last_run = get_summary_cache().marker.last_completed()
+        completed_at = last_run['completed_at'] if last_run else None
+
+        def load():
+            stats = db.get_dashboard_stats(metric_date)
+            if not stats:
+                raise RuntimeError('Erro ao calcular estatísticas do dashboard')
+            stats['metric_date'] = metric_date
+            stats['last_update'] = datetime.fromtimestamp(completed_at).isoformat() if completed_at else None
+            return stats
+
+        return cached_success('stats', (metric_date, completed_at), load)
         
     except Exception as e:
         return ResponseHandler.error(str(e))
@@ -683,7 +728,85 @@ def get_dashboard_logs():
         limit = request.args.get('limit', 50, type=int)
         logs = db.get_recent_logs(limit)
         return ResponseHandler.success({'logs': logs})
-        
+
+    except Exception as e:
+        return ResponseHandler.error(str(e))
+
+
+@app.route('/api/dashboard/stream/ticket', methods=['POST'])
+@token_required
+def create_stream_ticket():
+    """Ticket de uso único para abrir /api/dashboard/stream (vale por LIVE_FEED_TICKET_TTL segundos)."""
+    tickets = get_stream_tickets()
+    return ResponseHandler.success({'ticket': tickets.issue(request.user), 'expires_in': tickets.ttl_seconds})
+
+
+@app.route('/api/dashboard/stream', methods=['GET'])
+def dashboard_stream():
+    """
+    Server-sent events com os novos logs, as novas linhas de métricas, a execução do agendador
+    e o progresso do processamento manual. O EventSource do navegador não envia cabeçalhos,
+    então a conexão é aberta com ?ticket= (POST /api/dashboard/stream/ticket), nunca com o
+    token; a posição para retomar vem em Last-Event-ID (ou ?last_id=).
+    """
+    ticket = request.args.get('ticket')
+    if not ticket:
+        return ResponseHandler.error('Ticket não fornecido', 401, 'MISSING_TICKET')
+    if not get_stream_tickets().redeem(ticket):
+        return ResponseHandler.error('Ticket inválido ou expirado', 401, 'INVALID_TICKET')
+
+    last_cursor = parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('last_id'))
+    feed = get_live_feed(db)
+    try:
+        subscriber = feed.subscribe(last_cursor)
+    except StreamLimitReached:
+        response, status = ResponseHandler.error('Limite de conexões em tempo real atingido', 503, 'STREAM_LIMIT')
+        response.headers['Retry-After'] = '30'
+        return response, status
+
+    response = Response(
+        stream_with_context(feed.stream(subscriber)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Libera a vaga mesmo se o cliente cair antes de o gerador começar.
+    response.call_on_close(lambda: feed.unsubscribe(subscriber))
+    return response
+
+
+@app.route('/api/dashboard/summary', methods=['GET'])
+@token_required
+def get_dashboard_summary():
+    try:
+        metric_date = request.args.get('date') or datetime.now().date().isoformat()
+        try:
+            datetime.strptime(metric_date, '%Y-%m-%d')
+        except ValueError:
+            return ResponseHandler.error('Data inválida. Use o formato AAAA-MM-DD', 400)
+        top_n = min(max(request.args.get('top', DASHBOARD_TOP_N, type=int), 1), 50)
+
+        return ResponseHandler.success(get_summary_cache().get_summary(db, metric_date, top_n))
+
+    except Exception as e:
+        return ResponseHandler.error(str(e))
+
+
+@app.route('/api/dashboard/metrics', methods=['GET'])
+@token_required
+def get_dashboard_metrics():
+    try:
+        metric_date = request.args.get('date') or datetime.now().date().isoformat()
+        try:
+            datetime.strptime(metric_date, '%Y-%m-%d')
+        except ValueError:
+            return ResponseHandler.error('Data inválida. Use o formato AAAA-MM-DD', 400)
+
+        return ResponseHandler.success({
+            'date': metric_date,
+            'sites': db.get_daily_metrics(metric_date),
+            'squads': db.get_squad_metrics(metric_date)
+        })
+
     except Exception as e:
         return ResponseHandler.error(str(e))
 
@@ -692,10 +815,10 @@ def get_dashboard_logs():
 @app.route('/api/squads', methods=['GET'])
 @token_required
 def get_squads():
-    try:
+    def load():
         conn = db._get_connection()
         if not conn:
-            return ResponseHandler.error('Erro ao conectar ao banco de dados', 500)
+            raise RuntimeError('Erro ao conectar ao banco de dados')
         
         cursor = conn.cursor(dictionary=True)
         cursor.execute("""
@@ -722,7 +845,10 @@ def get_squads():
                 'sites': []
             })
         
-        return ResponseHandler.success({'squads': squads, 'total': len(squads)})
+        return {'squads': squads, 'total': len(squads)}
+
+    try:
+        return cached_success('squads', None, load)
         
     except Exception as e:
         return ResponseHandler.error(str(e))
@@ -760,6 +886,8 @@ def create_squad():
         conn.commit()
         cursor.close()
         conn.close()
+        invalidate_alert_routing()
+        invalidate_catalog_cache()
         
         return ResponseHandler.success(None, 'Squad criado com sucesso', 201)
         
@@ -813,6 +941,8 @@ def update_squad(name):
         conn.close()
         
         if updated:
+            invalidate_alert_routing()
+            invalidate_catalog_cache()
             return ResponseHandler.success(None, 'Squad atualizado com sucesso')
         else:
             return ResponseHandler.error('Squad não encontrado', 404)
@@ -858,6 +988,8 @@ def delete_squad(name):
         conn.close()
         
         if deleted:
+            invalidate_alert_routing()
+            invalidate_catalog_cache()
             return ResponseHandler.success(None, 'Squad removido com sucesso')
         else:
             return ResponseHandler.error('Squad não encontrado', 404)
@@ -907,7 +1039,10 @@ if __name__ == '__main__':
         from waitress import serve
         logger.info("Using waitress server (production-ready)")
         print("Using waitress server (production-ready)")
-        serve(app, host=host, port=port, threads=4)
+        if LIVE_FEED_MAX_STREAMS >= API_THREADS:
+            logger.warning(f"LIVE_FEED_MAX_STREAMS ({LIVE_FEED_MAX_STREAMS}) >= API_THREADS ({API_THREADS}): "
+                           "streams SSE podem ocupar todas as threads da API")
+        serve(app, host=host, port=port, threads=API_THREADS)
     except ImportError:
         logger.warning("Waitress not installed, falling back to Flask dev server")
         app.run(host=host, port=port, debug=False, use_reloader=False, threaded=True)
@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import API_CACHE_TTL, API_CACHE_MAX_ENTRIES
+
+
+def compute_etag(data: Any) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ApiReadCache:
+    """
+    Cache em memória (TTL + LRU) das leituras da API, com o ETag de cada resposta.
+    As entradas são agrupadas por namespace ('sites', 'squads', ...); os handlers de
+    escrita invalidam os namespaces afetados. O TTL cobre alterações feitas fora da API.
+    """
+
+    def __init__(self, ttl_seconds: float = API_CACHE_TTL, max_entries: int = API_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # (namespace, chave) -> (carregado em, dados, etag)
+        self._entries: 'OrderedDict[Tuple[str, Hashable], Tuple[float, Any, str]]' = OrderedDict()
+        self._generations: Dict[str, int] = {}
+
+    def get_or_load(self, namespace: str, key: Hashable, loader: Callable[[], Any]) -> Tuple[Any, str]:
+        """Retorna (dados, etag), chamando `loader` só quando não há entrada válida."""
+        cache_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(cache_key)
+                return entry[1], entry[2]
+            generation = self._generations.get(namespace, 0)
+
+        data = loader()
+        etag = compute_etag(data)
+        with self._lock:
+            # Uma escrita durante o carregamento invalidou o namespace: não guarda o valor antigo.
+            if self._generations.get(namespace, 0) == generation:
+                self._entries[cache_key] = (time.monotonic(), data, etag)
+                self._entries.move_to_end(cache_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return data, etag
+
+    def invalidate(self, *namespaces: str) -> None:
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for cache_key in [k for k in self._entries if k[0] in namespaces]:
+                del self._entries[cache_key]
+        logging.debug(f"Cache da API invalidado: {', '.join(namespaces)}")
+
+
+_cache: Optional[ApiReadCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_api_cache() -> ApiReadCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ApiReadCache()
+        return _cache
@@ -0,0 +1,85 @@
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Tuple
+
+from local_store import LocalStore
+
+# Campos da linha do dia que entram no hash e nos valores reaproveitados.
+ROW_FIELDS = ('Data', 'Investimento', 'Receita', 'ROAS Geral', 'MC Geral')
+METRIC_FIELDS = ('investimento', 'receita_real', 'receita_dolar', 'mc', 'roas', 'registros')
+
+
+def row_window_hash(rows: Iterable[Tuple[str, Dict[str, Any]]]) -> str:
+    """Hash das linhas do dia de um site, na forma [(nome da aba, registro), ...]."""
+    payload = [[tab] + [str(record.get(field) or '') for field in ROW_FIELDS] for tab, record in rows]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class RowHashStore(LocalStore):
+    """
+    Último hash da linha do dia de cada site, com os valores já interpretados.
+    Quando o hash não muda entre um horário e outro, o lote reaproveita os valores
+    e não reenvia o resumo do squad.
+    """
+
+    def _create_tables(self) -> None:
+        conn = self._get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS site_row_hash (
+            site_name TEXT PRIMARY KEY,
+            metric_date TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            row_hash TEXT NOT NULL,
+            metrics TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """)
+
+    def load(self, metric_date: str) -> Dict[str, Dict[str, Any]]:
+        """Snapshots gravados para a data informada, por site. Datas anteriores são ignoradas."""
+        try:
+            rows = self._get_connection().execute(
+                "SELECT site_name, slot, row_hash, metrics FROM site_row_hash WHERE metric_date = ?",
+                (metric_date,)
+            ).fetchall()
+        except Exception as e:
+            logging.error(f"Erro ao ler hashes das linhas do dia: {e}")
+            return {}
+        return {
+            row['site_name']: {'slot': row['slot'], 'row_hash': row['row_hash'], 'metrics': json.loads(row['metrics'])}
+            for row in rows
+        }
+
+    def save(self, metric_date: str, slot: str, results: List[Dict[str, Any]]) -> None:
+        """Grava o hash dos sites lidos com sucesso e alterados nesta execução."""
+        now = time.time()
+        params = [
+            (result['site_name'], metric_date, slot, result['row_hash'],
+             json.dumps({field: result[field] for field in METRIC_FIELDS}), now)
+            for result in results
+            if result.get('ok') and result.get('row_hash') and result.get('changed')
+        ]
+        if not params:
+            return
+        try:
+            self._get_connection().executemany("""
+            INSERT INTO site_row_hash (site_name, metric_date, slot, row_hash, metrics, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(site_name) DO UPDATE SET
+                metric_date = excluded.metric_date,
+                slot = excluded.slot,
+                row_hash = excluded.row_hash,
+                metrics = excluded.metrics,
+                updated_at = excluded.updated_at
+            """, params)
+        except Exception as e:
+            logging.error(f"Erro ao gravar hashes das linhas do dia: {e}")
+
+
+def restore_metrics(result: Dict[str, Any], snapshot: Dict[str, Any]) -> None:
+    """Copia para o resultado os valores interpretados na execução anterior."""
+    for field in METRIC_FIELDS:
+        result[field] = snapshot['metrics'][field]
+    result['encontrou_registro'] = result['registros'] > 0
@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from local_store import LocalStore
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_OPEN_SECONDS, CIRCUIT_PROBE_TIMEOUT
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class SiteCircuitBreaker(LocalStore):
+    """
+    Circuit breaker por site, persistido no SQLite compartilhado (data/).
+
+    - closed: o site é processado normalmente; falhas consecutivas são contadas.
+    - open: após CIRCUIT_FAILURE_THRESHOLD execuções seguidas com falha, o site é pulado
+      até passar CIRCUIT_OPEN_SECONDS.
+    - half_open: vencida a janela, uma única execução de teste (sem retries) é liberada;
+      sucesso fecha o circuito, falha reabre por mais uma janela.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, open_seconds: float = CIRCUIT_OPEN_SECONDS,
+                 probe_timeout: float = CIRCUIT_PROBE_TIMEOUT, **kwargs):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.probe_timeout = probe_timeout
+        super().__init__(**kwargs)
+
+    def _create_tables(self) -> None:
+        conn = self._get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS site_circuit (
+            site_name TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            failures INTEGER NOT NULL DEFAULT 0,
+            opened_at REAL,
+            probe_started_at REAL,
+            last_error TEXT,
+            last_failure_at REAL,
+            updated_at REAL NOT NULL
+        )
+        """)
+
+    def allow(self, site_name: str) -> Optional[str]:
+        """
+        Decide se o site entra na execução. Retorna CLOSED (processamento normal),
+        HALF_OPEN (execução de teste) ou None (pular).
+        """
+        conn = self._get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            logging.error(f"Erro ao consultar circuito de {site_name}: {e}")
+            return CLOSED
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT state, opened_at, probe_started_at FROM site_circuit WHERE site_name = ?", (site_name,)
+            ).fetchone()
+            decision = CLOSED
+            if row is not None and row['state'] != CLOSED:
+                if row['state'] == OPEN and now - row['opened_at'] < self.open_seconds:
+                    decision = None
+                elif row['state'] == HALF_OPEN and row['probe_started_at'] and now - row['probe_started_at'] < self.probe_timeout:
+                    # Outra execução já está testando o site.
+                    decision = None
+                else:
+                    decision = HALF_OPEN
+                    conn.execute(
+                        "UPDATE site_circuit SET state = ?, probe_started_at = ?, updated_at = ? WHERE site_name = ?",
+                        (HALF_OPEN, now, now, site_name)
+                    )
+            conn.execute("COMMIT")
+            return decision
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            logging.error(f"Erro ao consultar circuito de {site_name}: {e}")
+            return CLOSED
+
+    def record_success(self, site_name: str) -> None:
+        try:
+            self._get_connection().execute("""
+            UPDATE site_circuit
+            SET state = ?, failures = 0, opened_at = NULL, probe_started_at = NULL, updated_at = ?
+            WHERE site_name = ? AND (state != ? OR failures > 0)
+            """, (CLOSED, time.time(), site_name, CLOSED))
+        except Exception as e:
+            logging.error(f"Erro ao fechar circuito de {site_name}: {e}")
+
+    def record_failure(self, site_name: str, error: Optional[str]) -> Optional[str]:
+        """Conta a falha e retorna o novo estado (OPEN quando o circuito abriu ou reabriu)."""
+        conn = self._get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            logging.error(f"Erro ao registrar falha de {site_name}: {e}")
+            return None
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT state, failures, opened_at FROM site_circuit WHERE site_name = ?", (site_name,)
+            ).fetchone()
+            failures = (row['failures'] if row else 0) + 1
+            previous_state = row['state'] if row else CLOSED
+            opened_at = row['opened_at'] if row else None
+            if previous_state == HALF_OPEN or failures >= self.failure_threshold:
+                state = OPEN
+                opened_at = now
+            else:
+                state = previous_state
+            conn.execute("""
+            INSERT INTO site_circuit (site_name, state, failures, opened_at, probe_started_at, last_error, last_failure_at, updated_at)
+            VALUES (?, ?, ?, ?, NULL, ?, ?, ?)
+            ON CONFLICT(site_name) DO UPDATE SET
+                state = excluded.state,
+                failures = excluded.failures,
+                opened_at = excluded.opened_at,
+                probe_started_at = NULL,
+                last_error = excluded.last_error,
+                last_failure_at = excluded.last_failure_at,
+                updated_at = excluded.updated_at
+            """, (site_name, state, failures, opened_at, (error or '')[:500], now, now))
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            logging.error(f"Erro ao registrar falha de {site_name}: {e}")
+            return None
+
+        if state == OPEN and previous_state != OPEN:
+            logging.warning(f"Circuito de {site_name} aberto após {failures} falha(s) seguidas: {error}")
+        return state
+
+    def reset(self, site_name: str) -> bool:
+        try:
+            cursor = self._get_connection().execute("DELETE FROM site_circuit WHERE site_name = ?", (site_name,))
+            return cursor.rowcount > 0
+        except Exception as e:
+            logging.error(f"Erro ao reiniciar circuito de {site_name}: {e}")
+            return False
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        """Sites com falhas registradas, com o horário previsto do próximo teste quando o circuito está aberto."""
+        try:
+            rows = self._get_connection().execute(
+                "SELECT * FROM site_circuit WHERE state != ? OR failures > 0 ORDER BY site_name", (CLOSED,)
+            ).fetchall()
+        except Exception as e:
+            logging.error(f"Erro ao listar circuitos: {e}")
+            return []
+        circuits = []
+        for row in rows:
+            circuit = dict(row)
+            circuit['retry_at'] = row['opened_at'] + self.open_seconds if row['state'] == OPEN and row['opened_at'] else None
+            circuits.append(circuit)
+        return circuits
+
+
+_breaker: Optional[SiteCircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> SiteCircuitBreaker:
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = SiteCircuitBreaker()
+        return _breaker
@@ -0,0 +1,39 @@
+import re
+from functools import lru_cache
+from typing import Any, Tuple
+
+# Valores de erro do Sheets que equivalem a zero (mesma lista do clean_value).
+ERROR_VALUES = frozenset(['', '#DIV/0!', '#N/A', '#VALUE!', '#REF!', '#NAME?'])
+
+_NUMBER_PATTERN = re.compile(r'-?\d+[\d.,]*')
+# Formato brasileiro: "." é separador de milhar e "," é o decimal.
+_BRL_TO_FLOAT = str.maketrans({'.': None, ',': '.'})
+
+
+@lru_cache(maxsize=4096)
+def _parse_text(text: str) -> Tuple[float, bool]:
+    if text in ERROR_VALUES:
+        return 0.0, False
+    is_dollar = '$' in text and 'R$' not in text
+    match = _NUMBER_PATTERN.search(text.replace('R$', '').replace(' ', ''))
+    if not match:
+        return 0.0, is_dollar
+    try:
+        return float(match.group(0).translate(_BRL_TO_FLOAT)), is_dollar
+    except ValueError:
+        return 0.0, is_dollar
+
+
+def parse_currency(value: Any) -> Tuple[float, bool]:
+    """
+    Converte uma célula ("R$ 1.234,56", "$ 12,00", "1,5", "#DIV/0!") em (valor, é_dólar)
+    numa única passada. Mesmo resultado de clean_value + to_float + is_dollar_value.
+    Números já convertidos passam direto.
+    """
+    if value is None:
+        return 0.0, False
+    if isinstance(value, bool):
+        return float(value), False
+    if isinstance(value, (int, float)):
+        return float(value), False
+    return _parse_text(str(value).strip())
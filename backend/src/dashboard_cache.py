@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from local_store import LocalStore
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import DASHBOARD_SUMMARY_TTL, DASHBOARD_TOP_N
+
+
+class RunMarker(LocalStore):
+    """
+    Marca a última execução concluída do lote no SQLite compartilhado (data/).
+    O agendador grava ao fim de cada execução; a API lê para saber quando os
+    resultados em cache deixaram de valer. mark_changed registra no mesmo lugar
+    alterações feitas pela API que o agendador precisa enxergar (ex.: canal de alertas).
+    """
+
+    def _create_tables(self) -> None:
+        conn = self._get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS run_marker (
+            name TEXT PRIMARY KEY,
+            metric_date TEXT,
+            slot TEXT,
+            completed_at REAL NOT NULL
+        )
+        """)
+
+    def mark_completed(self, metric_date: Optional[str], slot: Optional[str], name: str = 'batch') -> None:
+        try:
+            self._get_connection().execute("""
+            INSERT INTO run_marker (name, metric_date, slot, completed_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                metric_date = excluded.metric_date,
+                slot = excluded.slot,
+                completed_at = excluded.completed_at
+            """, (name, metric_date, slot, time.time()))
+        except Exception as e:
+            logging.error(f"Erro ao registrar fim da execução: {e}")
+
+    def mark_changed(self, name: str) -> None:
+        self.mark_completed(None, None, name)
+
+    def changed_at(self, name: str) -> Optional[float]:
+        marker = self.last_completed(name)
+        return marker['completed_at'] if marker else None
+
+    def last_completed(self, name: str = 'batch') -> Optional[Dict[str, Any]]:
+        try:
+            row = self._get_connection().execute(
+                "SELECT metric_date, slot, completed_at FROM run_marker WHERE name = ?", (name,)
+            ).fetchone()
+        except Exception as e:
+            logging.error(f"Erro ao ler marcador de execução: {e}")
+            return None
+        return dict(row) if row else None
+
+
+class DashboardSummaryCache:
+    """
+    Cache em memória do resumo do dashboard (top N por MC e totais por squad).
+    Cada entrada vale até a próxima execução concluída do lote (ou até o TTL,
+    para cobrir alterações feitas direto no banco).
+    """
+
+    def __init__(self, marker: Optional[RunMarker] = None, ttl_seconds: float = DASHBOARD_SUMMARY_TTL):
+        self.marker = marker or RunMarker()
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, int], Tuple[Optional[float], float, Dict[str, Any]]] = {}
+
+    def get_summary(self, db, metric_date: str, top_n: int = DASHBOARD_TOP_N) -> Dict[str, Any]:
+        last_run = self.marker.last_completed()
+        generation = last_run['completed_at'] if last_run else None
+        key = (metric_date, top_n)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == generation and time.monotonic() - entry[1] < self.ttl_seconds:
+                return entry[2]
+
+        summary = self._build(db, metric_date, top_n, last_run)
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic(), summary)
+        return summary
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _build(self, db, metric_date: str, top_n: int, last_run: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        top_sites = db.get_daily_metrics(metric_date, limit=top_n)
+        squads = db.get_squad_metrics(metric_date)
+
+        investimento = sum(squad['investimento'] for squad in squads)
+        receita_real = sum(squad['receita_real'] for squad in squads)
+        receita_dolar = sum(squad['receita_dolar'] for squad in squads)
+        receita = receita_real + receita_dolar
+        totals = {
+            'sites_count': sum(squad['sites_count'] for squad in squads),
+            'investimento': investimento,
+            'receita_real': receita_real,
+            'receita_dolar': receita_dolar,
+            'roas': receita / investimento if investimento > 0 else 0.0,
+            'mc': sum(squad['mc'] for squad in squads)
+        }
+
+        return {
+            'date': metric_date,
+            'top_sites': top_sites,
+            'squads': squads,
+            'totals': totals,
+            'last_run': last_run
+        }
+
+
+_summary_cache: Optional[DashboardSummaryCache] = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> DashboardSummaryCache:
+    global _summary_cache
+    with _summary_cache_lock:
+        if _summary_cache is None:
+            _summary_cache = DashboardSummaryCache()
+        return _summary_cache
+
+
+def mark_run_completed(metric_date: str, slot: str) -> None:
+    """Chamado ao fim de cada execução do lote: invalida os resumos em cache de todos os processos."""
+    RunMarker().mark_completed(metric_date, slot)
+    with _summary_cache_lock:
+        if _summary_cache is not None:
+            _summary_cache.invalidate()
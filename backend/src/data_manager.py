@@ -1,76 +1,170 @@
 import json
 import os
+import time
+from datetime import datetime
 import logging
 import sys
 from typing import Dict, List, Any
 
+from local_store import LocalStore
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from config import PROCESSED_DATA_FILE
+from config import PROCESSED_DATA_FILE, LOCAL_DB_FILE, PROCESSED_RETENTION_DAYS
 
-class DataManager:
+class DataManager(LocalStore):
     """
     Gerencia o armazenamento e recuperação de dados processados para evitar duplicações.
-    Agora salva agrupado por empresa/título (ex: FB ADS, G ADS) em arrays.
+    Os registros ficam em uma tabela SQLite indexada por (título, campo chave, valor),
+    com consultas O(1), escrita apenas por inserção e descarte dos registros antigos.
     """
-    
-    def __init__(self, storage_file: str = PROCESSED_DATA_FILE):
+
+    _retention_applied = False
+
+    def __init__(self, storage_file: str = PROCESSED_DATA_FILE, db_file: str = LOCAL_DB_FILE,
+                 retention_days: int = PROCESSED_RETENTION_DAYS):
         self.storage_file = storage_file
-        self._ensure_storage_file()
-        
-    def _ensure_storage_file(self) -> None:
-        """Garante que o arquivo de armazenamento existe."""
-        os.makedirs(os.path.dirname(self.storage_file), exist_ok=True)
+        self.retention_days = retention_days
+        super().__init__(db_file=db_file)
+        self._migrate_legacy_json()
+        if not DataManager._retention_applied:
+            DataManager._retention_applied = True
+            self.compact()
+
+    def _create_tables(self) -> None:
+        conn = self._get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS processed_records (
+            titulo TEXT NOT NULL,
+            key_field TEXT NOT NULL,
+            record_key TEXT NOT NULL,
+            payload TEXT,
+            processed_at REAL NOT NULL,
+            PRIMARY KEY (titulo, key_field, record_key)
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_records_at ON processed_records (processed_at)")
+
+    def _migrate_legacy_json(self) -> None:
+        """Importa uma única vez o antigo data/processed_records.json e o renomeia para .migrated."""
         if not os.path.exists(self.storage_file):
-            with open(self.storage_file, 'w') as f:
-                json.dump({}, f)
-    
-    def get_processed_data(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Recupera os dados já processados, agrupados por empresa/título."""
+            return
         try:
             with open(self.storage_file, 'r') as f:
                 data = json.load(f)
-                if isinstance(data, list):
-                    grouped = {}
-                    for rec in data:
-                        titulo = rec.get('titulo', 'OUTROS')
-                        grouped.setdefault(titulo, []).append(rec)
-                    return grouped
-                return data
-        except (json.JSONDecodeError, FileNotFoundError) as e:
+        except (json.JSONDecodeError, OSError) as e:
+            logging.error(f"Erro ao ler arquivo legado de registros processados: {e}")
+            return
+
+        if isinstance(data, list):
+            grouped = {}
+            for rec in data:
+                grouped.setdefault(rec.get('titulo', 'OUTROS'), []).append(rec)
+            data = grouped
+
+        if not self.save_processed_data(data):
+            # Mantém o arquivo legado para tentar de novo na próxima inicialização.
+            logging.error(f"Migração de {self.storage_file} não concluída; arquivo legado mantido")
+            return
+        migrated_file = f"{self.storage_file}.migrated"
+        try:
+            os.replace(self.storage_file, migrated_file)
+        except OSError as e:
+            # Outro processo (API ou agendador) pode ter concluído a migração ao mesmo tempo.
+            logging.warning(f"Arquivo legado já movido por outro processo: {e}")
+            return
+        total = sum(len(records) for records in data.values())
+        logging.info(f"{total} registros migrados de {self.storage_file} (original mantido em {migrated_file})")
+
+    def get_processed_data(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Recupera os dados já processados, agrupados por empresa/título."""
+        grouped = {}
+        try:
+            rows = self._get_connection().execute(
+                "SELECT titulo, payload FROM processed_records ORDER BY processed_at"
+            ).fetchall()
+        except Exception as e:
             logging.error(f"Erro ao ler dados processados: {e}")
             return {}
-    
-    def save_processed_data(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
-        """Salva os dados processados agrupados por empresa/título."""
+        for row in rows:
+            grouped.setdefault(row['titulo'], []).append(json.loads(row['payload']) if row['payload'] else {})
+        return grouped
+
+    def save_processed_data(self, data: Dict[str, List[Dict[str, Any]]], key_field: str = 'id') -> bool:
+        """
+        Grava em lote os registros agrupados por empresa/título (registros já existentes são mantidos).
+        Retorna False se a transação não foi confirmada.
+        """
+        now = time.time()
+        rows = []
+        for titulo, registros in data.items():
+            for record in registros:
+                if record.get(key_field) is None:
+                    continue
+                processed_at = now
+                if record.get('data_processamento'):
+                    try:
+                        processed_at = datetime.fromisoformat(record['data_processamento']).timestamp()
+                    except (TypeError, ValueError):
+                        pass
+                rows.append((titulo, key_field, str(record.get(key_field)), json.dumps(record, default=str), processed_at))
+        conn = self._get_connection()
         try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            conn.execute("BEGIN")
+            conn.executemany("""
+            INSERT OR IGNORE INTO processed_records (titulo, key_field, record_key, payload, processed_at)
+            VALUES (?, ?, ?, ?, ?)
+            """, rows)
+            conn.execute("COMMIT")
+            return True
         except Exception as e:
             logging.error(f"Erro ao salvar dados processados: {e}")
-    
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            return False
+
     def is_record_processed(self, record: Dict[str, Any], key_field: str) -> bool:
         """
         Verifica se um registro já foi processado com base em um campo chave.
-        Agora busca dentro do array do título correspondente.
+        Consulta direta pela chave primária do título correspondente.
         """
-        processed_data = self.get_processed_data()
         titulo = record.get('titulo', 'OUTROS')
-        registros = processed_data.get(titulo, [])
-        for processed_record in registros:
-            if processed_record.get(key_field) == record.get(key_field):
-                return True
-        return False
-    
+        try:
+            row = self._get_connection().execute("""
+            SELECT 1 FROM processed_records
+            WHERE titulo = ? AND key_field = ? AND record_key = ?
+            """, (titulo, key_field, str(record.get(key_field)))).fetchone()
+            return row is not None
+        except Exception as e:
+            logging.error(f"Erro ao consultar registro processado: {e}")
+            return False
+
     def mark_as_processed(self, record: Dict[str, Any], key_field: str = 'id') -> None:
         """
         Marca um registro como processado, agrupando por título.
         """
-        processed_data = self.get_processed_data()
         titulo = record.get('titulo', 'OUTROS')
-        if titulo not in processed_data:
-            processed_data[titulo] = []
-        for existing in processed_data[titulo]:
-            if existing.get(key_field) == record.get(key_field):
-                return  
-        processed_data[titulo].append(record)
-        self.save_processed_data(processed_data) 
\ No newline at end of file
+        try:
+            self._get_connection().execute("""
+            INSERT OR IGNORE INTO processed_records (titulo, key_field, record_key, payload, processed_at)
+            VALUES (?, ?, ?, ?, ?)
+            """, (titulo, key_field, str(record.get(key_field)), json.dumps(record, default=str), time.time()))
+        except Exception as e:
+            logging.error(f"Erro ao marcar registro como processado: {e}")
+
+    def compact(self) -> int:
+        """Remove registros mais antigos que o período de retenção."""
+        if not self.retention_days:
+            return 0
+        try:
+            cursor = self._get_connection().execute(
+                "DELETE FROM processed_records WHERE processed_at < ?",
+                (time.time() - self.retention_days * 86400,)
+            )
+            if cursor.rowcount:
+                logging.info(f"{cursor.rowcount} registros processados antigos removidos")
+            return cursor.rowcount
+        except Exception as e:
+            logging.error(f"Erro ao compactar registros processados: {e}")
+            return 0
@@ -0,0 +1,72 @@
+import re
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+# Aceita "17/10", "17-10", "17/10/2025", "17-10-25", com ou sem espaços entre as partes.
+# Só dia e mês importam: as abas são mensais e o ano na célula é opcional.
+_DATE_PATTERN = re.compile(r'^\s*(\d{1,2})\s*[/-]\s*(\d{1,2})\s*(?:[/-].*)?$')
+
+DayMonth = Tuple[int, int]
+DateTarget = Union[str, date, datetime, DayMonth]
+
+
+def parse_day_month(value: Any) -> Optional[DayMonth]:
+    """Normaliza o valor de uma célula de data para (dia, mês). Retorna None se não for uma data."""
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.day, value.month
+    match = _DATE_PATTERN.match(str(value))
+    if not match:
+        return None
+    day, month = int(match.group(1)), int(match.group(2))
+    if not (1 <= day <= 31 and 1 <= month <= 12):
+        return None
+    return day, month
+
+
+def _to_day_month(target: DateTarget) -> Optional[DayMonth]:
+    if isinstance(target, tuple):
+        return target
+    return parse_day_month(target)
+
+
+def _cell(record: Any, key: Union[str, int]) -> Any:
+    if isinstance(record, dict):
+        return record.get(key)
+    try:
+        return record[key]
+    except (IndexError, KeyError, TypeError):
+        return None
+
+
+class DateIndex:
+    """
+    Índice (dia, mês) -> registro de uma aba, montado em uma única passada.
+    Quando a mesma data aparece em mais de uma linha, vale a última (mesmo
+    resultado da antiga busca de trás para frente).
+    """
+
+    def __init__(self, records: Iterable[Any], key: Union[str, int] = 'Data'):
+        self._index: Dict[DayMonth, Any] = {}
+        for record in records:
+            day_month = parse_day_month(_cell(record, key))
+            if day_month is not None:
+                self._index[day_month] = record
+
+    def find(self, target: DateTarget) -> Optional[Any]:
+        day_month = _to_day_month(target)
+        if day_month is None:
+            return None
+        return self._index.get(day_month)
+
+    def __contains__(self, target: DateTarget) -> bool:
+        return self.find(target) is not None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def find_record_for_date(records: Iterable[Any], target: DateTarget, key: Union[str, int] = 'Data') -> Optional[Any]:
+    """Atalho para uma consulta única; para várias datas na mesma aba, reutilize um DateIndex."""
+    return DateIndex(records, key).find(target)
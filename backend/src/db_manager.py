@@ -7,13 +7,68 @@ import logging
 from typing import Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
 import threading
+from datetime import datetime
 
 load_dotenv()
 
+# Prefixo dos logs de resumo consolidado de squad (ex.: "[SQUAD] Squad A").
+SQUAD_LOG_PREFIX = '[SQUAD] '
+
+# Métricas tipadas de cada site por data e horário de execução.
+DAILY_METRICS_DDL = """
+CREATE TABLE IF NOT EXISTS daily_metrics (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    site_name VARCHAR(255) NOT NULL,
+    squad_name VARCHAR(255),
+    metric_date DATE NOT NULL,
+    slot CHAR(5) NOT NULL,
+    investimento DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    receita_real DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    receita_dolar DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    roas DECIMAL(10, 4),
+    mc DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_daily_metrics_site_date_slot (site_name, metric_date, slot),
+    KEY idx_daily_metrics_date_slot (metric_date, slot),
+    KEY idx_daily_metrics_squad_date (squad_name, metric_date, slot),
+    KEY idx_daily_metrics_date_site (metric_date, site_name)
+)
+"""
+
+# Horários do agendador (HH:MM, fuso de Brasília) e registro de cada execução.
+SCHEDULE_SLOTS_DDL = """
+CREATE TABLE IF NOT EXISTS schedule_slots (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    slot CHAR(5) NOT NULL,
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_schedule_slots_slot (slot)
+)
+"""
+
+SCHEDULER_RUNS_DDL = """
+CREATE TABLE IF NOT EXISTS scheduler_runs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    slot CHAR(5) NOT NULL,
+    scheduled_for DATETIME NOT NULL,
+    trigger_type VARCHAR(16) NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    started_at DATETIME NOT NULL,
+    finished_at DATETIME NULL,
+    error TEXT,
+    KEY idx_scheduler_runs_scheduled_for (scheduled_for),
+    KEY idx_scheduler_runs_status_finished (status, finished_at)
+)
+"""
+
+# Lock do MySQL que impede duas execuções do lote ao mesmo tempo (agendador e API).
+BATCH_RUN_LOCK = 'carga_slack_batch'
+
 class DBManager:
     
     _pool = None
     _pool_lock = threading.Lock()
+    _activity_writer = None
     
     def __init__(self, host=None, port=None, user=None, password=None, database=None):
         self.host = host or os.getenv('DB_HOST')
@@ -29,7 +84,7 @@ class DBManager:
                 if DBManager._pool is None:
                     DBManager._pool = pooling.MySQLConnectionPool(
                         pool_name="mypool",
-                        pool_size=10,
+                        pool_size=int(os.getenv('DB_POOL_SIZE', 10)),
                         pool_reset_session=True,
                         host=self.host,
                         port=self.port,
@@ -77,7 +132,8 @@ class DBManager:
                 sheet_url TEXT,
                 slack_channel_id INT,
                 status VARCHAR(20) DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                KEY idx_sites_status (status)
             )
             """)
             
@@ -111,7 +167,10 @@ class DBManager:
                 webhook_url TEXT
             )
             """)
-            
+
+
+            cursor.execute(DAILY_METRICS_DDL)
+
             conn.commit()
             cursor.close()
             
@@ -339,18 +398,7 @@ class DBManager:
             cursor.close()
             
             if result:
-                return {
-                    "sheet_url": result["sheet_url"],
-                    "indices": {
-                        "investimento": result["investimento_idx"],
-                        "receita": result["receita_idx"],
-                        "roas": result["roas_idx"],
-                        "mc": result["mc_idx"]
-                    },
-                    "slack_webhook_url": result["webhook_url"],
-                    "squad_name": result.get("squad_name"),
-                    "status": result["status"]
-                }
+                return self._row_to_config(result)
             
             return self.get_default_config()
             
@@ -361,6 +409,54 @@ class DBManager:
             if conn:
                 conn.close()
     
+    def _row_to_config(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "sheet_url": row["sheet_url"],
+            "indices": {
+                "investimento": row["investimento_idx"],
+                "receita": row["receita_idx"],
+                "roas": row["roas_idx"],
+                "mc": row["mc_idx"]
+            },
+            "slack_webhook_url": row["webhook_url"],
+            "squad_name": row.get("squad_name"),
+            "status": row["status"]
+        }
+
+    def get_active_site_configs(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Carrega em uma única consulta a configuração de todos os sites ativos
+        (índices, webhook e squad), indexada pelo nome do site.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return {}
+                
+            cursor = conn.cursor(dictionary=True)
+            
+            cursor.execute("""
+            SELECT s.name, s.sheet_url, c.investimento_idx, c.receita_idx, c.roas_idx, c.mc_idx, ch.webhook_url, ch.name as squad_name, s.status
+            FROM sites s
+            JOIN column_indices c ON s.id = c.site_id
+            LEFT JOIN slack_channels ch ON s.slack_channel_id = ch.id
+            WHERE s.status = 'active'
+            ORDER BY s.name
+            """)
+            
+            results = cursor.fetchall()
+            cursor.close()
+            
+            return {row["name"]: self._row_to_config(row) for row in results}
+            
+        except Error as e:
+            logging.error(f"Erro ao carregar configurações dos sites ativos: {e}")
+            return {}
+        finally:
+            if conn:
+                conn.close()
+
     def get_default_config(self) -> Dict[str, Any]:
         return {
             "sheet_url": "https://docs.google.com/spreadsheets/d/1tE7ZBhvsfUqcZNa4UnrrALrXOwRlc185a7iVPh_iv7g/edit?gid=1046712131",
@@ -583,7 +679,17 @@ class DBManager:
             if conn:
                 conn.close()
 
-    def log_activity(self, site_name: str, status: str, message: str) -> bool:
+    def log_activity(self, site_name: str, status: str, message: str,
+                     metric_date: Optional[str] = None, slot: Optional[str] = None) -> bool:
+        """
+        Registra um log de atividade. metric_date (YYYY-MM-DD) e slot (HH:MM) ligam o log
+        às linhas de daily_metrics da execução correspondente.
+        """
+        # Com o gravador em lote ativo, o registro entra no buffer e é gravado no próximo flush.
+        writer = DBManager._activity_writer
+        if writer is not None:
+            return writer.log_activity(site_name, status, message, metric_date, slot)
+
         conn = None
         try:
             conn = self._get_connection()
@@ -592,9 +698,9 @@ class DBManager:
                 
             cursor = conn.cursor()
             cursor.execute("""
-            INSERT INTO processing_logs (site_name, status, message)
-            VALUES (%s, %s, %s)
-            """, (site_name, status, message))
+            INSERT INTO processing_logs (site_name, status, message, metric_date, slot)
+            VALUES (%s, %s, %s, %s, %s)
+            """, (site_name, status, message, metric_date, slot))
             
             conn.commit()
             cursor.close()
@@ -607,7 +713,52 @@ class DBManager:
             if conn:
                 conn.close()
 
+    def insert_activity_logs(self, rows: List[Tuple[str, str, str, float, Optional[str], Optional[str]]]) -> bool:
+        """
+        Grava vários logs de atividade (site, status, mensagem, timestamp Unix, data, slot)
+        com um único executemany e um único commit.
+        """
+        if not rows:
+            return True
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.executemany("""
+            INSERT INTO processing_logs (site_name, status, message, created_at, metric_date, slot)
+            VALUES (%s, %s, %s, FROM_UNIXTIME(%s), %s, %s)
+            """, rows)
+
+            conn.commit()
+            cursor.close()
+            return True
+
+        except Error as e:
+            logging.error(f"Erro ao gravar logs de atividade em lote: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return False
+        finally:
+            if conn:
+                conn.close()
+
     def get_recent_logs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Logs mais recentes com as métricas da execução correspondente: as do próprio site
+        (linha de daily_metrics) ou, para os resumos "[SQUAD] nome", os totais do squad.
+        """
+        return self._query_logs("ORDER BY l.created_at DESC LIMIT %s", (limit,))
+
+    def get_logs_since(self, last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """Logs com id maior que last_id, em ordem de inserção (leitura incremental do stream)."""
+        return self._query_logs("WHERE l.id > %s ORDER BY l.id LIMIT %s", (last_id, limit))
+
+    def _query_logs(self, clause: str, params: Tuple) -> List[Dict[str, Any]]:
         conn = None
         try:
             conn = self._get_connection()
@@ -615,26 +766,472 @@ class DBManager:
                 return []
                 
             cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-            SELECT id, site_name, status, message, created_at
-            FROM processing_logs
-            ORDER BY created_at DESC
-            LIMIT %s
-            """, (limit,))
+            cursor.execute(f"""
+            SELECT l.id, l.site_name, l.status, l.message, l.created_at, l.metric_date, l.slot,
+                   m.investimento, m.receita_real, m.receita_dolar, m.roas, m.mc
+            FROM processing_logs l
+            LEFT JOIN daily_metrics m
+                ON m.site_name = l.site_name AND m.metric_date = l.metric_date AND m.slot = l.slot
+            {clause}
+            """, params)
             
             logs = cursor.fetchall()
+
+            squad_keys = {
+                (log['site_name'][len(SQUAD_LOG_PREFIX):], log['metric_date'], log['slot'])
+                for log in logs
+                if log['site_name'].startswith(SQUAD_LOG_PREFIX) and log['metric_date'] and log['slot']
+            }
+            squad_totals = {}
+            if squad_keys:
+                placeholders = ", ".join(["(%s, %s, %s)"] * len(squad_keys))
+                cursor.execute(f"""
+                SELECT squad_name, metric_date, slot,
+                       SUM(investimento) AS investimento, SUM(receita_real) AS receita_real,
+                       SUM(receita_dolar) AS receita_dolar, SUM(mc) AS mc
+                FROM daily_metrics
+                WHERE (squad_name, metric_date, slot) IN ({placeholders})
+                GROUP BY squad_name, metric_date, slot
+                """, [value for key in squad_keys for value in key])
+                for row in cursor.fetchall():
+                    squad_totals[(row['squad_name'], row['metric_date'], row['slot'])] = row
             cursor.close()
             
 
             for log in logs:
+                if log['site_name'].startswith(SQUAD_LOG_PREFIX):
+                    totals = squad_totals.get((log['site_name'][len(SQUAD_LOG_PREFIX):], log['metric_date'], log['slot']))
+                    if totals:
+                        log.update({key: totals[key] for key in ('investimento', 'receita_real', 'receita_dolar', 'mc')})
+                        log['roas'] = _roas(totals)
+                self._normalize_metric_row(log)
                 if log['created_at']:
                     log['created_at'] = log['created_at'].isoformat()
             
             return logs
             
         except Error as e:
-            logging.error(f"Erro ao buscar logs recentes: {e}")
+            logging.error(f"Erro ao buscar logs: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def insert_daily_metrics(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Grava em lote as métricas de uma execução (um executemany, um commit).
+        Reprocessar o mesmo site/data/slot sobrescreve a linha existente.
+        """
+        if not rows:
+            return True
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.executemany("""
+            INSERT INTO daily_metrics
+                (site_name, squad_name, metric_date, slot, investimento, receita_real, receita_dolar, roas, mc)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                squad_name = VALUES(squad_name),
+                investimento = VALUES(investimento),
+                receita_real = VALUES(receita_real),
+                receita_dolar = VALUES(receita_dolar),
+                roas = VALUES(roas),
+                mc = VALUES(mc)
+            """, [
+                (row['site_name'], row.get('squad_name'), row['metric_date'], row['slot'],
+                 row['investimento'], row['receita_real'], row['receita_dolar'], row.get('roas'), row['mc'])
+                for row in rows
+            ])
+
+            conn.commit()
+            cursor.close()
+            return True
+
+        except Error as e:
+            logging.error(f"Erro ao gravar métricas diárias: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def get_daily_metrics(self, metric_date: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Métricas de cada site na data, usando o slot mais recente processado para o site,
+        ordenadas por MC (maior primeiro). Com `limit`, devolve apenas os N primeiros.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return []
+
+            query = """
+            SELECT m.site_name, m.squad_name, m.metric_date, m.slot,
+                   m.investimento, m.receita_real, m.receita_dolar, m.roas, m.mc
+            FROM daily_metrics m
+            JOIN (
+                SELECT site_name, MAX(slot) AS slot
+                FROM daily_metrics
+                WHERE metric_date = %s
+                GROUP BY site_name
+            ) latest ON latest.site_name = m.site_name AND latest.slot = m.slot
+            WHERE m.metric_date = %s
+            ORDER BY m.mc DESC
+            """
+            params = [metric_date, metric_date]
+            if limit:
+                query += " LIMIT %s"
+                params.append(limit)
+
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, tuple(params))
+
+            rows = cursor.fetchall()
+            cursor.close()
+            for row in rows:
+                self._normalize_metric_row(row)
+            return rows
+
+        except Error as e:
+            logging.error(f"Erro ao buscar métricas diárias: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def get_squad_metrics(self, metric_date: str) -> List[Dict[str, Any]]:
+        """Totais por squad na data, somando a linha mais recente de cada site."""
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return []
+
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT COALESCE(m.squad_name, 'Sem Squad') AS squad_name,
+                   COUNT(*) AS sites_count,
+                   SUM(m.investimento) AS investimento,
+                   SUM(m.receita_real) AS receita_real,
+                   SUM(m.receita_dolar) AS receita_dolar,
+                   SUM(m.mc) AS mc
+            FROM daily_metrics m
+            JOIN (
+                SELECT site_name, MAX(slot) AS slot
+                FROM daily_metrics
+                WHERE metric_date = %s
+                GROUP BY site_name
+            ) latest ON latest.site_name = m.site_name AND latest.slot = m.slot
+            WHERE m.metric_date = %s
+            GROUP BY COALESCE(m.squad_name, 'Sem Squad')
+            ORDER BY SUM(m.receita_real) + SUM(m.receita_dolar) DESC
+            """, (metric_date, metric_date))
+
+            rows = cursor.fetchall()
+            cursor.close()
+            for row in rows:
+                row['roas'] = _roas(row)
+                self._normalize_metric_row(row)
+            return rows
+
+        except Error as e:
+            logging.error(f"Erro ao buscar métricas por squad: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def acquire_run_lock(self, name: str = BATCH_RUN_LOCK, timeout: int = 0):
+        """
+        Obtém o lock nomeado do MySQL (GET_LOCK) em uma conexão dedicada, que fica reservada
+        até release_run_lock. Retorna a conexão, ou None se outro processo já tem o lock.
+        """
+        conn = self._get_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+            acquired = cursor.fetchone()[0] == 1
+            cursor.close()
+        except Error as e:
+            logging.error(f"Erro ao obter lock {name}: {e}")
+            acquired = False
+        if not acquired:
+            conn.close()
+            return None
+        return conn
+
+    def is_run_lock_free(self, name: str = BATCH_RUN_LOCK) -> Optional[bool]:
+        """Consulta o lock sem tomá-lo (IS_FREE_LOCK). Retorna None se o banco estiver inacessível."""
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return None
+            cursor = conn.cursor()
+            cursor.execute("SELECT IS_FREE_LOCK(%s)", (name,))
+            free = cursor.fetchone()[0] == 1
+            cursor.close()
+            return free
+        except Error as e:
+            logging.error(f"Erro ao consultar lock {name}: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def release_run_lock(self, conn, name: str = BATCH_RUN_LOCK) -> None:
+        if conn is None:
+            return
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            cursor.fetchone()
+            cursor.close()
+        except Error as e:
+            logging.error(f"Erro ao liberar lock {name}: {e}")
+        finally:
+            # Devolvida ao pool, a sessão é reiniciada e o lock liberado de qualquer forma.
+            conn.close()
+
+    def get_schedule_slots(self) -> Optional[List[str]]:
+        """Horários ativos do agendador (HH:MM), em ordem. None se a consulta falhar."""
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return None
+
+            cursor = conn.cursor()
+            cursor.execute("SELECT slot FROM schedule_slots WHERE enabled = TRUE ORDER BY slot")
+            slots = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            return slots
+
+        except Error as e:
+            logging.error(f"Erro ao buscar horários do agendador: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def start_scheduler_run(self, slot: str, scheduled_for: datetime, trigger_type: str,
+                            status: str = 'running') -> Optional[int]:
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return None
+
+            cursor = conn.cursor()
+            cursor.execute("""
+            INSERT INTO scheduler_runs (slot, scheduled_for, trigger_type, status, started_at)
+            VALUES (%s, %s, %s, %s, NOW())
+            """, (slot, scheduled_for, trigger_type, status))
+            run_id = cursor.lastrowid
+            conn.commit()
+            cursor.close()
+            return run_id
+
+        except Error as e:
+            logging.error(f"Erro ao registrar início da execução: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def finish_scheduler_run(self, run_id: Optional[int], status: str, error: Optional[str] = None) -> bool:
+        if run_id is None:
+            return False
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE scheduler_runs SET status = %s, finished_at = NOW(), error = %s WHERE id = %s
+            """, (status, error, run_id))
+            conn.commit()
+            cursor.close()
+            return True
+
+        except Error as e:
+            logging.error(f"Erro ao registrar fim da execução: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def get_last_scheduled_for(self) -> Optional[datetime]:
+        """Horário agendado mais recente já tratado pelo agendador (executado, em andamento ou pulado)."""
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return None
+
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(scheduled_for) FROM scheduler_runs WHERE trigger_type IN ('schedule', 'catchup')")
+            row = cursor.fetchone()
+            cursor.close()
+            return row[0] if row else None
+
+        except Error as e:
+            logging.error(f"Erro ao buscar última execução agendada: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def get_dashboard_stats(self, metric_date: str) -> Dict[str, Any]:
+        """
+        Contadores do dashboard em uma única ida ao banco, só com agregações sobre índices
+        (sites.status, daily_metrics (metric_date, site_name), scheduler_runs (status, finished_at)).
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return {}
+
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM sites) AS total_sites,
+                (SELECT COUNT(*) FROM sites WHERE status = 'active') AS active_sites,
+                (SELECT COUNT(*) FROM users) AS total_users,
+                (SELECT COUNT(DISTINCT site_name) FROM daily_metrics WHERE metric_date = %s) AS sites_with_data
+            """, (metric_date,))
+            stats = cursor.fetchone()
+
+            cursor.execute("""
+            SELECT slot, trigger_type, finished_at
+            FROM scheduler_runs
+            WHERE status = 'success'
+            ORDER BY finished_at DESC
+            LIMIT 1
+            """)
+            last_run = cursor.fetchone()
+            cursor.close()
+
+            stats = {key: int(value or 0) for key, value in stats.items()}
+            stats['inactive_sites'] = stats['total_sites'] - stats['active_sites']
+            if last_run and last_run['finished_at']:
+                last_run['finished_at'] = last_run['finished_at'].isoformat()
+            stats['last_successful_run'] = last_run
+            return stats
+
+        except Error as e:
+            logging.error(f"Erro ao calcular estatísticas do dashboard: {e}")
+            return {}
+        finally:
+            if conn:
+                conn.close()
+
+    def get_metrics_since(self, last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """Linhas de daily_metrics com id maior que last_id, em ordem de inserção."""
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return []
+
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT id, site_name, squad_name, metric_date, slot,
+                   investimento, receita_real, receita_dolar, roas, mc
+            FROM daily_metrics
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+            """, (last_id, limit))
+            rows = cursor.fetchall()
+            cursor.close()
+            for row in rows:
+                self._normalize_metric_row(row)
+            return rows
+
+        except Error as e:
+            logging.error(f"Erro ao buscar métricas novas: {e}")
             return []
         finally:
             if conn:
-                conn.close()
\ No newline at end of file
+                conn.close()
+
+    def get_stream_cursor(self) -> Optional[Tuple[int, int]]:
+        """Maiores ids de processing_logs e daily_metrics (ponto de partida do stream)."""
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return None
+
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT (SELECT COALESCE(MAX(id), 0) FROM processing_logs),
+                   (SELECT COALESCE(MAX(id), 0) FROM daily_metrics)
+            """)
+            row = cursor.fetchone()
+            cursor.close()
+            return int(row[0]), int(row[1])
+
+        except Error as e:
+            logging.error(f"Erro ao buscar cursor do stream: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def get_latest_scheduler_run(self) -> Optional[Dict[str, Any]]:
+        conn = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                return None
+
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT id, slot, scheduled_for, trigger_type, status, started_at, finished_at, error
+            FROM scheduler_runs
+            ORDER BY id DESC
+            LIMIT 1
+            """)
+            run = cursor.fetchone()
+            cursor.close()
+            if run:
+                for key in ('scheduled_for', 'started_at', 'finished_at'):
+                    if run[key] is not None:
+                        run[key] = run[key].isoformat()
+            return run
+
+        except Error as e:
+            logging.error(f"Erro ao buscar última execução do agendador: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def _normalize_metric_row(self, row: Dict[str, Any]) -> None:
+        for key in ('investimento', 'receita_real', 'receita_dolar', 'roas', 'mc'):
+            if row.get(key) is not None:
+                row[key] = float(row[key])
+        if row.get('metric_date') is not None:
+            row['metric_date'] = row['metric_date'].isoformat()
+
+
+def _roas(totals: Dict[str, Any]) -> float:
+    investimento = float(totals.get('investimento') or 0)
+    receita = float(totals.get('receita_real') or 0) + float(totals.get('receita_dolar') or 0)
+    return receita / investimento if investimento > 0 else 0.0
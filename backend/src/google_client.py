@@ -0,0 +1,96 @@
+import os
+import sys
+import logging
+import threading
+from typing import Optional
+from urllib.parse import urlparse
+
+import gspread
+from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import AuthorizedSession
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import get_sheets_rate_limiter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import GOOGLE_CREDS_PATH, GOOGLE_API_TIMEOUT, GOOGLE_HTTP_POOL_SIZE, GOOGLE_DRIVE_FILES_URL
+
+SCOPES = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+SHEETS_API_HOST = 'sheets.googleapis.com'
+
+_lock = threading.Lock()
+_credentials: Optional[Credentials] = None
+_client: Optional[gspread.Client] = None
+
+
+def get_credentials(creds_path: Optional[str] = None) -> Credentials:
+    """
+    Retorna as credenciais da conta de serviço, lidas do disco uma única vez por processo.
+    O token é renovado pela própria sessão autorizada apenas quando expira.
+    """
+    global _credentials
+    with _lock:
+        if _credentials is None:
+            path = creds_path or GOOGLE_CREDS_PATH
+            _credentials = Credentials.from_service_account_file(path, scopes=SCOPES)
+            logging.info(f"Credenciais do Google carregadas de {path}")
+        return _credentials
+
+
+class RateLimitedSession(AuthorizedSession):
+    """
+    Sessão autorizada que passa cada chamada à API do Sheets pelo limitador compartilhado
+    entre API e agendador, antes de a requisição sair. Um 429 zera o saldo do limitador.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        limiter = get_sheets_rate_limiter() if urlparse(url).hostname == SHEETS_API_HOST else None
+        if limiter is not None:
+            limiter.acquire()
+        response = super().request(method, url, *args, **kwargs)
+        if limiter is not None and response.status_code == 429:
+            logging.warning("429 da API do Sheets: aguardando reposição do limitador")
+            limiter.penalize()
+        return response
+
+
+def get_gspread_client(creds_path: Optional[str] = None) -> gspread.Client:
+    """
+    Retorna o cliente gspread compartilhado pelo processo (agendador e API).
+    A sessão HTTP é reaproveitada entre sites, mantendo as conexões keep-alive no pool.
+    """
+    global _client
+    creds = get_credentials(creds_path)
+    with _lock:
+        if _client is None:
+            session = RateLimitedSession(creds)
+            adapter = HTTPAdapter(pool_connections=GOOGLE_HTTP_POOL_SIZE, pool_maxsize=GOOGLE_HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            _client = gspread.Client(auth=creds, session=session)
+            _client.set_timeout(GOOGLE_API_TIMEOUT)
+            logging.info("Cliente gspread compartilhado inicializado")
+        return _client
+
+
+def fetch_modified_time(client: gspread.Client, file_id: str, files_url: str = GOOGLE_DRIVE_FILES_URL) -> Optional[str]:
+    """
+    Consulta leve ao Drive: retorna apenas o modifiedTime do arquivo (muda a cada edição da planilha).
+    A URL base é configurável para apontar a um servidor local nos testes.
+    """
+    response = client.request('get', f"{files_url.rstrip('/')}/{file_id}",
+                              params={'fields': 'modifiedTime', 'supportsAllDrives': True})
+    return response.json().get('modifiedTime')
+
+
+def reset_client() -> None:
+    """Descarta o cliente e as credenciais em cache (ex.: após trocar o arquivo da conta de serviço)."""
+    global _client, _credentials
+    with _lock:
+        if _client is not None:
+            _client.session.close()
+        _client = None
+        _credentials = None
@@ -1,38 +1,75 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import pandas as pd
+import json
 from typing import List, Dict, Any, Optional, Tuple
 import logging
+import os
+import sys
 import time
 import random
 
+from gspread.exceptions import APIError
+from gspread.urls import SPREADSHEET_URL, SPREADSHEET_VALUES_BATCH_URL
+from gspread.utils import absolute_range_name, extract_id_from_url, rowcol_to_a1
+
 from db_manager import DBManager
+from google_client import get_credentials, get_gspread_client, fetch_modified_time
+from sheet_metadata_cache import SheetMetadataCache
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SHEETS_WINDOWED_READS, SHEETS_ROW_WINDOW, SHEETS_ROW_MARGIN, SHEETS_REVISION_CHECK
+
+MESES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+
+def _columns_to_rows(columns: List[List[str]]) -> List[List[str]]:
+    """Converte a resposta em majorDimension=COLUMNS para linhas, preenchendo as lacunas."""
+    if not columns:
+        return []
+    total_rows = max(len(col) for col in columns)
+    return [[col[i] if i < len(col) else '' for col in columns] for i in range(total_rows)]
+
+
+def get_current_month_sheets(sheets: List[Dict[str, str]], current_month: int, current_year: int) -> List[Dict[str, str]]:
+    mes_vigente_sheets = []
+    for sheet in sheets:
+        sheet_name = sheet['name']
+        for mes in MESES:
+            if mes in sheet_name:
+                mes_num = MESES.index(mes) + 1
+                if mes_num == current_month and str(current_year) in sheet_name:
+                    mes_vigente_sheets.append(sheet)
+                break
+    return mes_vigente_sheets
 
-SCOPES = [
-    'https://spreadsheets.google.com/feeds',
-    'https://www.googleapis.com/auth/drive'
-]
 
 class GoogleSheetsProcessor:
-    def __init__(self, spreadsheet_url: str, site_name: str, creds_path: str = 'google_service_account.json', max_retries: int = 5):
+
+    def __init__(self, spreadsheet_url: str, site_name: str, creds_path: Optional[str] = None, max_retries: int = 5,
+                 site_config: Optional[Dict[str, Any]] = None):
         self.spreadsheet_url = spreadsheet_url
         self.creds_path = creds_path
         self.site_name = site_name
-        self.db_manager = DBManager()
-        self.db_manager.connect()
-        self.site_config = self.db_manager.get_site_config(site_name)
+        if site_config is None:
+            db_manager = DBManager()
+            db_manager.connect()
+            site_config = db_manager.get_site_config(site_name)
+        self.site_config = site_config
+        self.metadata_cache = SheetMetadataCache()
+        self._probed_modified_time = None
         
 
         last_error = None
         for attempt in range(max_retries):
             try:
-                self.creds = Credentials.from_service_account_file(
-                    self.creds_path, 
-                    scopes=SCOPES
-                )
-                self.gc = gspread.authorize(self.creds)
-                self.spreadsheet = self.gc.open_by_url(self.spreadsheet_url)
-                logging.info(f"Conexão com a planilha estabelecida: {self.spreadsheet.title}")
+                self.creds = get_credentials(self.creds_path)
+                self.gc = get_gspread_client(self.creds_path)
+                self.spreadsheet_id = extract_id_from_url(self.spreadsheet_url)
+                self._metadata = self._load_cached_metadata()
+                if self._metadata is None:
+                    self._metadata = self._fetch_metadata()
+                    logging.info(f"Conexão com a planilha estabelecida: {self._metadata['title']}")
+                else:
+                    logging.info(f"Metadados da planilha obtidos do cache: {self._metadata['title']}")
                 return  # Sucesso, sai do construtor
             except Exception as e:
                 last_error = e
@@ -63,91 +100,334 @@ class GoogleSheetsProcessor:
                 print(f"Erro ao conectar à planilha: {error_msg}")
                 raise Exception(error_msg)
 
+    @property
+    def spreadsheet_title(self) -> str:
+        return self._metadata['title']
+
+    def _load_cached_metadata(self) -> Optional[Dict[str, Any]]:
+        """
+        Usa os metadados em cache enquanto o TTL vale; vencido o TTL, uma consulta leve ao
+        modifiedTime do Drive basta para revalidá-los se a planilha não mudou. Com
+        SHEETS_REVISION_CHECK, a revisão é conferida em toda execução. Se a consulta falha,
+        vale só o TTL.
+        """
+        entry = self.metadata_cache.get(self.spreadsheet_url)
+        if not entry:
+            return None
+        fresh = self.metadata_cache.is_fresh(entry)
+        if entry['modified_time'] and (SHEETS_REVISION_CHECK or not fresh):
+            revision = self._current_revision()
+            if revision is not None:
+                if revision != entry['modified_time']:
+                    # Abas criadas ou renomeadas mudam a revisão: relê os metadados.
+                    return None
+                if not fresh:
+                    self.metadata_cache.touch(self.spreadsheet_url)
+                return entry['payload']
+        return entry['payload'] if fresh else None
+
+    def _fetch_modified_time(self) -> str:
+        return fetch_modified_time(self.gc, self.spreadsheet_id)
+
+    def _current_revision(self) -> Optional[str]:
+        """modifiedTime da planilha, consultado no máximo uma vez por instância."""
+        if self._probed_modified_time is None:
+            try:
+                self._probed_modified_time = self._fetch_modified_time()
+            except Exception as e:
+                logging.warning(f"Não foi possível verificar a revisão da planilha: {e}")
+        return self._probed_modified_time
+
+    def _fetch_metadata(self) -> Dict[str, Any]:
+        response = self.gc.request(
+            'get',
+            SPREADSHEET_URL % self.spreadsheet_id,
+            params={'fields': 'properties.title,sheets.properties(sheetId,title,index)'}
+        ).json()
+
+        worksheets = [
+            {'name': sheet['properties']['title'], 'id': str(sheet['properties']['sheetId'])}
+            for sheet in response.get('sheets', [])
+        ]
+        previous = self.metadata_cache.get(self.spreadsheet_url)
+        previous_layouts = previous['payload'].get('layouts', {}) if previous else {}
+        sheet_ids = {ws['id'] for ws in worksheets}
+
+        metadata = {
+            'title': response.get('properties', {}).get('title', ''),
+            'worksheets': worksheets,
+            'layouts': {gid: layout for gid, layout in previous_layouts.items() if gid in sheet_ids},
+            'month_tabs': {}
+        }
+
+        modified_time = self._probed_modified_time
+        if modified_time is None:
+            try:
+                modified_time = self._fetch_modified_time()
+            except Exception as e:
+                logging.warning(f"Não foi possível obter o modifiedTime da planilha: {e}")
+
+        self.metadata_cache.put(self.spreadsheet_url, metadata, modified_time)
+        return metadata
+
+    def _save_metadata(self) -> None:
+        self.metadata_cache.update_payload(self.spreadsheet_url, self._metadata)
+
+    def _get_worksheets(self) -> List[Dict[str, str]]:
+        return self._metadata['worksheets']
+
     def get_sheet_ids(self) -> List[Dict[str, str]]:
-        try:
-            sheets = []
-            for ws in self.spreadsheet.worksheets():
-                sheets.append({
-                    'name': ws.title,
-                    'id': str(ws.id)
-                })
-            logging.info(f"Abas encontradas via API: {sheets}")
-            return sheets
-        except Exception as e:
-            logging.error(f"Erro ao obter lista de abas: {e}")
-            return []
+        sheets = [dict(ws) for ws in self._get_worksheets()]
+        logging.info(f"Abas encontradas: {sheets}")
+        return sheets
+
+    def get_current_month_sheets(self, current_month: int, current_year: int) -> List[Dict[str, str]]:
+        month_key = f"{current_year}-{current_month:02d}"
+        cached_ids = self._metadata['month_tabs'].get(month_key)
+        if cached_ids is None:
+            sheets = get_current_month_sheets(self._get_worksheets(), current_month, current_year)
+            cached_ids = [sheet['id'] for sheet in sheets]
+            # Mês sem aba ainda (dia 1º, aba a criar) não vai para o cache: a próxima execução procura de novo.
+            if cached_ids:
+                self._metadata['month_tabs'][month_key] = cached_ids
+                self._save_metadata()
+        return [dict(ws) for ws in self._get_worksheets() if ws['id'] in cached_ids]
+
+    def _find_worksheet(self, sheet_id: Optional[str]) -> Optional[Dict[str, str]]:
+        for worksheet in self._get_worksheets():
+            if worksheet['id'] == str(sheet_id):
+                return worksheet
+        return None
 
     def read_data(self, sheet_id: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any], str]:
         try:
-            ws = None
-            for worksheet in self.spreadsheet.worksheets():
-                if str(worksheet.id) == str(sheet_id):
-                    ws = worksheet
-                    break
-                    
+            ws = self._find_worksheet(sheet_id)
             if ws is None:
                 logging.warning(f"Aba com GID {sheet_id} não encontrada.")
                 return [], {}, ""
             
-            data = ws.get_all_values()
-            if not data:
-                logging.warning(f"Nenhum dado encontrado na aba {ws.title}")
-                return [], {}, ws.title
-                
-            header_row_index = None
-            for i, row in enumerate(data):
-                if row and (row[0] == "Data" or "Data" in row):
-                    header_row_index = i
-                    break
+            results = self.read_sheets_batch([ws['id']], windowed=False)
+            return results.get(ws['id'], ([], {}, ws['name']))
             
+        except Exception as e:
+            logging.error(f"Erro ao ler dados da aba: {e}")
+            return [], {}, ""
 
-            if header_row_index is None:
-                header_row_index = 0
-            
+    def read_sheets_batch(self, sheet_ids: List[str], windowed: Optional[bool] = None) -> Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Any], str]]:
+        """
+        Lê várias abas em uma única chamada values:batchGet.
+        No modo janelado, abas com layout conhecido trazem apenas a linha de cabeçalho,
+        as colunas configuradas e as últimas linhas com dados; se o layout mudou,
+        a aba é relida por completo.
+        Erros da API (ex.: 429) são propagados para que o chamador aplique o backoff.
+        """
+        if windowed is None:
+            windowed = SHEETS_WINDOWED_READS
 
-            headers = data[header_row_index]
-            print("Cabeçalho lido:", headers)
+        worksheets = []
+        for sheet_id in sheet_ids:
+            ws = self._find_worksheet(sheet_id)
+            if ws is None:
+                logging.warning(f"Aba com GID {sheet_id} não encontrada.")
+                continue
+            worksheets.append(ws)
 
-            indices = self.site_config['indices']
-            investimento_idx = indices['investimento']
-            receita_idx = indices['receita']
-            try:
-                roas_idx = headers.index("ROAS")
-            except ValueError:
-                roas_idx = indices['roas']
-            try:
-                mc_idx = headers.index("MC")
-            except ValueError:
-                mc_idx = indices['mc']
-            
-            rows = data[header_row_index + 1:]
-            
-            rows = [row for row in rows if any(cell.strip() for cell in row)]
-            
-            records = []
-            for row in rows:
-                if len(row) > max(investimento_idx, receita_idx, roas_idx, mc_idx):  
-                    print(f"Linha lida: Data={row[0]}, Investimento={row[investimento_idx] if len(row) > investimento_idx else 'N/A'}, Receita={row[receita_idx] if len(row) > receita_idx else 'N/A'}, ROAS={row[roas_idx] if len(row) > roas_idx else 'N/A'}, MC={row[mc_idx] if len(row) > mc_idx else 'N/A'}")
-                    
-                    new_record = {
-                        'Data': row[0],
-                        'Investimento': row[investimento_idx] if len(row) > investimento_idx else '',
-                        'Receita': row[receita_idx] if len(row) > receita_idx else '',
-                        'ROAS Geral': row[roas_idx] if len(row) > roas_idx else '',
-                        'MC Geral': row[mc_idx] if len(row) > mc_idx else '',
-                    }
-                    records.append(new_record)
-            
-            cleaned_records = self._map_column_names(records)
-            
-            summary = self._extract_summary_data(records)
-            
-            logging.info(f"Dados lidos com sucesso da aba '{ws.title}': {len(cleaned_records)} registros")
-            return cleaned_records, summary, ws.title
+        if not worksheets:
+            return {}
+
+        requests = [(ws, self._get_layout(ws) if windowed else None) for ws in worksheets]
+        fetched, fallback = self._fetch_batch(requests)
+
+        if fallback:
+            logging.info(f"Layout alterado em {[ws['name'] for ws in fallback]}. Relendo as abas por completo.")
+            full_results, _ = self._fetch_batch([(ws, None) for ws in fallback])
+            fetched.update(full_results)
+
+        logging.info(f"Leitura em lote concluída: {len(fetched)} aba(s)")
+        return fetched
+
+    def _values_batch_get(self, ranges: List[str], params: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return self.gc.request(
+                'get',
+                SPREADSHEET_VALUES_BATCH_URL % self.spreadsheet_id,
+                params=dict(params, ranges=ranges)
+            ).json()
+        except APIError as e:
+            # Aba renomeada ou removida: o range deixa de existir e o cache fica obsoleto.
+            if e.response.status_code == 400:
+                self.metadata_cache.invalidate(self.spreadsheet_url)
+            raise
+
+    def _fetch_batch(self, requests: List[Tuple[Dict[str, str], Optional[Dict[str, Any]]]]) -> Tuple[Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Any], str]], List[Dict[str, str]]]:
+        ranges = []
+        spans = []
+        for ws, layout in requests:
+            if layout is None:
+                tab_ranges = [absolute_range_name(ws['name'])]
+            else:
+                tab_ranges = self._window_ranges(ws['name'], layout)
+            spans.append((ws, layout, len(ranges), len(tab_ranges)))
+            ranges.extend(tab_ranges)
+
+        response = self._values_batch_get(ranges, params={'majorDimension': 'COLUMNS'})
+        value_ranges = response.get('valueRanges', [])
+
+        results = {}
+        fallback = []
+        layouts_changed = False
+        for ws, layout, offset, count in spans:
+            chunk = [value_range.get('values', []) for value_range in value_ranges[offset:offset + count]]
+            if layout is None:
+                data = _columns_to_rows(chunk[0] if chunk else [])
+                layouts_changed |= self._remember_layout(ws, data)
+            else:
+                data = self._rebuild_window(layout, chunk)
+                if data is None:
+                    fallback.append(ws)
+                    continue
+                layouts_changed |= self._slide_layout(ws, layout, data)
+            results[ws['id']] = self._parse_values(data, ws['name'])
+
+        if layouts_changed:
+            self._save_metadata()
+
+        return results, fallback
+
+    def _get_layout(self, ws: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        return self._metadata['layouts'].get(ws['id'])
+
+    def _remember_layout(self, ws: Dict[str, str], data: List[List[str]]) -> bool:
+        if not data:
+            return False
+        header_row_index = self._find_header_row(data)
+        last_row_index = header_row_index
+        for i, row in enumerate(data):
+            if any(cell.strip() for cell in row):
+                last_row_index = i
+        self._metadata['layouts'][ws['id']] = {
+            'header_row': header_row_index,
+            'last_row': last_row_index,
+            'columns': self._resolve_columns(data[header_row_index])
+        }
+        return True
+
+    def _slide_layout(self, ws: Dict[str, str], layout: Dict[str, Any], data: List[List[str]]) -> bool:
+        """Avança a última linha conhecida quando a aba cresceu dentro da margem da janela."""
+        start, _ = self._window_bounds(layout)
+        last_offset = None
+        for i, row in enumerate(data[1:]):
+            if any(cell.strip() for cell in row):
+                last_offset = i
+        if last_offset is None:
+            return False
+        last_row_index = start - 1 + last_offset
+        if last_row_index == layout['last_row']:
+            return False
+        self._metadata['layouts'][ws['id']] = dict(layout, last_row=last_row_index)
+        return True
+
+    def _window_bounds(self, layout: Dict[str, Any]) -> Tuple[int, int]:
+        """Retorna as linhas (1-based, inclusivas) da janela lida no fim da aba."""
+        header_row = layout['header_row'] + 1
+        last_row = layout['last_row'] + 1
+        start = max(header_row + 1, last_row - SHEETS_ROW_WINDOW + 1)
+        end = last_row + SHEETS_ROW_MARGIN
+        return start, end
+
+    def _window_ranges(self, title: str, layout: Dict[str, Any]) -> List[str]:
+        header_row = layout['header_row'] + 1
+        start, end = self._window_bounds(layout)
+        ranges = [absolute_range_name(title, f"{header_row}:{header_row}")]
+        for col in layout['columns']:
+            ranges.append(absolute_range_name(title, f"{rowcol_to_a1(start, col + 1)}:{rowcol_to_a1(end, col + 1)}"))
+        return ranges
+
+    def _rebuild_window(self, layout: Dict[str, Any], chunk: List[List[List[str]]]) -> Optional[List[List[str]]]:
+        """
+        Remonta as linhas da janela a partir das colunas lidas.
+        Retorna None quando o cabeçalho mudou ou os dados ultrapassaram a janela.
+        """
+        if len(chunk) != len(layout['columns']) + 1:
+            return None
+
+        headers = [col[0] if col else '' for col in chunk[0]]
+        if "Data" not in headers or self._resolve_columns(headers) != layout['columns']:
+            return None
+
+        start, end = self._window_bounds(layout)
+        window_size = end - start + 1
+        width = max(len(headers), max(layout['columns']) + 1)
+        rows = [[''] * width for _ in range(window_size)]
+
+        for col, values in zip(layout['columns'], chunk[1:]):
+            column_values = values[0] if values else []
+            if len(column_values) >= window_size:
+                return None
+            for i, value in enumerate(column_values):
+                rows[i][col] = value
+
+        return [headers + [''] * (width - len(headers))] + rows
+
+    def _find_header_row(self, data: List[List[str]]) -> int:
+        for i, row in enumerate(data):
+            if row and (row[0] == "Data" or "Data" in row):
+                return i
+        return 0
+
+    def _resolve_indices(self, headers: List[str]) -> Tuple[int, int, int, int]:
+        indices = self.site_config['indices']
+        investimento_idx = indices['investimento']
+        receita_idx = indices['receita']
+        try:
+            roas_idx = headers.index("ROAS")
+        except ValueError:
+            roas_idx = indices['roas']
+        try:
+            mc_idx = headers.index("MC")
+        except ValueError:
+            mc_idx = indices['mc']
+        return investimento_idx, receita_idx, roas_idx, mc_idx
+
+    def _resolve_columns(self, headers: List[str]) -> List[int]:
+        return sorted({0, *self._resolve_indices(headers)})
+
+    def _parse_values(self, data: List[List[str]], title: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any], str]:
+        if not data:
+            logging.warning(f"Nenhum dado encontrado na aba {title}")
+            return [], {}, title
             
-        except Exception as e:
-            logging.error(f"Erro ao ler dados da aba: {e}")
-            return [], {}, ""
+        header_row_index = self._find_header_row(data)
+
+        headers = data[header_row_index]
+        print("Cabeçalho lido:", headers)
+
+        investimento_idx, receita_idx, roas_idx, mc_idx = self._resolve_indices(headers)
+        
+        rows = data[header_row_index + 1:]
+        
+        rows = [row for row in rows if any(cell.strip() for cell in row)]
+        
+        records = []
+        for row in rows:
+            if len(row) > max(investimento_idx, receita_idx, roas_idx, mc_idx):  
+                print(f"Linha lida: Data={row[0]}, Investimento={row[investimento_idx] if len(row) > investimento_idx else 'N/A'}, Receita={row[receita_idx] if len(row) > receita_idx else 'N/A'}, ROAS={row[roas_idx] if len(row) > roas_idx else 'N/A'}, MC={row[mc_idx] if len(row) > mc_idx else 'N/A'}")
+                
+                new_record = {
+                    'Data': row[0],
+                    'Investimento': row[investimento_idx] if len(row) > investimento_idx else '',
+                    'Receita': row[receita_idx] if len(row) > receita_idx else '',
+                    'ROAS Geral': row[roas_idx] if len(row) > roas_idx else '',
+                    'MC Geral': row[mc_idx] if len(row) > mc_idx else '',
+                }
+                records.append(new_record)
+        
+        cleaned_records = self._map_column_names(records)
+        
+        summary = self._extract_summary_data(records)
+        
+        logging.info(f"Dados lidos com sucesso da aba '{title}': {len(cleaned_records)} registros")
+        return cleaned_records, summary, title
     
     def _map_column_names(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         if not records:
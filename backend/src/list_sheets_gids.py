@@ -1,8 +1,6 @@
-import gspread
-from google.oauth2.service_account import Credentials
+from google_client import get_gspread_client
 
-creds = Credentials.from_service_account_file('google_service_account.json')
-gc = gspread.authorize(creds)
+gc = get_gspread_client()
 
 SPREADSHEET_URL = 'https://docs.google.com/spreadsheets/d/1tE7ZBhvsfUqcZNa4UnrrALrXOwRlc185a7iVPh_iv7g/edit?pli=1&gid=1261087214#gid=1261087214'
 
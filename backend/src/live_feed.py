@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import time
+import queue
+import secrets
+import logging
+import threading
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from process_jobs import get_job_registry
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    LIVE_FEED_INTERVAL,
+    LIVE_FEED_BATCH_SIZE,
+    LIVE_FEED_BUFFER,
+    LIVE_FEED_HEARTBEAT,
+    LIVE_FEED_MAX_STREAMS,
+    LIVE_FEED_GAP_GRACE,
+    LIVE_FEED_TICKET_TTL
+)
+
+# Posição de um cliente no stream: (época do processo da API, número sequencial do evento).
+Cursor = Tuple[str, int]
+# (número sequencial do evento, nome do evento, dados)
+Event = Tuple[Optional[int], str, Dict[str, Any]]
+
+MAX_SUBSCRIBER_BACKLOG = 5000
+# Buracos maiores que isso entre dois ids lidos são saltos do auto_increment, não commits pendentes.
+MAX_TRACKED_GAP = 100
+
+
+class StreamLimitReached(Exception):
+    """Todas as vagas de stream estão ocupadas."""
+
+
+def parse_cursor(value: Optional[str]) -> Optional[Cursor]:
+    try:
+        epoch, seq = (value or '').split('-')
+        return epoch, int(seq)
+    except ValueError:
+        return None
+
+
+def format_sse(event: Event, epoch: str) -> str:
+    seq, name, data = event
+    lines = []
+    if seq is not None:
+        lines.append(f"id: {epoch}-{seq}")
+    lines.append(f"event: {name}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class TableCursor:
+    """
+    Posição de leitura incremental de uma tabela com id auto_increment. O id é reservado no
+    INSERT, mas transações concorrentes podem confirmar fora dessa ordem: um id menor que o
+    último lido ainda pode aparecer. Por isso a leitura recomeça da marca (`mark`), abaixo da
+    qual não há mais nada pendente; os ids acima dela já publicados ficam em `seen` e os
+    faltantes em `gaps`, até aparecerem ou até passar `grace` segundos (rollback, id perdido).
+    """
+
+    def __init__(self, mark: int, grace: float = LIVE_FEED_GAP_GRACE):
+        self.mark = mark
+        self.grace = grace
+        self.seen: Set[int] = set()
+        self.gaps: Dict[int, float] = {}
+        self._top = mark
+
+    def accept(self, rows: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Recebe as linhas com id > mark e retorna só as que ainda não foram publicadas."""
+        now = time.monotonic() if now is None else now
+        new_rows = []
+        previous = self.mark
+        for row in sorted(rows, key=lambda r: r['id']):
+            row_id = row['id']
+            if row_id > self._top:
+                low = max(previous, self._top)
+                if row_id - low - 1 <= MAX_TRACKED_GAP:
+                    for missing in range(low + 1, row_id):
+                        self.gaps.setdefault(missing, now)
+                self._top = row_id
+            previous = row_id
+            if row_id <= self.mark or row_id in self.seen:
+                continue
+            self.gaps.pop(row_id, None)
+            self.seen.add(row_id)
+            new_rows.append(row)
+        self._advance(now)
+        return new_rows
+
+    def _advance(self, now: float) -> None:
+        for pending in sorted(self.seen | set(self.gaps)):
+            if pending in self.seen:
+                self.seen.discard(pending)
+            elif now - self.gaps[pending] >= self.grace:
+                del self.gaps[pending]
+            else:
+                self.mark = pending - 1
+                return
+        self.mark = self._top
+
+
+class LiveFeed:
+    """
+    Leitor único das novidades do banco para todos os dashboards conectados por SSE.
+    A cada intervalo, e só enquanto houver inscritos, faz uma consulta incremental
+    (TableCursor) em processing_logs e daily_metrics, verifica a última execução do
+    agendador e o processamento manual em andamento, e distribui os eventos para a
+    fila de cada conexão. Cada evento recebe um número sequencial (com a época do
+    processo) e os recentes ficam em memória para que um cliente que reconecta com
+    Last-Event-ID receba o que perdeu. Cada conexão ocupa uma thread do
+    servidor, por isso o número de streams simultâneos é limitado a max_streams.
+    """
+
+    def __init__(self, db, interval: float = LIVE_FEED_INTERVAL, batch_size: int = LIVE_FEED_BATCH_SIZE,
+                 buffer_size: int = LIVE_FEED_BUFFER, max_streams: int = LIVE_FEED_MAX_STREAMS):
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_streams = max_streams
+        self._recent: Deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: Set['queue.Queue[Event]'] = set()
+        self._lock = threading.Lock()
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        # Último evento que já saiu do buffer; quem parou antes dele precisa recarregar.
+        self._floor = 0
+        self._logs: Optional[TableCursor] = None
+        self._metrics: Optional[TableCursor] = None
+        self._last_run: Optional[Tuple[Any, Any]] = None
+        self._last_job: Optional[Tuple[str, str, int]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def cursor(self) -> Cursor:
+        return self.epoch, self._seq
+
+    def _start(self) -> bool:
+        """Posiciona a leitura no fim das tabelas na primeira vez. Retorna False sem banco."""
+        if self._logs is None:
+            start = self.db.get_stream_cursor()
+            if start is None:
+                return False
+            self._logs, self._metrics = TableCursor(start[0]), TableCursor(start[1])
+        return True
+
+    def subscribe(self, last_cursor: Optional[Cursor] = None) -> 'queue.Queue[Event]':
+        """
+        Registra uma conexão; com last_cursor, enfileira antes os eventos perdidos.
+        Levanta StreamLimitReached quando já há max_streams conexões.
+        """
+        subscriber: 'queue.Queue[Event]' = queue.Queue(maxsize=MAX_SUBSCRIBER_BACKLOG)
+        with self._lock:
+            if len(self._subscribers) >= self.max_streams:
+                raise StreamLimitReached()
+            self._start()
+            if last_cursor is not None and last_cursor != self.cursor:
+                epoch, seq = last_cursor
+                if epoch != self.epoch or seq < self._floor or seq > self._seq:
+                    # Eventos perdidos já saíram do buffer (ou são de antes de a API reiniciar): recarregar tudo.
+                    subscriber.put((self._seq, 'reset', {}))
+                else:
+                    for event in self._recent:
+                        if event[0] > seq:
+                            subscriber.put(event)
+            subscriber.put((self._seq, 'ready', {'cursor': f"{self.epoch}-{self._seq}"}))
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='live-feed', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: 'queue.Queue[Event]') -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def is_subscribed(self, subscriber: 'queue.Queue[Event]') -> bool:
+        with self._lock:
+            return subscriber in self._subscribers
+
+    def _publish(self, name: str, data: Dict[str, Any], replayable: bool = True) -> None:
+        event: Event = (None, name, data)
+        if replayable:
+            self._seq += 1
+            event = (self._seq, name, data)
+            if len(self._recent) == self._recent.maxlen:
+                self._floor = self._recent[0][0]
+            self._recent.append(event)
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # Conexão parada (aba em segundo plano, rede lenta): ela deixa de receber.
+                self._subscribers.discard(subscriber)
+                logging.warning("[LiveFeed] Conexão removida por excesso de eventos pendentes")
+
+    def _loop(self) -> None:
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error(f"[LiveFeed] Erro ao consultar novidades: {e}")
+            time.sleep(self.interval)
+
+    def poll(self) -> None:
+        """Uma rodada de leitura incremental; os eventos vão para todos os inscritos."""
+        with self._lock:
+            if not self._start():
+                return
+        events = []
+
+        for log in self._logs.accept(self.db.get_logs_since(self._logs.mark, self.batch_size)):
+            events.append(('log', log, True))
+        for row in self._metrics.accept(self.db.get_metrics_since(self._metrics.mark, self.batch_size)):
+            events.append(('metric', row, True))
+
+        run = self.db.get_latest_scheduler_run()
+        if run is not None and (run['id'], run['status']) != self._last_run:
+            if self._last_run is not None:
+                events.append(('run', run, False))
+            self._last_run = (run['id'], run['status'])
+
+        job_event = self._job_event()
+        if job_event is not None:
+            events.append(('job', job_event, False))
+
+        with self._lock:
+            for name, data, replayable in events:
+                self._publish(name, data, replayable)
+
+    def _job_event(self) -> Optional[Dict[str, Any]]:
+        registry = get_job_registry()
+        job = registry.get_active()
+        if job is None and self._last_job is not None:
+            # O job acabou desde a última rodada: publica o estado final.
+            job = registry.get(self._last_job[0])
+        if job is None:
+            return None
+        data = job.to_dict(include_sites=False)
+        state = (data['id'], data['status'], data['done'])
+        if state == self._last_job:
+            return None
+        self._last_job = None if data['finished_at'] else state
+        return data
+
+    def stream(self, subscriber: 'queue.Queue[Event]', heartbeat: float = LIVE_FEED_HEARTBEAT) -> Iterator[str]:
+        """Gerador da resposta SSE de uma conexão já registrada com subscribe."""
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n"
+            while True:
+                try:
+                    event = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    if not self.is_subscribed(subscriber):
+                        # Removida por atraso: o cliente reconecta e recarrega.
+                        yield format_sse((None, 'reset', {}), self.epoch)
+                        return
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event, self.epoch)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+class StreamTickets:
+    """
+    Tickets de uso único para abrir o stream. O EventSource não envia cabeçalhos, então a
+    credencial vai na URL: em vez do token de sessão (que ficaria nos logs de acesso), o
+    dashboard troca o token por um ticket aleatório que vale por poucos segundos e uma conexão.
+    """
+
+    def __init__(self, ttl_seconds: float = LIVE_FEED_TICKET_TTL):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # ticket -> (expira em, usuário)
+        self._tickets: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def issue(self, user: Dict[str, Any]) -> str:
+        ticket = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            for expired in [key for key, (expires_at, _) in self._tickets.items() if expires_at <= now]:
+                del self._tickets[expired]
+            self._tickets[ticket] = (now + self.ttl_seconds, user)
+        return ticket
+
+    def redeem(self, ticket: str) -> Optional[Dict[str, Any]]:
+        """Consome o ticket e retorna o usuário, ou None se não existe ou expirou."""
+        with self._lock:
+            entry = self._tickets.pop(ticket, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+_feed: Optional[LiveFeed] = None
+_tickets: Optional[StreamTickets] = None
+_feed_lock = threading.Lock()
+
+
+def get_live_feed(db) -> LiveFeed:
+    global _feed
+    with _feed_lock:
+        if _feed is None:
+            _feed = LiveFeed(db)
+        return _feed
+
+
+def get_stream_tickets() -> StreamTickets:
+    global _tickets
+    with _feed_lock:
+        if _tickets is None:
+            _tickets = StreamTickets()
+        return _tickets
@@ -0,0 +1,45 @@
+import os
+import sys
+import sqlite3
+import logging
+import threading
+from typing import Dict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import LOCAL_DB_FILE
+
+
+class LocalStore:
+    """
+    Base para os armazenamentos locais em SQLite (diretório data/, compartilhado entre API e agendador).
+    Cada thread mantém a sua própria conexão; o modo WAL permite leituras concorrentes
+    enquanto outro processo escreve.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, db_file: str = LOCAL_DB_FILE):
+        self.db_file = db_file
+        db_dir = os.path.dirname(self.db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._create_tables()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        connections: Dict[str, sqlite3.Connection] = getattr(LocalStore._local, 'connections', None)
+        if connections is None:
+            connections = {}
+            LocalStore._local.connections = connections
+
+        conn = connections.get(self.db_file)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            connections[self.db_file] = conn
+            logging.debug(f"Conexão SQLite aberta: {self.db_file}")
+        return conn
+
+    def _create_tables(self) -> None:
+        pass
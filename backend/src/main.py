@@ -1,32 +1,45 @@
 import logging
 import sys
 import os
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
-import requests
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from datetime import datetime
 import time
 import pytz
 import random
 import argparse
 import traceback
-import schedule
-import re
-import schedule
-import time
-import pytz
-from datetime import datetime
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from google_sheets_processor import GoogleSheetsProcessor
-from db_manager import DBManager
+from db_manager import DBManager, SQUAD_LOG_PREFIX
 from data_manager import DataManager
+from slack_outbox import get_outbox, get_outbox_drainer
+from alerting import MCAlertBatch
+from activity_writer import get_activity_writer
+from dashboard_cache import mark_run_completed
+from date_index import DateIndex
+from currency import parse_currency
+from change_detection import RowHashStore, row_window_hash, restore_metrics
+from circuit_breaker import get_circuit_breaker, HALF_OPEN, OPEN
+import scheduler
+from process_jobs import ProcessJob
+from work_queue import BatchQueue, QueueWorker, run_claimed_job, worker_id, FAILED
 from config import (
-    GOOGLE_SHEETS_URL,
-    LOG_FILE
+    LOG_FILE,
+    BATCH_MAX_WORKERS,
+    SITE_TIMEOUT_SECONDS,
+    CHANGE_DETECTION_ENABLED,
+    SUMMARY_ALWAYS_POST_SLOTS,
+    BATCH_MODE,
+    QUEUE_POLL_INTERVAL,
+    QUEUE_RUN_TIMEOUT
 )
 
+
 def setup_logging():
     log_dir = os.path.dirname(LOG_FILE)
     if not os.path.exists(log_dir):
@@ -130,92 +143,39 @@ def get_mc_emoji(mc_value):
         logging.error(f"Erro ao processar MC: {e}, valor: {mc_value}")
         return ""
 
-def send_to_slack(message: str, webhook_url: str) -> bool:
-    logging.info(f"Enviando mensagem ao Slack: {message}")
-    try:
-        response = requests.post(
-            webhook_url,
-            json={"text": message},
-            headers={"Content-type": "application/json"}
-        )
-        logging.info(f"Resposta do Slack: status={response.status_code}, body={response.text}")
-        return response.status_code == 200
-    except Exception as e:
-        logging.error(f"Exceção ao enviar mensagem ao Slack: {e}")
-        return False
-
-def check_mc_alert(site_name: str, mc_value: float, db: DBManager) -> bool:
-    try:
-        logging.info(f"[ALERT CHECK] Verificando alerta para {site_name} com MC={mc_value}")
-        
-        if mc_value <= -100:
-            logging.info(f"[ALERT CHECK] MC {mc_value} <= -100, buscando canal Alert...")
-            
-            conn = db._get_connection()
-            if not conn:
-                logging.error("[ALERT CHECK] Não foi possível obter conexão do pool")
-                return False
-                
-            try:
-                cursor = conn.cursor(dictionary=True)
-                cursor.execute("SELECT webhook_url FROM slack_channels WHERE name = 'Alert'")
-                alert_channel = cursor.fetchone()
-                cursor.close()
-                
-                if alert_channel:
-                    webhook_url = alert_channel.get('webhook_url', '')
-                    logging.info(f"[ALERT CHECK] Canal Alert encontrado. Webhook configurado: {bool(webhook_url)}")
-                    
-                    if not webhook_url:
-                        logging.error("[ALERT CHECK] Canal Alert existe mas webhook_url está VAZIO!")
-                        return False
-                    
-                    alert_message = f":rotating_light: *{site_name}* :rotating_light:\n" \
-                                  f"MC: *R$ {mc_value:,.2f}*"
-                    
-                    success = send_to_slack(alert_message, webhook_url)
-                    if success:
-                        logging.info(f"[ALERT CHECK] ✅ Alerta enviado com sucesso para {site_name} com MC {mc_value}")
-                        return True
-                    else:
-                        logging.error(f"[ALERT CHECK] ❌ Falha ao enviar alerta para {site_name}")
-                        return False
-                else:
-                    logging.error("[ALERT CHECK] ❌ Canal 'Alert' NÃO encontrado no banco de dados")
-                    return False
-            finally:
-                conn.close()
-        else:
-            logging.debug(f"[ALERT CHECK] MC {mc_value} para {site_name} não requer alerta (> -100)")
-            return False
-            
-    except Exception as e:
-        logging.error(f"[ALERT CHECK] Erro ao verificar alerta MC para {site_name}: {e}")
-        return False
+def enqueue_slack_message(idempotency_key: str, message: str, webhook_url: str,
+                          log_site_name: Optional[str] = None, log_message: Optional[str] = None,
+                          log_metric_date: Optional[str] = None, log_slot: Optional[str] = None) -> bool:
+    """Grava a mensagem no outbox durável; a entrega fica a cargo do drenador em segundo plano."""
+    logging.info(f"Enfileirando mensagem ao Slack ({idempotency_key}): {message}")
+    enqueued = get_outbox().enqueue(idempotency_key, webhook_url, message, log_site_name, log_message,
+                                    log_metric_date, log_slot)
+    if enqueued:
+        get_outbox_drainer().wake()
+    return enqueued
 
+def ensure_slack_message(idempotency_key: str, message: str, webhook_url: str, **log_fields) -> bool:
+    """Como enqueue_slack_message, mas uma chave já enfileirada antes também conta como sucesso."""
+    return enqueue_slack_message(idempotency_key, message, webhook_url, **log_fields) or get_outbox().exists(idempotency_key)
 
 def get_current_date_str() -> str:
     """Retorna a data atual no formato DD/MM.""" 
     now = datetime.now()
     return f"{now.day:02d}/{now.month:02d}"
 
+def get_current_slot(db: Optional[DBManager] = None) -> str:
+    """Retorna o horário agendado mais recente (HH:MM) no fuso de Brasília."""
+    now = datetime.now(scheduler.TZ)
+    latest = scheduler.latest_due(now, scheduler.get_configured_slots(db))
+    return scheduler.format_slot(latest or now)
+
 def get_brasilia_time_str():
     tz = pytz.timezone('America/Sao_Paulo')
     now = datetime.now(tz)
     return now.strftime('%H:%M')
 
 def to_float(val):
-    if not val:
-        return 0.0
-    val = str(val)
-    match = re.search(r'-?\d+[\d.,]*', val.replace('R$', '').replace(' ', ''))
-    if not match:
-        return 0.0
-    num = match.group(0).replace('.', '').replace(',', '.')
-    try:
-        return float(num)
-    except:
-        return 0.0
+    return parse_currency(val)[0]
 
 def process_current_date_only(sheets_url: str, site_name: str) -> None:
     sheets_processor = GoogleSheetsProcessor(sheets_url, site_name=site_name)
@@ -224,6 +184,8 @@ def process_current_date_only(sheets_url: str, site_name: str) -> None:
     current_year = datetime.now().year
     db = DBManager()
     db.connect()
+    slot = get_current_slot()
+    alerts = MCAlertBatch(db, current_date, slot, scope=site_name)
     config = db.get_site_config(site_name)
     logging.info(f"DEBUG: config retornado para {site_name}: {config}")
     logging.info(f"DEBUG: webhook_url para {site_name}: {config.get('slack_webhook_url')}")
@@ -254,11 +216,7 @@ def process_current_date_only(sheets_url: str, site_name: str) -> None:
         if not aba_mes_vigente:
             continue
 
-        current_record = None
-        for r in reversed(records):
-            if r.get('Data') == current_date:
-                current_record = r
-                break
+        current_record = DateIndex(records).find(current_date)
 
         if not current_record:
             logging.warning(f"Nenhum registro encontrado para a data {current_date}")
@@ -273,7 +231,7 @@ def process_current_date_only(sheets_url: str, site_name: str) -> None:
         
 
         mc_float = to_float(mc_geral)
-        check_mc_alert(site_name, mc_float, db)
+        alerts.check(site_name, mc_float)
         
         investimento = clean_value(current_record.get('Investimento', '0,00'))
         receita = clean_value(current_record.get('Receita', '0,00'))
@@ -302,18 +260,19 @@ def process_current_date_only(sheets_url: str, site_name: str) -> None:
                 f"MC: {mc_str}"
             ]
             resumo_final = "\n".join(resumo_msg)
-            resumo_final = "\n".join(resumo_msg)
-            if send_to_slack(resumo_final, webhook_url):
-                db.log_activity(site_name, 'success', f"Resumo diário enviado: ROAS {roas_str}, MC {mc_str}")
-            else:
-                db.log_activity(site_name, 'error', "Falha ao enviar resumo para o Slack")
+            if not ensure_slack_message(f"site-summary:{site_name}:{current_date}:{slot}", resumo_final, webhook_url,
+                                        log_site_name=site_name,
+                                        log_message=f"Resumo diário enviado: ROAS {roas_str}, MC {mc_str}"):
+                db.log_activity(site_name, 'error', "Falha ao enfileirar resumo para o Slack")
         except Exception as e:
             logging.error(f"Erro ao calcular/enviar resumo do grupo: {e}")
-            send_to_slack(f"Erro ao enviar resumo: {e}", webhook_url)
+            enqueue_slack_message(f"site-error:{site_name}:{current_date}:{slot}", f"Erro ao enviar resumo: {e}", webhook_url)
             db.log_activity(site_name, 'error', f"Erro ao processar resumo: {str(e)}")
         
         break 
 
+    alerts.flush()
+
 def run_monitor(sheets_url: str, site_name: str, interval_seconds: int = 10):
     logging.info(f"Iniciando monitoramento da data atual com intervalo de {interval_seconds} segundos")
     db = DBManager()
@@ -323,10 +282,8 @@ def run_monitor(sheets_url: str, site_name: str, interval_seconds: int = 10):
             time.sleep(interval_seconds)
     except KeyboardInterrupt:
         logging.info("Monitoramento interrompido pelo usuário")
-        send_to_slack("Monitoramento interrompido")
     except Exception as e:
         logging.error(f"Erro durante o monitoramento: {e}")
-        send_to_slack(f"Erro no monitoramento: {str(e)}")
         db.log_activity(site_name, 'error', f"Erro no monitoramento: {str(e)}")
 
 def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
@@ -334,6 +291,8 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
     db.connect()
     sheets_processor = GoogleSheetsProcessor(sheets_url, site_name=site_name)
     data_manager = DataManager()
+    slot = get_current_slot()
+    alerts = MCAlertBatch(db, get_current_date_str(), slot, scope=site_name)
     stats = {
         'total_sheets': 0,
         'processadas': 0,
@@ -403,9 +362,8 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
             
             mensagens = format_slack_message_empresa(empresa, data, blocos)
             sucesso = True
-            for mensagem in mensagens:
-                logging.info(f"Preparando para enviar ao Slack: {mensagem}")
-                if not send_to_slack(mensagem, webhook_url): 
+            for index, mensagem in enumerate(mensagens):
+                if not ensure_slack_message(f"group:{registro_id}:{index}", mensagem, webhook_url):
                     sucesso = False
                     stats['falhas'] += 1
 
@@ -439,35 +397,7 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
                     if not aba_mes_vigente:
                         continue
                     logging.info(f"[DEBUG] Datas lidas na aba {pagina}: {[r.get('Data') for r in records]}")
-                    current_record = None
-                    for r in reversed(records):
-                        data_val = r.get('Data')
-                        if not data_val:
-                            continue
-                        data_val_str = str(data_val).strip()
-                        matched = False
-                        for fmt in ["%d/%m", "%d/%m/%Y", "%d/%m/%y", "%d-%m", "%d-%m-%Y", "%d-%m-%y"]:
-                            try:
-                                dt_val = datetime.strptime(re.sub(r'\\s+', '', data_val_str), fmt)
-                                dt_target = datetime.strptime(current_date, "%d/%m")
-                                if dt_val.day == dt_target.day and dt_val.month == dt_target.month:
-                                    matched = True
-                                    break
-                            except Exception:
-                                continue
-                        if not matched:
-                            try:
-                                parts = re.split(r'[/-]', data_val_str)
-                                if len(parts) >= 2:
-                                    d, m = int(parts[0]), int(parts[1])
-                                    dt_target = datetime.strptime(current_date, "%d/%m")
-                                    if d == dt_target.day and m == dt_target.month:
-                                        matched = True
-                            except Exception:
-                                pass
-                        if matched:
-                            current_record = r
-                            break
+                    current_record = DateIndex(records).find(current_date)
                     if not current_record:
                         continue
                     encontrou_registro = True
@@ -478,20 +408,20 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
                     logging.info(f"Valores encontrados para {site_name}: Investimento={investimento}, Receita={receita}, ROAS={roas_geral}, MC={mc_geral}")
                     
 
-                    mc_float = to_float(mc_geral)
-                    check_mc_alert(site_name, mc_float, db)
+                    mc_float, _ = parse_currency(mc_geral)
+                    alerts.check(site_name, mc_float)
                     
-                    is_dolar = is_dollar_value(receita)
+                    rec_float, is_dolar = parse_currency(receita)
                     logging.info(f"[DEBUG] Receita '{receita}' detectada como {'DÓLAR' if is_dolar else 'REAL'}")
                     
-                    site_investimento += to_float(investimento)
+                    site_investimento += parse_currency(investimento)[0]
                     if is_dolar:
-                        site_receita_dolar += to_float(receita)
+                        site_receita_dolar += rec_float
                     else:
-                        site_receita_real += to_float(receita)
-                    site_mc += to_float(mc_geral)
+                        site_receita_real += rec_float
+                    site_mc += mc_float
                     site_roas = roas_geral 
-                    roas_lidos.append(to_float(roas_geral))
+                    roas_lidos.append(parse_currency(roas_geral)[0])
                     
                 if site_investimento > 0 or site_receita_real > 0 or site_receita_dolar > 0 or encontrou_registro:
                     roas_geral_str = site_roas
@@ -541,14 +471,14 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
                         f"MC: {mc_str}"
                     ]
                     resumo_final = "\n".join(resumo_msg)
-                    send_to_slack(resumo_final, webhook_url)
+                    enqueue_slack_message(f"site-summary:{site_name}:{current_date}:{slot}", resumo_final, webhook_url)
                 except Exception as e:
-                    send_to_slack(f"Erro ao enviar resumo: {e}", webhook_url)
+                    enqueue_slack_message(f"site-error:{site_name}:{registro_id}", f"Erro ao enviar resumo: {e}", webhook_url)
                     db.log_activity(site_name, 'error', f"Erro ao enviar resumo: {e}")
 
             except Exception as e:
                 logging.error(f"Erro ao calcular/enviar resumo do grupo: {e}")
-                send_to_slack(f"Erro ao enviar resumo: {e}", webhook_url)
+                enqueue_slack_message(f"site-error:{site_name}:{registro_id}", f"Erro ao enviar resumo: {e}", webhook_url)
                 db.log_activity(site_name, 'error', f"Erro de processamento: {e}")
 
             if sucesso:
@@ -563,6 +493,7 @@ def process_all_sheets(sheets_url: str, site_name: str) -> Dict[str, int]:
                 db.log_activity(site_name, 'success', f"Dados processados e enviados para o Slack (Data: {data})")
                 stats['enviadas'] += 1
     
+    alerts.flush()
     logging.info(f"Processamento de todas as abas concluído: {stats}")
     return stats
 
@@ -571,242 +502,488 @@ def exponential_backoff(attempt, max_backoff=60):
     jitter = random.uniform(0, 0.1 * base_delay)  
     return base_delay + jitter
 
-def run_batch_processing():
+class SiteTimeoutError(Exception):
+    pass
+
+
+def _sleep_before_deadline(wait_time: float, deadline: float, site_name: str) -> None:
+    """Dorme o tempo de backoff, mas nunca além do prazo do site."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0 or wait_time >= remaining:
+        raise SiteTimeoutError(f"Tempo limite de processamento excedido para {site_name}")
+    time.sleep(wait_time)
+
+
+def new_site_result(site_name: str) -> Dict[str, Any]:
+    return {
+        'site_name': site_name,
+        'investimento': 0.0,
+        'receita_real': 0.0,
+        'receita_dolar': 0.0,
+        'mc': 0.0,
+        'roas': None,
+        'encontrou_registro': False,
+        'registros': 0,
+        'ok': False,
+        'error': None,
+        'row_hash': None,
+        'changed': True,
+        'skipped': False,
+        'elapsed': None
+    }
+
+
+def fetch_site_metrics(site_name: str, config: Dict[str, Any], current_date: str, current_month: int,
+                       current_year: int, db: DBManager, deadline: float, max_retries: int = 5,
+                       previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Lê e interpreta as abas do mês vigente de um site, acumulando os valores do dia.
+    Executado dentro do pool de workers ou por um worker da fila; os retries respeitam o prazo do site.
+    Se as linhas do dia têm o mesmo hash de `previous` (execução anterior), os valores
+    anteriores são reaproveitados e o resultado sai com changed=False.
+    """
+    result = new_site_result(site_name)
+    sheet_url = config['sheet_url'] if config and config.get('sheet_url') else None
+    if not sheet_url:
+        logging.warning(f"Site '{site_name}' sem sheet_url cadastrado! Pulando...")
+        result['error'] = 'Site sem sheet_url cadastrado'
+        return result
+
+    retry_count = 0
+    while retry_count < max_retries:
+        try:
+            logging.info(f"Processando site: {site_name} ({sheet_url})")
+            sheets_processor = GoogleSheetsProcessor(sheet_url, site_name=site_name, max_retries=max_retries,
+                                                     site_config=config)
+
+            sheets = sheets_processor.get_sheet_ids()
+            if not sheets:
+                logging.warning(f"Nenhuma aba encontrada para {site_name}")
+                result['ok'] = True
+                return result
+
+            mes_vigente_sheets = sheets_processor.get_current_month_sheets(current_month, current_year)
+            if not mes_vigente_sheets:
+                mes_vigente_sheets = [sheets[0]]
+                logging.info(f"Nenhuma aba do mês vigente encontrada para {site_name}. Usando a primeira aba.")
+
+            batch = None
+            read_retry = 0
+            while batch is None and read_retry < 3:
+                try:
+                    batch = sheets_processor.read_sheets_batch([sheet['id'] for sheet in mes_vigente_sheets])
+                except Exception as e:
+                    read_retry += 1
+                    if ('RATE_LIMIT_EXCEEDED' in str(e) or '429' in str(e)) and read_retry < 3:
+                        wait_time = exponential_backoff(read_retry, max_backoff=30)
+                        logging.warning(f"Rate limit ao ler dados de {site_name}. Aguardando {wait_time:.2f}s (tentativa {read_retry}/3)")
+                        _sleep_before_deadline(wait_time, deadline, site_name)
+                    else:
+                        # Esgotadas as tentativas, o erro segue para o retry externo; um lote vazio
+                        # aqui viraria um resultado "ok" com métricas zeradas.
+                        raise
+            if batch is None:
+                raise RuntimeError(f"Não foi possível ler as abas de {site_name}")
+
+            site_result = new_site_result(site_name)
+            current_rows = []
+            for sheet in mes_vigente_sheets:
+                records, summary, actual_name = batch.get(sheet['id'], ([], {}, ''))
+
+                if not records:
+                    logging.info(f"Nenhum registro encontrado na aba {sheet['name']} de {site_name}")
+                    continue
+
+                pagina = actual_name or sheet['name']
+
+                current_record = DateIndex(records).find(current_date)
+                if not current_record:
+                    logging.info(f"Nenhum registro encontrado para data {current_date} na aba {pagina} de {site_name}")
+                    continue
+                current_rows.append((pagina, current_record))
+
+            site_result['row_hash'] = row_window_hash(current_rows)
+            if previous is not None and previous['row_hash'] == site_result['row_hash']:
+                logging.info(f"Linha do dia de {site_name} sem alterações desde {previous['slot']}; reaproveitando valores")
+                restore_metrics(site_result, previous)
+                site_result['changed'] = False
+                site_result['ok'] = True
+                return site_result
+
+            for pagina, current_record in current_rows:
+                investimento, _ = parse_currency(current_record.get('Investimento'))
+                rec_float, is_dolar = parse_currency(current_record.get('Receita'))
+                roas_float, _ = parse_currency(current_record.get('ROAS Geral'))
+                mc_float, _ = parse_currency(current_record.get('MC Geral'))
+
+                site_result['investimento'] += investimento
+                if is_dolar:
+                    site_result['receita_dolar'] += rec_float
+                else:
+                    site_result['receita_real'] += rec_float
+                site_result['mc'] += mc_float
+                site_result['roas'] = roas_float
+                site_result['encontrou_registro'] = True
+                site_result['registros'] += 1
+
+            site_result['ok'] = True
+            return site_result
+
+        except SiteTimeoutError:
+            raise
+        except Exception as e:
+            retry_count += 1
+            result['error'] = str(e)
+            if retry_count >= max_retries:
+                break
+            wait_time = exponential_backoff(retry_count)
+            logging.info(f"Erro ao processar {site_name}. Tentativa {retry_count}/{max_retries}. Aguardando {wait_time:.2f}s. Erro: {e}")
+            _sleep_before_deadline(wait_time, deadline, site_name)
+
+    logging.error(f"Falha definitiva ao processar {site_name} após {max_retries} tentativas.")
+    db.log_activity(site_name, 'error', f"Falha definitiva no processamento: {result['error']}")
+    return result
+
+
+def send_squad_summary(webhook_url: str, squad_display_name: str, site_results: List[Dict[str, Any]], db: DBManager, slot: str,
+                       metric_date: Optional[str] = None) -> None:
+    squad_investimento = sum(r['investimento'] for r in site_results)
+    squad_receita_real = sum(r['receita_real'] for r in site_results)
+    squad_receita_dolar = sum(r['receita_dolar'] for r in site_results)
+    squad_mc = sum(r['mc'] for r in site_results)
+    squad_encontrou_registro = any(r['encontrou_registro'] for r in site_results)
+    squad_registros = sum(r['registros'] for r in site_results)
+
+    if not (squad_encontrou_registro and (squad_investimento > 0 or squad_receita_real > 0 or squad_receita_dolar > 0)):
+        return
+
+    try:
+        total_receita = squad_receita_real + squad_receita_dolar
+        roas_consolidado = total_receita / squad_investimento if squad_investimento > 0 else 0.0
+
+        investimento_str = f"R$ {squad_investimento:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+        receita_real_str = f"R$ {squad_receita_real:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+        receita_dolar_str = f"$ {squad_receita_dolar:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+        mc_str = f"R$ {squad_mc:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+        roas_str = f"{roas_consolidado:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+        if squad_receita_real > 0 and squad_receita_dolar > 0:
+            receita_display = f"Receita (R$): {receita_real_str}\nReceita ($): {receita_dolar_str}"
+        elif squad_receita_dolar > 0:
+            receita_display = f"Receita: {receita_dolar_str}"
+        else:
+            receita_display = f"Receita: {receita_real_str}"
+
+        resumo_msg = [
+            f"Investimento: {investimento_str}",
+            receita_display,
+            f"ROAS: {roas_str}",
+            f"MC: {mc_str}"
+        ]
+        resumo_final = "\n".join(resumo_msg)
+
+        summary_key = f"summary:{squad_display_name}:{get_current_date_str()}:{slot}"
+        enqueue_slack_message(
+            summary_key, resumo_final, webhook_url,
+            log_site_name=f"{SQUAD_LOG_PREFIX}{squad_display_name}",
+            log_message=f"Resumo consolidado enviado ({squad_registros} sites)",
+            log_metric_date=metric_date,
+            log_slot=slot
+        )
+        logging.info(f"Resumo consolidado enfileirado para squad ({squad_registros} sites): ROAS {roas_str}, MC {mc_str}")
+
+    except Exception as e:
+        logging.error(f"Erro ao calcular/enviar resumo consolidado: {e}")
+        enqueue_slack_message(f"summary-error:{squad_display_name}:{get_current_date_str()}:{slot}",
+                              f"Erro ao enviar resumo: {e}", webhook_url)
+        db.log_activity(f"{SQUAD_LOG_PREFIX}{squad_display_name}", 'error', f"Erro ao enviar resumo consolidado: {e}",
+                        metric_date, slot)
+
+
+def process_queue_job(job: Dict[str, Any], db: DBManager) -> Dict[str, Any]:
+    """Executa o job de um site da fila com os parâmetros gravados pelo coordenador."""
+    payload = job['payload']
+    site_name = job['site_name']
+    start = time.monotonic()
+    try:
+        result = fetch_site_metrics(site_name, payload['config'], payload['current_date'], payload['current_month'],
+                                    payload['current_year'], db, deadline=start + payload['site_timeout'],
+                                    max_retries=1 if payload['probe'] else 5, previous=payload['previous'])
+        result['elapsed'] = round(time.monotonic() - start, 2)
+        return result
+    except SiteTimeoutError as e:
+        logging.error(str(e))
+        db.log_activity(site_name, 'error', f"Tempo limite de processamento excedido ({payload['site_timeout']}s)")
+        result = new_site_result(site_name)
+        result['error'] = str(e)
+        return result
+
+
+def _run_local(db: DBManager, scheduled: List[Tuple[str, str, bool]],
+               fetch: Callable[[str, bool, float], Dict[str, Any]],
+               site_finished: Callable[[str, Dict[str, Any]], None], max_workers: int, site_timeout: float) -> None:
+    """Modo local: todos os sites processados por um pool de threads deste processo."""
+    started_at = {}
+
+    def worker(site_name: str, probe: bool) -> Dict[str, Any]:
+        start = time.monotonic()
+        started_at[site_name] = start
+        return fetch(site_name, probe, start + site_timeout)
+
+    logging.info(f"Processando {len(scheduled)} sites com até {max_workers} workers (timeout por site: {site_timeout}s)")
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='site-worker')
+    try:
+        future_to_site = {}
+        for site_name, webhook_url, probe in scheduled:
+            future = executor.submit(worker, site_name, probe)
+            future_to_site[future] = (site_name, webhook_url)
+
+        pending = set(future_to_site)
+        while pending:
+            done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                site_name, webhook_url = future_to_site[future]
+                try:
+                    result = future.result()
+                except SiteTimeoutError as e:
+                    logging.error(str(e))
+                    db.log_activity(site_name, 'error', f"Tempo limite de processamento excedido ({site_timeout}s)")
+                    result = new_site_result(site_name)
+                    result['error'] = str(e)
+                except Exception as e:
+                    logging.error(f"Erro inesperado ao processar {site_name}: {e}")
+                    db.log_activity(site_name, 'error', f"Falha definitiva no processamento: {str(e)}")
+                    result = new_site_result(site_name)
+                    result['error'] = str(e)
+                site_finished(webhook_url, result)
+
+            now = time.monotonic()
+            for future in list(pending):
+                site_name, webhook_url = future_to_site[future]
+                start = started_at.get(site_name)
+                if start is not None and now - start > site_timeout:
+                    # A thread não pode ser interrompida; o resultado tardio é descartado.
+                    pending.discard(future)
+                    future.cancel()
+                    logging.error(f"Site {site_name} excedeu o tempo limite de {site_timeout}s. Resultado descartado.")
+                    db.log_activity(site_name, 'error', f"Tempo limite de processamento excedido ({site_timeout}s)")
+                    result = new_site_result(site_name)
+                    result['error'] = 'timeout'
+                    site_finished(webhook_url, result)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_queued(db: DBManager, scheduled: List[Tuple[str, str, bool]], payloads: Dict[str, Dict[str, Any]],
+                site_finished: Callable[[str, Dict[str, Any]], None], run_timeout: float = QUEUE_RUN_TIMEOUT) -> None:
+    """
+    Modo fila: grava um job por site em batch_jobs e, enquanto os workers (--worker) e este
+    próprio processo executam os jobs, repassa cada resultado concluído a site_finished, que
+    envia o resumo do squad assim que o último site do webhook termina.
+    """
+    queue = BatchQueue(db)
+    run_key = f"{datetime.now():%Y-%m-%d %H:%M} {uuid.uuid4().hex[:12]}"
+    jobs = [{'site_name': site_name, 'webhook_url': webhook_url, 'payload': payloads[site_name]}
+            for site_name, webhook_url, _ in scheduled]
+    if not queue.enqueue(run_key, jobs):
+        raise RuntimeError(f"Não foi possível enfileirar os jobs da execução {run_key}")
+    logging.info(f"Execução {run_key}: {len(jobs)} jobs enfileirados em batch_jobs")
+
+    claimed_by = worker_id()
+    deadline = time.monotonic() + run_timeout
+    seen = set()
+    while len(seen) < len(jobs):
+        job = queue.claim(claimed_by, run_key)
+        if job is not None:
+            run_claimed_job(queue, job, lambda claimed: process_queue_job(claimed, db))
+        else:
+            abandoned = queue.fail_abandoned(run_key)
+            if abandoned:
+                logging.error(f"Execução {run_key}: {abandoned} job(s) sem worker após a última tentativa")
+
+        for row in queue.finished(run_key):
+            if row['site_name'] in seen:
+                continue
+            seen.add(row['site_name'])
+            result = new_site_result(row['site_name'])
+            result.update(row['result'] or {})
+            if row['status'] == FAILED:
+                db.log_activity(row['site_name'], 'error', f"Falha definitiva no processamento: {result['error']}")
+            site_finished(row['webhook_url'], result)
+
+        if job is None and len(seen) < len(jobs):
+            if time.monotonic() > deadline:
+                break
+            time.sleep(QUEUE_POLL_INTERVAL)
+
+    if len(seen) < len(jobs):
+        queue.expire(run_key)
+        logging.error(f"Execução {run_key}: {len(jobs) - len(seen)} job(s) não concluídos em {run_timeout}s")
+        for site_name, webhook_url, _ in scheduled:
+            if site_name in seen:
+                continue
+            db.log_activity(site_name, 'error', f"Tempo limite da execução excedido ({run_timeout}s)")
+            result = new_site_result(site_name)
+            result['error'] = 'timeout'
+            site_finished(webhook_url, result)
+
+    queue.purge()
+
+
+def run_batch_processing(max_workers: Optional[int] = None, site_timeout: Optional[float] = None,
+                         slot: Optional[str] = None, progress: Optional[ProcessJob] = None) -> bool:
+    """
+    Executa o lote segurando o lock do MySQL, para que agendador e API nunca processem ao
+    mesmo tempo. Retorna False, sem processar, se o lock não puder ser obtido.
+    `progress` recebe o início e o resultado de cada site (processamento manual pela API).
+    """
     db = DBManager()
     db.connect()
+    run_lock = db.acquire_run_lock()
+    if run_lock is None:
+        logging.warning("Lock de execução indisponível (outra execução em andamento ou banco inacessível). Execução ignorada.")
+        return False
+    try:
+        _run_batch(db, max_workers or BATCH_MAX_WORKERS, site_timeout or SITE_TIMEOUT_SECONDS, slot or get_current_slot(db),
+                   progress)
+        return True
+    finally:
+        db.release_run_lock(run_lock)
+
+
+def _run_batch(db: DBManager, max_workers: int, site_timeout: float, slot: str,
+               progress: Optional[ProcessJob] = None) -> None:
+    activity_writer = get_activity_writer(db)
+    get_outbox_drainer(db)
     
-    all_sites = db.get_all_sites()
-    logging.info(f"Iniciando processamento da data atual ({get_current_date_str()}) para todos os sites cadastrados...")
+    # Snapshot da configuração de todos os sites ativos, válido durante toda a execução.
+    active_configs = db.get_active_site_configs()
+    logging.info(f"Iniciando processamento da data atual ({get_current_date_str()}) para {len(active_configs)} sites ativos...")
     
 
     webhook_to_sites = {}
     webhook_to_squad_name = {}
-    for site_name in all_sites:
-        config = db.get_site_config(site_name)
-        if config.get('status') != 'active':
-            logging.info(f"Site '{site_name}' marcado como inativo. Pulando processamento.")
-            continue
-
+    site_configs = {}
+    for site_name, config in active_configs.items():
         webhook_url = config.get('slack_webhook_url')
         if not webhook_url:
             continue
         webhook_to_sites.setdefault(webhook_url, []).append(site_name)
+        site_configs[site_name] = config
 
         if webhook_url not in webhook_to_squad_name:
             webhook_to_squad_name[webhook_url] = config.get('squad_name') or site_name
-    
-
-    for webhook_url, sites in webhook_to_sites.items():
-
-        squad_investimento = 0.0
-        squad_receita_real = 0.0
-        squad_receita_dolar = 0.0
-        squad_mc = 0.0
-        squad_encontrou_registro = False
-        squad_sites_processados = []
-        
-        current_date = get_current_date_str()
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        
-
-        for site_name in sites:
-            retry_count = 0
-            max_retries = 5
-            site_processado = False
-            
-            while not site_processado and retry_count < max_retries:
-                try:
-                    config = db.get_site_config(site_name)
-                    sheet_url = config['sheet_url'] if config and config.get('sheet_url') else None
-                    if not sheet_url:
-                        print(f"Site '{site_name}' sem sheet_url cadastrado! Pulando...")
-                        break
-                    print(f"Processando site: {site_name} ({sheet_url})")
-                    sheets_processor = GoogleSheetsProcessor(sheet_url, site_name=site_name)
-                    
-                    sheets = None
-                    sheet_retry = 0
-                    while sheets is None and sheet_retry < 3:
-                        try:
-                            sheets = sheets_processor.get_sheet_ids()
-                            if not sheets:
-                                print(f"Nenhuma aba encontrada para {site_name}")
-                                break
-                        except Exception as e:
-                            sheet_retry += 1
-                            if 'RATE_LIMIT_EXCEEDED' in str(e) or '429' in str(e):
-                                wait_time = exponential_backoff(sheet_retry)
-                                print(f"Rate limit ao obter abas de {site_name}. Aguardando {wait_time:.2f}s (tentativa {sheet_retry}/3)")
-                                time.sleep(wait_time)
-                            else:
-                                raise
-                    
-                    if not sheets:
-                        break
-                    
-
-                    mes_vigente_sheets = []
-                    for sheet in sheets:
-                        sheet_name = sheet['name']
-                        for mes in ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]:
-                            if mes in sheet_name:
-                                mes_num = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"].index(mes) + 1
-                                if mes_num == current_month and str(current_year) in sheet_name:
-                                    mes_vigente_sheets.append(sheet)
-                                break
-                    
-                    if not mes_vigente_sheets and sheets:
-                        mes_vigente_sheets = [sheets[0]]
-                        print(f"Nenhuma aba do mês vigente encontrada para {site_name}. Usando a primeira aba.")
-                        
-                    for sheet in mes_vigente_sheets:
-                        sheet_id = sheet['id']
-
-                        records = None
-                        summary = None
-                        actual_name = None
-                        read_retry = 0
-                        while records is None and read_retry < 3:
-                            try:
-                                records, summary, actual_name = sheets_processor.read_data(sheet_id)
-                            except Exception as e:
-                                read_retry += 1
-                                if 'RATE_LIMIT_EXCEEDED' in str(e) or '429' in str(e):
-                                    wait_time = exponential_backoff(read_retry, max_backoff=30)
-                                    print(f"Rate limit ao ler dados de {site_name}, aba {sheet['name']}. Aguardando {wait_time:.2f}s (tentativa {read_retry}/3)")
-                                    time.sleep(wait_time)
-                                else:
-                                    logging.error(f"Erro ao ler dados de {site_name}, aba {sheet['name']}: {e}")
-                                    break
-                        
-                        if not records:
-                            print(f"Nenhum registro encontrado na aba {sheet['name']} de {site_name}")
-                            continue
-                            
-                        pagina = actual_name or sheet['name']
-                        
 
-                        current_record = None
-                        for r in reversed(records):
-                            data_val = r.get('Data')
-                            if not data_val:
-                                continue
-                            data_val_str = str(data_val).strip()
-                            matched = False
-                            if data_val_str == current_date:
-                                matched = True
-                            else:
-                                for fmt in ["%d/%m", "%d/%m/%Y", "%d/%m/%y", "%d-%m", "%d-%m-%Y", "%d-%m-%y"]:
-                                    try:
-                                        dt_val = datetime.strptime(re.sub(r'\s+', '', data_val_str), fmt)
-                                        dt_target = datetime.strptime(current_date, "%d/%m")
-                                        if dt_val.day == dt_target.day and dt_val.month == dt_target.month:
-                                            matched = True
-                                            break
-                                    except Exception:
-                                        continue
-                                if not matched:
-                                    try:
-                                        parts = re.split(r'[/-]', data_val_str)
-                                        if len(parts) >= 2:
-                                            d, m = int(parts[0]), int(parts[1])
-                                            dt_target = datetime.strptime(current_date, "%d/%m")
-                                            if d == dt_target.day and m == dt_target.month:
-                                                matched = True
-                                    except Exception:
-                                        pass
-                            if matched:
-                                current_record = r
-                                break
-                        
-                        if not current_record:
-                            print(f"Nenhum registro encontrado para data {current_date} na aba {pagina} de {site_name}")
-                            continue
-                        
+    current_date = get_current_date_str()
+    current_month = datetime.now().month
+    current_year = datetime.now().year
+    metric_date = datetime.now().date().isoformat()
+    alerts = MCAlertBatch(db, current_date, slot)
+    metric_rows = []
+    row_hashes = RowHashStore() if CHANGE_DETECTION_ENABLED else None
+    previous_snapshots = row_hashes.load(metric_date) if row_hashes else {}
+    always_post = slot in SUMMARY_ALWAYS_POST_SLOTS
+    if progress is not None:
+        progress.start(slot, list(site_configs))
 
-                        investimento = clean_value(current_record.get('Investimento', '0,00'))
-                        receita = clean_value(current_record.get('Receita', '0,00'))
-                        roas_geral = clean_value(current_record.get('ROAS Geral', '0,00'))
-                        mc_geral = clean_value(current_record.get('MC Geral', '0,00'))
-                        
+    pending_per_webhook = {webhook_url: len(sites) for webhook_url, sites in webhook_to_sites.items()}
+    results_per_webhook = {webhook_url: [] for webhook_url in webhook_to_sites}
 
-                        mc_float = to_float(mc_geral)
-                        check_mc_alert(site_name, mc_float, db)
-                        
-                        is_dolar = is_dollar_value(receita)
-                        
+    breaker = get_circuit_breaker()
 
-                        db.log_activity(site_name, 'success', f"Inv: {investimento} | Rec: {receita} | ROAS: {roas_geral} | MC: {mc_geral}")
-                        
+    def fetch(site_name: str, probe: bool, deadline: float) -> Dict[str, Any]:
+        start = time.monotonic()
+        # Site em teste (circuito meio aberto): uma única tentativa, sem retries.
+        result = fetch_site_metrics(site_name, site_configs[site_name], current_date, current_month,
+                                    current_year, db, deadline=deadline, max_retries=1 if probe else 5,
+                                    previous=previous_snapshots.get(site_name))
+        result['elapsed'] = round(time.monotonic() - start, 2)
+        return result
 
-                        inv_float = to_float(investimento)
-                        rec_float = to_float(receita)
-                        mc_individual = to_float(mc_geral)
-                        
-                        squad_investimento += inv_float
-                        if is_dolar:
-                            squad_receita_dolar += rec_float
-                        else:
-                            squad_receita_real += rec_float
-                        squad_mc += mc_individual
-                        squad_encontrou_registro = True
-                        squad_sites_processados.append(site_name)
-                    
-                    site_processado = True
+    def site_finished(webhook_url: str, result: Dict[str, Any]) -> None:
+        squad_name = webhook_to_squad_name.get(webhook_url, 'Squad')
+        if result['encontrou_registro']:
+            alerts.check(result['site_name'], result['mc'])
+        if result['ok']:
+            breaker.record_success(result['site_name'])
+        elif not result['skipped'] and breaker.record_failure(result['site_name'], result['error']) == OPEN:
+            db.log_activity(result['site_name'], 'error',
+                            "Circuito aberto: o site será ignorado até o próximo teste", metric_date, slot)
+        if not result['changed']:
+            if result['encontrou_registro']:
+                # Sem linha nova em daily_metrics: o log aponta para o horário em que os valores foram gravados.
+                previous_slot = previous_snapshots[result['site_name']]['slot']
+                db.log_activity(result['site_name'], 'info', f"Sem alterações desde {previous_slot}",
+                                metric_date, previous_slot)
+        elif result['encontrou_registro']:
+            metric_rows.append({
+                'site_name': result['site_name'],
+                'squad_name': squad_name,
+                'metric_date': metric_date,
+                'slot': slot,
+                'investimento': result['investimento'],
+                'receita_real': result['receita_real'],
+                'receita_dolar': result['receita_dolar'],
+                'roas': result['roas'],
+                'mc': result['mc']
+            })
+            db.log_activity(result['site_name'], 'success', f"Métricas lidas ({result['registros']} aba(s))",
+                            metric_date, slot)
 
-                except Exception as e:
-                    retry_count += 1
-                    wait_time = exponential_backoff(retry_count)
-                    logging.info(f"Erro ao processar {site_name}. Tentativa {retry_count}/{max_retries}. Aguardando {wait_time:.2f}s. Erro: {e}")
-                    time.sleep(wait_time)
-                    if retry_count >= max_retries:
-                        logging.error(f"Falha definitiva ao processar {site_name} após {max_retries} tentativas.")
-                        db.log_activity(site_name, 'error', f"Falha definitiva no processamento: {str(e)}")
-        
+        if progress is not None:
+            progress.site_finished(result)
+        results_per_webhook[webhook_url].append(result)
+        pending_per_webhook[webhook_url] -= 1
+        if pending_per_webhook[webhook_url] == 0:
+            site_results = results_per_webhook[webhook_url]
+            if always_post or any(r['ok'] and r['changed'] for r in site_results):
+                send_squad_summary(webhook_url, squad_name, site_results, db, slot, metric_date)
+            else:
+                logging.info(f"Nenhum site do squad {squad_name} mudou desde o último horário; resumo não enviado")
 
-        if squad_encontrou_registro and (squad_investimento > 0 or squad_receita_real > 0 or squad_receita_dolar > 0):
-            try:
+    scheduled = []
+    skipped = []
+    for webhook_url, sites in webhook_to_sites.items():
+        for site_name in sites:
+            decision = breaker.allow(site_name)
+            if decision is None:
+                skipped.append((site_name, webhook_url))
+            else:
+                scheduled.append((site_name, webhook_url, decision == HALF_OPEN))
 
-                total_receita = squad_receita_real + squad_receita_dolar
-                roas_consolidado = total_receita / squad_investimento if squad_investimento > 0 else 0.0
-                
-                investimento_str = f"R$ {squad_investimento:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                receita_real_str = f"R$ {squad_receita_real:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                receita_dolar_str = f"$ {squad_receita_dolar:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                mc_str = f"R$ {squad_mc:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                roas_str = f"{roas_consolidado:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                
+    if skipped:
+        logging.warning(f"{len(skipped)} site(s) ignorados com circuito aberto: {[name for name, _ in skipped]}")
+    for site_name, webhook_url in skipped:
+        result = new_site_result(site_name)
+        result['error'] = 'circuito aberto'
+        result['skipped'] = True
+        site_finished(webhook_url, result)
 
-                if squad_receita_real > 0 and squad_receita_dolar > 0:
-                    receita_display = f"Receita (R$): {receita_real_str}\nReceita ($): {receita_dolar_str}"
-                elif squad_receita_dolar > 0:
-                    receita_display = f"Receita: {receita_dolar_str}"
-                else:
-                    receita_display = f"Receita: {receita_real_str}"
-                
-                resumo_msg = [
-                    f"Investimento: {investimento_str}",
-                    receita_display,
-                    f"ROAS: {roas_str}",
-                    f"MC: {mc_str}"
-                ]
-                resumo_final = "\n".join(resumo_msg)
-                
-                if send_to_slack(resumo_final, webhook_url):
-                    logging.info(f"Resumo consolidado enviado para squad ({len(squad_sites_processados)} sites): ROAS {roas_str}, MC {mc_str}")
-                    squad_display_name = webhook_to_squad_name.get(webhook_url, 'Squad')
-                    db.log_activity(f"[SQUAD] {squad_display_name}", 'success', f"Resumo consolidado ({len(squad_sites_processados)} sites): ROAS {roas_str}, MC {mc_str}")
-                else:
-                    logging.error("Falha ao enviar resumo consolidado para o Slack")
-                    squad_display_name = webhook_to_squad_name.get(webhook_url, 'Squad')
-                    db.log_activity(f"[SQUAD] {squad_display_name}", 'error', "Falha ao enviar resumo consolidado para o Slack")
+    if BATCH_MODE == 'queue':
+        payloads = {
+            site_name: {
+                'config': site_configs[site_name],
+                'previous': previous_snapshots.get(site_name),
+                'probe': probe,
+                'current_date': current_date,
+                'current_month': current_month,
+                'current_year': current_year,
+                'site_timeout': site_timeout
+            }
+            for site_name, _, probe in scheduled
+        }
+        _run_queued(db, scheduled, payloads, site_finished)
+    else:
+        _run_local(db, scheduled, fetch, site_finished, max_workers, site_timeout)
 
-            except Exception as e:
-                logging.error(f"Erro ao calcular/enviar resumo consolidado: {e}")
-                send_to_slack(f"Erro ao enviar resumo: {e}", webhook_url)
-                squad_display_name = webhook_to_squad_name.get(webhook_url, 'Squad')
-                db.log_activity(f"[SQUAD] {squad_display_name}", 'error', f"Erro ao enviar resumo consolidado: {e}")
+    # Um único post no canal de alertas com todos os sites de MC negativa da execução.
+    alerts.flush()
+    if not db.insert_daily_metrics(metric_rows):
+        logging.error(f"Falha ao gravar as métricas de {len(metric_rows)} sites em daily_metrics")
+    if row_hashes:
+        row_hashes.save(metric_date, slot, [r for results in results_per_webhook.values() for r in results])
+    mark_run_completed(metric_date, slot)
+    activity_writer.flush()
 
 def main():
     setup_logging()
@@ -855,30 +1032,20 @@ if __name__ == "__main__":
     
     if '--agendador' in sys.argv:
         sys.argv.remove('--agendador')
-        def job():
-            logging.info(f"[Agendador] Iniciando rotina de processamento...")
-            try:
-                main()
-                logging.info(f"[Agendador] Rotina de processamento concluída com sucesso.")
-            except Exception as e:
-                logging.error(f"[Agendador] Erro durante a rotina: {e}")
-                logging.error(traceback.format_exc())
-
-        logging.info("Agendador iniciado. Agendamentos: todos os dias em: 00:10, 03:10, 06:10, 09:10, 12:10, 15:10, 18:10 e 21:10.")
-        for hour in [0, 3, 6, 9, 12, 15, 18, 21]:
-            schedule.every().day.at(f"{hour:02d}:10").do(job)
-        
-        logging.info("[Agendador] Aguardando próximo agendamento...")
-        
-        last_heartbeat = time.time()
-        while True:
-            schedule.run_pending()
-            
-            if time.time() - last_heartbeat > 3600:
-                logging.info(f"[Agendador] Heartbeat - Agendador rodando. Hora atual: {datetime.now(pytz.timezone('America/Sao_Paulo')).strftime('%H:%M:%S')}")
-                last_heartbeat = time.time()
-                
-            time.sleep(1)
+        os.makedirs('data', exist_ok=True)
+        db = DBManager()
+        db.connect()
+        logging.info("Agendador iniciado. Horários lidos da tabela schedule_slots.")
+        scheduler.BatchScheduler(db, job=lambda slot: run_batch_processing(slot=slot)).run_forever()
+    elif '--worker' in sys.argv:
+        sys.argv.remove('--worker')
+        os.makedirs('data', exist_ok=True)
+        db = DBManager()
+        db.connect()
+        get_activity_writer(db)
+        QueueWorker(BatchQueue(db), process=lambda job: process_queue_job(job, db)).run_forever()
     else:
-        main() 
+        main()
+        # Execução avulsa: entrega o que ficou no outbox antes de o processo terminar.
+        get_outbox_drainer().drain_once()
 
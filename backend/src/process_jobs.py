@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import PROCESS_JOB_HISTORY
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCESS = 'success'
+SKIPPED = 'skipped'
+ERROR = 'error'
+
+
+def site_outcome(result: Dict[str, Any]) -> str:
+    if result.get('skipped'):
+        return 'skipped'
+    if not result.get('ok'):
+        return 'error'
+    return 'success' if result.get('changed', True) else 'unchanged'
+
+
+class ProcessJob:
+    """
+    Um processamento manual disparado pela API. O lote (_run_batch) informa o início
+    e o fim de cada site; a API só lê o estado para montar a resposta de progresso.
+    """
+
+    def __init__(self, requested_by: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.requested_by = requested_by
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.slot: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._sites: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, slot: str, site_names: List[str]) -> None:
+        with self._lock:
+            self.slot = slot
+            self._sites = {name: {'site_name': name, 'status': 'pending', 'elapsed': None,
+                                  'error': None, 'finished_at': None} for name in site_names}
+
+    def site_finished(self, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._sites[result['site_name']] = {
+                'site_name': result['site_name'],
+                'status': site_outcome(result),
+                'elapsed': result.get('elapsed'),
+                'error': result.get('error'),
+                'finished_at': time.time()
+            }
+
+    def to_dict(self, include_sites: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            sites = list(self._sites.values())
+        counts: Dict[str, int] = {}
+        for site in sites:
+            counts[site['status']] = counts.get(site['status'], 0) + 1
+        end = self.finished_at or time.time()
+        job = {
+            'id': self.id,
+            'status': self.status,
+            'requested_by': self.requested_by,
+            'slot': self.slot,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'elapsed': round(end - self.started_at, 1) if self.started_at else None,
+            'total': len(sites),
+            'done': len(sites) - counts.get('pending', 0),
+            'counts': counts
+        }
+        if include_sites:
+            job['sites'] = sites
+        return job
+
+
+class ProcessJobRegistry:
+    """
+    Registro dos processamentos manuais do processo da API. Enquanto um job está em
+    andamento, novas requisições recebem o mesmo job em vez de disparar outra execução.
+    Guarda os últimos `history` jobs para consulta do progresso.
+    """
+
+    def __init__(self, history: int = PROCESS_JOB_HISTORY):
+        self.history = history
+        self._jobs: 'OrderedDict[str, ProcessJob]' = OrderedDict()
+        self._active: Optional[ProcessJob] = None
+        self._lock = threading.Lock()
+
+    def submit(self, target: Callable[[ProcessJob], bool], requested_by: Optional[str] = None) -> Tuple[ProcessJob, bool]:
+        """
+        Inicia `target(job)` em uma thread. Retorna (job, True) para um job novo ou
+        (job em andamento, False) quando já existe um.
+        """
+        with self._lock:
+            if self._active is not None:
+                return self._active, False
+            job = ProcessJob(requested_by)
+            self._active = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+
+        threading.Thread(target=self._run, args=(job, target), name=f'process-job-{job.id}', daemon=True).start()
+        return job, True
+
+    def _run(self, job: ProcessJob, target: Callable[[ProcessJob], bool]) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            if target(job):
+                job.status = SUCCESS
+            else:
+                job.status = SKIPPED
+                job.error = 'Outra execução do lote está em andamento'
+        except Exception as e:
+            logging.exception(f"Erro no processamento manual {job.id}: {e}")
+            job.status = ERROR
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active = None
+            logging.info(f"Processamento manual {job.id} finalizado: {job.status}")
+
+    def get(self, job_id: str) -> Optional[ProcessJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_active(self) -> Optional[ProcessJob]:
+        with self._lock:
+            return self._active
+
+
+_registry: Optional[ProcessJobRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_job_registry() -> ProcessJobRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ProcessJobRegistry()
+        return _registry
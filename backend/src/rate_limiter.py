@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Optional
+
+from local_store import LocalStore
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SHEETS_RATE_LIMIT_PER_MINUTE, SHEETS_RATE_BURST, SHEETS_RATE_MAX_WAIT
+
+
+class RateLimitTimeout(Exception):
+    """Nenhuma ficha liberada dentro do tempo máximo de espera."""
+
+
+class TokenBucket(LocalStore):
+    """
+    Token bucket compartilhado entre processos (API e agendador) no SQLite de data/.
+    Cada requisição consome uma ficha; as fichas são repostas continuamente até o limite
+    do burst. A leitura e a atualização do saldo acontecem dentro de BEGIN IMMEDIATE,
+    o que serializa os processos sem precisar de outro lock.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int, max_wait: float = SHEETS_RATE_MAX_WAIT, **kwargs):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self.max_wait = max_wait
+        super().__init__(**kwargs)
+
+    def _create_tables(self) -> None:
+        conn = self._get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limit_bucket (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """)
+
+    def _take(self) -> float:
+        """Tenta consumir uma ficha. Retorna 0 em caso de sucesso ou quantos segundos esperar."""
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_bucket WHERE name = ?", (self.name,)
+            ).fetchone()
+            if row is None:
+                tokens = self.capacity
+            else:
+                tokens = min(self.capacity, row['tokens'] + max(0.0, now - row['updated_at']) * self.rate)
+
+            wait_time = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait_time = (1 - tokens) / self.rate
+
+            conn.execute("""
+            INSERT INTO rate_limit_bucket (name, tokens, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+            """, (self.name, tokens, now))
+            conn.execute("COMMIT")
+            return wait_time
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Bloqueia até obter uma ficha. Retorna o tempo total de espera.
+        Levanta RateLimitTimeout (com RATE_LIMIT_EXCEEDED na mensagem, para os tratamentos
+        de quota existentes) se a espera passar de `timeout`.
+        """
+        if self.rate <= 0:
+            return 0.0
+        timeout = self.max_wait if timeout is None else timeout
+        started = time.monotonic()
+        while True:
+            try:
+                wait_time = self._take()
+            except Exception as e:
+                # Sem o SQLite o limitador não pode coordenar nada; não bloqueia a chamada.
+                logging.error(f"Erro no limitador de requisições '{self.name}': {e}")
+                return time.monotonic() - started
+            waited = time.monotonic() - started
+            if wait_time <= 0:
+                if waited >= 1:
+                    logging.info(f"Limitador '{self.name}': requisição liberada após {waited:.1f}s")
+                return waited
+            if waited + wait_time > timeout:
+                raise RateLimitTimeout(f"RATE_LIMIT_EXCEEDED: limitador '{self.name}' sem fichas após {waited:.1f}s")
+            time.sleep(wait_time)
+
+    def penalize(self) -> None:
+        """Zera o saldo após um 429 do Google, fazendo todos os processos aguardarem a reposição."""
+        try:
+            self._get_connection().execute("""
+            INSERT INTO rate_limit_bucket (name, tokens, updated_at) VALUES (?, 0, ?)
+            ON CONFLICT(name) DO UPDATE SET tokens = MIN(tokens, 0), updated_at = excluded.updated_at
+            """, (self.name, time.time()))
+        except Exception as e:
+            logging.error(f"Erro ao registrar 429 no limitador '{self.name}': {e}")
+
+
+_sheets_limiter: Optional[TokenBucket] = None
+_sheets_limiter_lock = threading.Lock()
+
+
+def get_sheets_rate_limiter() -> TokenBucket:
+    global _sheets_limiter
+    with _sheets_limiter_lock:
+        if _sheets_limiter is None:
+            _sheets_limiter = TokenBucket('google_sheets', SHEETS_RATE_LIMIT_PER_MINUTE, SHEETS_RATE_BURST)
+        return _sheets_limiter
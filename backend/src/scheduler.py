@@ -0,0 +1,170 @@
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+import pytz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    SCHEDULER_TIMEZONE,
+    SCHEDULER_DEFAULT_SLOTS,
+    SCHEDULER_CATCHUP_WINDOW,
+    SCHEDULER_REFRESH_INTERVAL
+)
+
+TZ = pytz.timezone(SCHEDULER_TIMEZONE)
+
+# Atraso até o qual uma execução ainda conta como 'schedule' (e não como recuperação).
+ON_TIME_TOLERANCE = 120
+HEARTBEAT_INTERVAL = 3600
+
+_SLOT_PATTERN = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)$')
+
+Slot = Tuple[int, int]
+
+
+def parse_slots(values: List[str]) -> List[Slot]:
+    """Converte "HH:MM" em (hora, minuto), descartando valores inválidos e repetidos."""
+    slots = set()
+    for value in values:
+        match = _SLOT_PATTERN.match(str(value).strip())
+        if match:
+            slots.add((int(match.group(1)), int(match.group(2))))
+        else:
+            logging.warning(f"[Agendador] Horário inválido ignorado: {value!r}")
+    return sorted(slots)
+
+
+def format_slot(moment: datetime) -> str:
+    return moment.strftime('%H:%M')
+
+
+def _at(day, slot: Slot) -> datetime:
+    return TZ.localize(datetime(day.year, day.month, day.day, slot[0], slot[1]))
+
+
+def latest_due(now: datetime, slots: List[Slot]) -> Optional[datetime]:
+    """Horário agendado mais recente que já passou (hoje ou ontem)."""
+    for day in (now.date(), now.date() - timedelta(days=1)):
+        past = [_at(day, slot) for slot in slots if _at(day, slot) <= now]
+        if past:
+            return max(past)
+    return None
+
+
+def next_due(now: datetime, slots: List[Slot]) -> Optional[datetime]:
+    """Próximo horário agendado depois de `now` (hoje ou amanhã)."""
+    for day in (now.date(), now.date() + timedelta(days=1)):
+        upcoming = [_at(day, slot) for slot in slots if _at(day, slot) > now]
+        if upcoming:
+            return min(upcoming)
+    return None
+
+
+def slots_between(start: datetime, end: datetime, slots: List[Slot]) -> List[datetime]:
+    """Horários agendados no intervalo aberto (start, end)."""
+    moments = []
+    day = start.date()
+    while day <= end.date():
+        moments.extend(moment for moment in (_at(day, slot) for slot in slots) if start < moment < end)
+        day += timedelta(days=1)
+    return sorted(moments)
+
+
+def get_configured_slots(db=None) -> List[Slot]:
+    """Horários ativos cadastrados em schedule_slots; sem acesso à tabela, usa SCHEDULER_DEFAULT_SLOTS."""
+    values = db.get_schedule_slots() if db is not None else None
+    if values is None:
+        values = SCHEDULER_DEFAULT_SLOTS
+    return parse_slots(values)
+
+
+class BatchScheduler:
+    """
+    Agendador do lote: lê os horários do banco, dorme até o próximo horário (em intervalos
+    de no máximo refresh_interval, para perceber horários alterados) e registra o início e o
+    fim de cada execução em scheduler_runs. Horários perdidos (container parado ou execução
+    longa) são recuperados com uma única execução do mais recente, dentro de catchup_window.
+    """
+
+    def __init__(self, db, job: Callable[[str], bool], catchup_window: float = SCHEDULER_CATCHUP_WINDOW,
+                 refresh_interval: float = SCHEDULER_REFRESH_INTERVAL):
+        self.db = db
+        self.job = job
+        self.catchup_window = catchup_window
+        self.refresh_interval = refresh_interval
+        self._stop = threading.Event()
+        self._slot_values: Optional[List[str]] = None
+        self._slots: List[Slot] = parse_slots(SCHEDULER_DEFAULT_SLOTS)
+        self._last_heartbeat = time.monotonic()
+
+        last = db.get_last_scheduled_for()
+        self.last_scheduled: Optional[datetime] = TZ.localize(last) if last is not None else None
+
+    def load_slots(self) -> List[Slot]:
+        values = self.db.get_schedule_slots()
+        if values is not None and values != self._slot_values:
+            self._slot_values = values
+            self._slots = parse_slots(values)
+            logging.info(f"[Agendador] Horários: {', '.join(f'{h:02d}:{m:02d}' for h, m in self._slots) or 'nenhum'}")
+        return self._slots
+
+    def run_slot(self, scheduled_for: datetime, trigger_type: str) -> str:
+        slot = format_slot(scheduled_for)
+        run_id = self.db.start_scheduler_run(slot, scheduled_for.replace(tzinfo=None), trigger_type)
+        self.last_scheduled = scheduled_for
+        logging.info(f"[Agendador] Iniciando execução do horário {slot} ({trigger_type})...")
+        error = None
+        try:
+            status = 'success' if self.job(slot) else 'skipped'
+        except Exception as e:
+            status = 'error'
+            error = str(e)
+            logging.exception(f"[Agendador] Erro durante a execução do horário {slot}: {e}")
+        self.db.finish_scheduler_run(run_id, status, error)
+        logging.info(f"[Agendador] Execução do horário {slot} finalizada: {status}")
+        return status
+
+    def tick(self, now: Optional[datetime] = None) -> float:
+        """Executa o horário vencido, se houver, e retorna quantos segundos dormir até a próxima verificação."""
+        now = now or datetime.now(TZ)
+        slots = self.load_slots()
+
+        latest = latest_due(now, slots)
+        if latest is not None and (self.last_scheduled is None or latest > self.last_scheduled):
+            delay = (now - latest).total_seconds()
+            if delay <= self.catchup_window:
+                if self.last_scheduled is not None:
+                    missed = slots_between(self.last_scheduled, latest, slots)
+                    if missed:
+                        logging.warning(f"[Agendador] {len(missed)} horário(s) perdido(s) "
+                                        f"({', '.join(format_slot(m) for m in missed)}); executando apenas {format_slot(latest)}")
+                self.run_slot(latest, 'schedule' if delay <= ON_TIME_TOLERANCE else 'catchup')
+                return 0
+            logging.warning(f"[Agendador] Horário {format_slot(latest)} perdido há mais de "
+                            f"{self.catchup_window / 3600:.1f}h; não será recuperado")
+            self.last_scheduled = latest
+
+        if time.monotonic() - self._last_heartbeat > HEARTBEAT_INTERVAL:
+            logging.info(f"[Agendador] Heartbeat - Agendador rodando. Hora atual: {now.strftime('%H:%M:%S')}")
+            self._last_heartbeat = time.monotonic()
+
+        upcoming = next_due(now, slots)
+        if upcoming is None:
+            return self.refresh_interval
+        return max(0.5, min((upcoming - now).total_seconds(), self.refresh_interval))
+
+    def run_forever(self) -> None:
+        logging.info("[Agendador] Aguardando próximo agendamento...")
+        while not self._stop.is_set():
+            delay = self.tick()
+            if delay > 0:
+                self._stop.wait(delay)
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import logging
+from typing import Dict, Any, Optional
+
+from local_store import LocalStore
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import SHEETS_METADATA_TTL
+
+
+class SheetMetadataCache(LocalStore):
+    """
+    Cache persistente dos metadados de cada planilha (abas, GIDs, linha de cabeçalho,
+    abas do mês vigente e modifiedTime), indexado pela URL cadastrada no site.
+    """
+
+    def __init__(self, ttl_seconds: float = SHEETS_METADATA_TTL, **kwargs):
+        self.ttl_seconds = ttl_seconds
+        super().__init__(**kwargs)
+
+    def _create_tables(self) -> None:
+        conn = self._get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS sheet_metadata (
+            sheet_url TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            modified_time TEXT,
+            cached_at REAL NOT NULL
+        )
+        """)
+        # Tabela do antigo cache de valores: fórmulas como IMPORTRANGE mudam os valores sem
+        # alterar o modifiedTime, então os valores sempre são relidos.
+        conn.execute("DROP TABLE IF EXISTS sheet_values")
+
+    def get(self, sheet_url: str) -> Optional[Dict[str, Any]]:
+        try:
+            row = self._get_connection().execute(
+                "SELECT payload, modified_time, cached_at FROM sheet_metadata WHERE sheet_url = ?",
+                (sheet_url,)
+            ).fetchone()
+        except Exception as e:
+            logging.error(f"Erro ao ler cache de metadados: {e}")
+            return None
+
+        if not row:
+            return None
+        return {
+            'payload': json.loads(row['payload']),
+            'modified_time': row['modified_time'],
+            'cached_at': row['cached_at']
+        }
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry['cached_at'] < self.ttl_seconds
+
+    def put(self, sheet_url: str, payload: Dict[str, Any], modified_time: Optional[str]) -> None:
+        try:
+            self._get_connection().execute("""
+            INSERT INTO sheet_metadata (sheet_url, payload, modified_time, cached_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(sheet_url) DO UPDATE SET
+                payload = excluded.payload,
+                modified_time = excluded.modified_time,
+                cached_at = excluded.cached_at
+            """, (sheet_url, json.dumps(payload), modified_time, time.time()))
+        except Exception as e:
+            logging.error(f"Erro ao gravar cache de metadados: {e}")
+
+    def update_payload(self, sheet_url: str, payload: Dict[str, Any]) -> None:
+        """Atualiza o conteúdo sem renovar o TTL (ex.: layout de aba ajustado durante a leitura)."""
+        try:
+            self._get_connection().execute(
+                "UPDATE sheet_metadata SET payload = ? WHERE sheet_url = ?",
+                (json.dumps(payload), sheet_url)
+            )
+        except Exception as e:
+            logging.error(f"Erro ao atualizar cache de metadados: {e}")
+
+    def touch(self, sheet_url: str) -> None:
+        try:
+            self._get_connection().execute(
+                "UPDATE sheet_metadata SET cached_at = ? WHERE sheet_url = ?",
+                (time.time(), sheet_url)
+            )
+        except Exception as e:
+            logging.error(f"Erro ao renovar cache de metadados: {e}")
+
+    def invalidate(self, sheet_url: str) -> None:
+        try:
+            self._get_connection().execute("DELETE FROM sheet_metadata WHERE sheet_url = ?", (sheet_url,))
+            logging.info(f"Cache de metadados invalidado: {sheet_url}")
+        except Exception as e:
+            logging.error(f"Erro ao invalidar cache de metadados: {e}")
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import random
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    SLACK_TIMEOUT,
+    SLACK_MAX_RETRIES,
+    SLACK_MAX_RETRY_AFTER
+)
+
+
+class SlackDispatcher:
+    """
+    Envia mensagens para webhooks do Slack reaproveitando conexões keep-alive.
+    Cada requisição tem timeout; respostas 429 respeitam o Retry-After e erros 5xx
+    ou de rede são repetidos com backoff.
+    """
+
+    def __init__(self, timeout: float = SLACK_TIMEOUT, max_retries: int = SLACK_MAX_RETRIES,
+                 max_retry_after: float = SLACK_MAX_RETRY_AFTER):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({"Content-type": "application/json"})
+
+    def send(self, message: str, webhook_url: str, max_retries: Optional[int] = None) -> bool:
+        return self.post(message, webhook_url, max_retries) == 200
+
+    def post(self, message: str, webhook_url: str, max_retries: Optional[int] = None) -> Optional[int]:
+        """
+        Envia a mensagem e retorna o status HTTP da última tentativa (None se ela falhou
+        por erro de rede). Outros 4xx, que não mudam com nova tentativa, retornam na hora.
+        """
+        max_retries = max_retries or self.max_retries
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = self.session.post(webhook_url, json={"text": message}, timeout=self.timeout)
+                logging.info(f"Resposta do Slack: status={response.status_code}, body={response.text}")
+
+                if response.status_code == 200:
+                    return 200
+
+                if response.status_code == 429:
+                    wait_time = self._retry_after(response, attempt)
+                elif response.status_code >= 500:
+                    wait_time = self._backoff(attempt)
+                else:
+                    return response.status_code
+                status_code: Optional[int] = response.status_code
+            except requests.RequestException as e:
+                logging.error(f"Exceção ao enviar mensagem ao Slack: {e}")
+                wait_time = self._backoff(attempt)
+                status_code = None
+
+            if attempt >= max_retries:
+                logging.error(f"Envio ao Slack abandonado após {attempt} tentativas")
+                return status_code
+            logging.warning(f"Nova tentativa de envio ao Slack em {wait_time:.2f}s (tentativa {attempt}/{max_retries})")
+            time.sleep(wait_time)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _retry_after(self, response: requests.Response, attempt: int) -> float:
+        try:
+            retry_after = float(response.headers.get('Retry-After', ''))
+        except ValueError:
+            retry_after = self._backoff(attempt)
+        return min(max(retry_after, 0), self.max_retry_after)
+
+    def _backoff(self, attempt: int) -> float:
+        base_delay = min(2 ** (attempt - 1), self.max_retry_after)
+        return base_delay + random.uniform(0, 0.1 * base_delay)
+
+
+_dispatcher: Optional[SlackDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> SlackDispatcher:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = SlackDispatcher()
+        return _dispatcher
@@ -0,0 +1,278 @@
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from local_store import LocalStore
+from slack_dispatcher import get_dispatcher
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    OUTBOX_BASE_DELAY,
+    OUTBOX_MAX_DELAY,
+    OUTBOX_MAX_AGE,
+    OUTBOX_CLAIM_TIMEOUT,
+    OUTBOX_POLL_INTERVAL,
+    OUTBOX_RETENTION
+)
+
+
+class SlackOutbox(LocalStore):
+    """
+    Fila durável de mensagens para o Slack.
+    Cada mensagem tem uma chave de idempotência (ex.: squad/data/horário); reenfileirar
+    a mesma chave não gera uma segunda entrega.
+    """
+
+    def _create_tables(self) -> None:
+        conn = self._get_connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS slack_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT UNIQUE NOT NULL,
+            webhook_url TEXT NOT NULL,
+            message TEXT NOT NULL,
+            log_site_name TEXT,
+            log_message TEXT,
+            log_metric_date TEXT,
+            log_slot TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            claimed_at REAL,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            sent_at REAL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_slack_outbox_due ON slack_outbox (status, next_attempt_at)")
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(slack_outbox)")}
+        for column in ('log_metric_date', 'log_slot'):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE slack_outbox ADD COLUMN {column} TEXT")
+
+    def enqueue(self, idempotency_key: str, webhook_url: str, message: str,
+                log_site_name: Optional[str] = None, log_message: Optional[str] = None,
+                log_metric_date: Optional[str] = None, log_slot: Optional[str] = None) -> bool:
+        """
+        Retorna False quando a chave já existe (mensagem já enfileirada ou entregue).
+        Os campos log_* definem o log de atividade gravado quando a mensagem é entregue.
+        """
+        now = time.time()
+        try:
+            cursor = self._get_connection().execute("""
+            INSERT OR IGNORE INTO slack_outbox
+                (idempotency_key, webhook_url, message, log_site_name, log_message,
+                 log_metric_date, log_slot, next_attempt_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (idempotency_key, webhook_url, message, log_site_name, log_message,
+                  log_metric_date, log_slot, now, now))
+            if cursor.rowcount == 0:
+                logging.info(f"Mensagem já enfileirada anteriormente: {idempotency_key}")
+                return False
+            return True
+        except Exception as e:
+            logging.error(f"Erro ao enfileirar mensagem no outbox: {e}")
+            return False
+
+    def exists(self, idempotency_key: str) -> bool:
+        try:
+            row = self._get_connection().execute(
+                "SELECT 1 FROM slack_outbox WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        except Exception as e:
+            logging.error(f"Erro ao consultar o outbox: {e}")
+            return False
+        return row is not None
+
+    def claim_due(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Reserva mensagens vencidas. Reservas antigas (processo interrompido) são retomadas."""
+        now = time.time()
+        conn = self._get_connection()
+        rows = conn.execute("""
+        SELECT * FROM slack_outbox
+        WHERE (status = 'pending' AND next_attempt_at <= ?)
+           OR (status = 'sending' AND claimed_at <= ?)
+        ORDER BY next_attempt_at
+        LIMIT ?
+        """, (now, now - OUTBOX_CLAIM_TIMEOUT, limit)).fetchall()
+
+        claimed = []
+        for row in rows:
+            cursor = conn.execute("""
+            UPDATE slack_outbox SET status = 'sending', claimed_at = ?
+            WHERE id = ? AND status = ? AND COALESCE(claimed_at, 0) = COALESCE(?, 0)
+            """, (now, row['id'], row['status'], row['claimed_at']))
+            if cursor.rowcount == 1:
+                claimed.append(dict(row))
+        return claimed
+
+    def mark_sent(self, message_id: int) -> None:
+        self._get_connection().execute(
+            "UPDATE slack_outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1 WHERE id = ?",
+            (time.time(), message_id)
+        )
+
+    def mark_failed_attempt(self, row: Dict[str, Any], error: str) -> str:
+        """Agenda nova tentativa com backoff exponencial ou expira a mensagem. Retorna o novo status."""
+        now = time.time()
+        attempts = row['attempts'] + 1
+        if now - row['created_at'] > OUTBOX_MAX_AGE:
+            status = 'expired'
+            next_attempt_at = row['next_attempt_at']
+        else:
+            status = 'pending'
+            next_attempt_at = now + min(OUTBOX_BASE_DELAY * (2 ** (attempts - 1)), OUTBOX_MAX_DELAY)
+        self._get_connection().execute("""
+        UPDATE slack_outbox
+        SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, claimed_at = NULL
+        WHERE id = ?
+        """, (status, attempts, next_attempt_at, error, row['id']))
+        return status
+
+    def mark_dead(self, row: Dict[str, Any], error: str) -> None:
+        """Descarta a mensagem sem novas tentativas (o Slack a recusou de forma definitiva)."""
+        self._get_connection().execute("""
+        UPDATE slack_outbox
+        SET status = 'dead', attempts = attempts + 1, last_error = ?, claimed_at = NULL
+        WHERE id = ?
+        """, (error, row['id']))
+
+    def purge(self, older_than: float = OUTBOX_RETENTION) -> int:
+        cursor = self._get_connection().execute(
+            "DELETE FROM slack_outbox WHERE status IN ('sent', 'expired', 'dead') AND created_at < ?",
+            (time.time() - older_than,)
+        )
+        return cursor.rowcount
+
+    def pending_count(self) -> int:
+        row = self._get_connection().execute(
+            "SELECT COUNT(*) AS total FROM slack_outbox WHERE status IN ('pending', 'sending')"
+        ).fetchone()
+        return row['total']
+
+
+class OutboxDrainer:
+    """
+    Thread em segundo plano que entrega as mensagens do outbox.
+    Falhas não bloqueiam quem enfileira: a mensagem volta para a fila com backoff.
+    Respostas 4xx (exceto 429) não mudam com nova tentativa e descartam a mensagem.
+    """
+
+    def __init__(self, outbox: SlackOutbox, db=None, poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.outbox = outbox
+        self.db = db
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='slack-outbox', daemon=True)
+        self._thread.start()
+        logging.info("Drenador do outbox do Slack iniciado")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def drain_once(self) -> int:
+        """Entrega as mensagens vencidas agora. Retorna quantas foram entregues."""
+        delivered = 0
+        with self._drain_lock:
+            while True:
+                rows = self.outbox.claim_due()
+                if not rows:
+                    break
+                for row in rows:
+                    if self._deliver(row):
+                        delivered += 1
+        return delivered
+
+    def _deliver(self, row: Dict[str, Any]) -> bool:
+        status_code = None
+        try:
+            status_code = get_dispatcher().post(row['message'], row['webhook_url'], max_retries=2)
+            success = status_code == 200
+            error = None if success else f'Slack recusou a mensagem (status {status_code})'
+        except Exception as e:
+            success = False
+            error = str(e)
+
+        if success:
+            self.outbox.mark_sent(row['id'])
+            logging.info(f"Mensagem do outbox entregue: {row['idempotency_key']}")
+            if self.db and row['log_site_name']:
+                self.db.log_activity(row['log_site_name'], 'success', row['log_message'] or 'Mensagem enviada ao Slack',
+                                     row['log_metric_date'], row['log_slot'])
+            return True
+
+        if status_code is not None and 400 <= status_code < 500 and status_code != 429:
+            self.outbox.mark_dead(row, error)
+            logging.error(f"Mensagem do outbox descartada: {row['idempotency_key']} ({error})")
+            if self.db and row['log_site_name']:
+                self.db.log_activity(row['log_site_name'], 'error', f"Mensagem recusada pelo Slack (status {status_code})",
+                                     row['log_metric_date'], row['log_slot'])
+            return False
+
+        status = self.outbox.mark_failed_attempt(row, error)
+        if status == 'expired':
+            logging.error(f"Mensagem do outbox expirada sem entrega: {row['idempotency_key']}")
+            if self.db and row['log_site_name']:
+                self.db.log_activity(row['log_site_name'], 'error', f"Mensagem não entregue ao Slack após {row['attempts'] + 1} tentativas",
+                                     row['log_metric_date'], row['log_slot'])
+        else:
+            logging.warning(f"Falha ao entregar {row['idempotency_key']} (tentativa {row['attempts'] + 1}). Nova tentativa agendada.")
+        return False
+
+    def _run(self) -> None:
+        last_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                self.drain_once()
+                if time.time() - last_purge > 3600:
+                    purged = self.outbox.purge()
+                    if purged:
+                        logging.info(f"{purged} mensagens antigas removidas do outbox")
+                    last_purge = time.time()
+            except Exception as e:
+                logging.error(f"Erro no drenador do outbox: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+_outbox: Optional[SlackOutbox] = None
+_drainer: Optional[OutboxDrainer] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> SlackOutbox:
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = SlackOutbox()
+        return _outbox
+
+
+def get_outbox_drainer(db=None) -> OutboxDrainer:
+    """Drenador único por processo; é iniciado na primeira chamada."""
+    global _drainer
+    outbox = get_outbox()
+    with _outbox_lock:
+        if _drainer is None:
+            _drainer = OutboxDrainer(outbox, db)
+        elif db is not None and _drainer.db is None:
+            _drainer.db = db
+    _drainer.start()
+    return _drainer
@@ -0,0 +1,321 @@
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from mysql.connector import Error
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    QUEUE_WORKER_THREADS,
+    QUEUE_POLL_INTERVAL,
+    QUEUE_CLAIM_TIMEOUT,
+    QUEUE_MAX_ATTEMPTS,
+    QUEUE_RETENTION_DAYS
+)
+
+# Uma linha por site em cada execução do lote no modo fila (BATCH_MODE=queue).
+BATCH_JOBS_DDL = """
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    run_key VARCHAR(64) NOT NULL,
+    site_name VARCHAR(255) NOT NULL,
+    webhook_url VARCHAR(512) NOT NULL,
+    payload JSON NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    claimed_by VARCHAR(128),
+    claimed_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    result JSON NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_batch_jobs_run_site (run_key, site_name),
+    KEY idx_batch_jobs_status (status, id),
+    KEY idx_batch_jobs_run_status (run_key, status)
+)
+"""
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+class BatchQueue:
+    """
+    Fila de sites de uma execução do lote, em MySQL. Qualquer número de processos disputa
+    os jobs com SELECT ... FOR UPDATE SKIP LOCKED (MySQL 8+): cada job é entregue a um único
+    worker, sem que um bloqueie o outro. Jobs presos em um worker que morreu voltam para
+    a fila após claim_timeout, até max_attempts tentativas; depois disso fail_abandoned
+    os marca como falhos.
+    """
+
+    def __init__(self, db, claim_timeout: float = QUEUE_CLAIM_TIMEOUT, max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        self.db = db
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+
+    def enqueue(self, run_key: str, jobs: List[Dict[str, Any]]) -> bool:
+        """Grava os jobs da execução ({site_name, webhook_url, payload}) em um único executemany."""
+        if not jobs:
+            return True
+        conn = None
+        try:
+            conn = self.db._get_connection()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.executemany("""
+            INSERT IGNORE INTO batch_jobs (run_key, site_name, webhook_url, payload)
+            VALUES (%s, %s, %s, %s)
+            """, [(run_key, job['site_name'], job['webhook_url'], json.dumps(job['payload'])) for job in jobs])
+            conn.commit()
+            cursor.close()
+            return True
+
+        except Error as e:
+            logging.error(f"Erro ao enfileirar jobs da execução {run_key}: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def claim(self, claimed_by: str, run_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Reserva o próximo job disponível (de qualquer execução, ou só de `run_key`)."""
+        conn = None
+        try:
+            conn = self.db._get_connection()
+            if not conn:
+                return None
+
+            query = """
+            SELECT id, run_key, site_name, webhook_url, payload, attempts
+            FROM batch_jobs
+            WHERE (status = %s OR (status = %s AND claimed_at < NOW() - INTERVAL %s SECOND))
+              AND attempts < %s
+            """
+            params = [PENDING, RUNNING, int(self.claim_timeout), self.max_attempts]
+            if run_key is not None:
+                query += " AND run_key = %s"
+                params.append(run_key)
+            query += " ORDER BY id LIMIT 1 FOR UPDATE SKIP LOCKED"
+
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, tuple(params))
+            job = cursor.fetchone()
+            if job is None:
+                conn.rollback()
+                cursor.close()
+                return None
+
+            cursor.execute("""
+            UPDATE batch_jobs
+            SET status = %s, attempts = attempts + 1, claimed_by = %s, claimed_at = NOW()
+            WHERE id = %s
+            """, (RUNNING, claimed_by[:128], job['id']))
+            conn.commit()
+            cursor.close()
+
+            job['payload'] = json.loads(job['payload'])
+            job['attempts'] += 1
+            return job
+
+        except Error as e:
+            logging.error(f"Erro ao reservar job da fila: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def complete(self, job_id: int, result: Dict[str, Any], status: str = DONE) -> bool:
+        """Grava o resultado; um job já expirado pelo coordenador não é mais alterado."""
+        conn = None
+        try:
+            conn = self.db._get_connection()
+            if not conn:
+                return False
+
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE batch_jobs SET status = %s, result = %s, finished_at = NOW()
+            WHERE id = %s AND status = %s
+            """, (status, json.dumps(result), job_id, RUNNING))
+            conn.commit()
+            cursor.close()
+            return True
+
+        except Error as e:
+            logging.error(f"Erro ao concluir job {job_id}: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def finished(self, run_key: str) -> List[Dict[str, Any]]:
+        """Jobs concluídos (com sucesso ou não) da execução, com o resultado já decodificado."""
+        conn = None
+        try:
+            conn = self.db._get_connection()
+            if not conn:
+                return []
+
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+            SELECT id, site_name, webhook_url, status, result
+            FROM batch_jobs
+            WHERE run_key = %s AND status IN (%s, %s)
+            """, (run_key, DONE, FAILED))
+            rows = cursor.fetchall()
+            cursor.close()
+            for row in rows:
+                row['result'] = json.loads(row['result']) if row['result'] else None
+            return rows
+
+        except Error as e:
+            logging.error(f"Erro ao buscar jobs concluídos da execução {run_key}: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def fail_abandoned(self, run_key: str) -> int:
+        """
+        Marca como falhos os jobs da execução cuja reserva expirou na última tentativa: o
+        worker morreu e claim não os entrega de novo, então não esperam pelo prazo da execução.
+        """
+        conn = None
+        try:
+            conn = self.db._get_connection()
+            if not conn:
+                return 0
+
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE batch_jobs
+            SET status = %s, finished_at = NOW(),
+                result = JSON_OBJECT('site_name', site_name, 'ok', FALSE, 'error', %s)
+            WHERE run_key = %s AND status = %s
+              AND claimed_at < NOW() - INTERVAL %s SECOND AND attempts >= %s
+            """, (FAILED, f"Worker interrompido após {self.max_attempts} tentativa(s)",
+                  run_key, RUNNING, int(self.claim_timeout), self.max_attempts))
+            failed = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return failed
+
+        except Error as e:
+            logging.error(f"Erro ao marcar jobs abandonados da execução {run_key}: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def expire(self, run_key: str) -> int:
+        """Marca como falhos os jobs ainda abertos da execução (prazo da execução esgotado)."""
+        conn = None
+        try:
+            conn = self.db._get_connection()
+            if not conn:
+                return 0
+
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE batch_jobs SET status = %s, finished_at = NOW()
+            WHERE run_key = %s AND status IN (%s, %s)
+            """, (FAILED, run_key, PENDING, RUNNING))
+            expired = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return expired
+
+        except Error as e:
+            logging.error(f"Erro ao expirar jobs da execução {run_key}: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def purge(self, retention_days: int = QUEUE_RETENTION_DAYS) -> int:
+        conn = None
+        try:
+            conn = self.db._get_connection()
+            if not conn:
+                return 0
+
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM batch_jobs WHERE created_at < NOW() - INTERVAL %s DAY", (retention_days,))
+            purged = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return purged
+
+        except Error as e:
+            logging.error(f"Erro ao limpar jobs antigos: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+
+def run_claimed_job(queue: BatchQueue, job: Dict[str, Any], process: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+    """Executa um job reservado e grava o resultado; uma exceção vira um resultado com erro."""
+    try:
+        result = process(job)
+        status = DONE
+    except Exception as e:
+        logging.error(f"Erro inesperado no job {job['id']} ({job['site_name']}): {e}")
+        result = {'site_name': job['site_name'], 'ok': False, 'error': str(e)}
+        status = FAILED
+    queue.complete(job['id'], result, status)
+
+
+class QueueWorker:
+    """
+    Processo worker (python src/main.py --worker): threads que reservam e executam jobs de
+    qualquer execução em andamento. Basta subir mais réplicas para dividir o lote.
+    """
+
+    def __init__(self, queue: BatchQueue, process: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 threads: int = QUEUE_WORKER_THREADS, poll_interval: float = QUEUE_POLL_INTERVAL):
+        self.queue = queue
+        self.process = process
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def _loop(self) -> None:
+        claimed_by = worker_id()
+        while not self._stop.is_set():
+            job = self.queue.claim(claimed_by)
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            logging.info(f"[Worker] Job {job['id']} reservado: {job['site_name']} (tentativa {job['attempts']})")
+            run_claimed_job(self.queue, job, self.process)
+
+    def run_forever(self) -> None:
+        logging.info(f"[Worker] Iniciado com {self.threads} thread(s): {socket.gethostname()}:{os.getpid()}")
+        workers = [threading.Thread(target=self._loop, name=f'queue-worker-{i}', daemon=True) for i in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in workers):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self) -> None:
+        self._stop.set()
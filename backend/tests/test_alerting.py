@@ -0,0 +1,71 @@
+"""
+Testes do AlertRouting: a edição de squads feita pela API (outro processo) invalida o
+canal de alertas em cache no agendador pelo marcador no SQLite compartilhado.
+"""
+
+import pytest
+
+from alerting import AlertRouting
+from dashboard_cache import RunMarker
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, query, params):
+        self.db.queries += 1
+
+    def fetchone(self):
+        return {'webhook_url': self.db.webhook_url} if self.db.webhook_url is not None else None
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.db)
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self, webhook_url):
+        self.webhook_url = webhook_url
+        self.queries = 0
+
+    def _get_connection(self):
+        return FakeConnection(self)
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / 'local.sqlite3')
+
+
+def test_webhook_is_cached_within_ttl(db_file):
+    db = FakeDB('https://hooks.slack.test/alertas')
+    routing = AlertRouting(ttl_seconds=3600, marker=RunMarker(db_file=db_file))
+    assert routing.get_webhook(db) == 'https://hooks.slack.test/alertas'
+    assert routing.get_webhook(db) == 'https://hooks.slack.test/alertas'
+    assert db.queries == 1
+
+
+def test_invalidation_from_other_process_reloads(db_file):
+    db = FakeDB('https://hooks.slack.test/alertas')
+    scheduler = AlertRouting(ttl_seconds=3600, marker=RunMarker(db_file=db_file))
+    api = AlertRouting(ttl_seconds=3600, marker=RunMarker(db_file=db_file))
+    assert scheduler.get_webhook(db) == 'https://hooks.slack.test/alertas'
+
+    # O squad de alertas é removido pela API.
+    db.webhook_url = None
+    api.invalidate()
+    assert scheduler.get_webhook(db) == ''
+    assert db.queries == 2
+    assert scheduler.get_webhook(db) == ''
+    assert db.queries == 2
@@ -0,0 +1,40 @@
+"""
+Testes da migração do antigo processed_records.json para o SQLite: o arquivo legado só
+é renomeado depois que os registros foram gravados.
+"""
+
+import json
+import os
+
+import data_manager
+from data_manager import DataManager
+
+
+def write_legacy(path):
+    with open(path, 'w') as f:
+        json.dump({'EMPRESA': [{'id': 1, 'valor': 'a'}, {'id': 2, 'valor': 'b'}]}, f)
+
+
+def test_migration_imports_and_renames(tmp_path):
+    legacy = str(tmp_path / 'processed_records.json')
+    write_legacy(legacy)
+    manager = DataManager(storage_file=legacy, db_file=str(tmp_path / 'local.sqlite3'))
+    assert not os.path.exists(legacy)
+    assert os.path.exists(f"{legacy}.migrated")
+    assert manager.is_record_processed({'titulo': 'EMPRESA', 'id': 2}, 'id')
+
+
+def test_failed_save_keeps_legacy_file(tmp_path, monkeypatch):
+    legacy = str(tmp_path / 'processed_records.json')
+    write_legacy(legacy)
+    monkeypatch.setattr(data_manager.DataManager, 'save_processed_data', lambda self, data, key_field='id': False)
+    DataManager(storage_file=legacy, db_file=str(tmp_path / 'local.sqlite3'))
+    assert os.path.exists(legacy)
+    assert not os.path.exists(f"{legacy}.migrated")
+
+
+def test_save_processed_data_reports_failure(tmp_path):
+    manager = DataManager(storage_file=str(tmp_path / 'none.json'), db_file=str(tmp_path / 'local.sqlite3'))
+    assert manager.save_processed_data({'EMPRESA': [{'id': 1}]}) is True
+    manager._get_connection().execute("DROP TABLE processed_records")
+    assert manager.save_processed_data({'EMPRESA': [{'id': 2}]}) is False
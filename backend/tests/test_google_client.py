@@ -0,0 +1,86 @@
+"""
+Testes de fetch_modified_time contra um servidor local no lugar do Drive (files_url apontando
+para http.server em porta livre).
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import gspread
+import pytest
+import requests
+from gspread.exceptions import APIError
+
+from google_client import fetch_modified_time
+
+
+class FakeDrive:
+    """Responde files.get com o modifiedTime de `files`; arquivo desconhecido recebe 404."""
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+        drive = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                drive.requests.append((url.path, parse_qs(url.query)))
+                file_id = url.path.rsplit('/', 1)[-1]
+                if file_id in drive.files:
+                    status, body = 200, {'modifiedTime': drive.files[file_id]}
+                else:
+                    status, body = 404, {'error': {'code': 404, 'message': 'File not found'}}
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.files_url = f"http://127.0.0.1:{self.server.server_address[1]}/drive/v3/files"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def drive():
+    server = FakeDrive({'planilha-1': '2026-10-17T09:10:00.000Z'})
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client():
+    client = gspread.Client(auth=None, session=requests.Session())
+    yield client
+    client.session.close()
+
+
+def test_returns_modified_time(drive, client):
+    assert fetch_modified_time(client, 'planilha-1', files_url=drive.files_url) == '2026-10-17T09:10:00.000Z'
+    path, query = drive.requests[0]
+    assert path == '/drive/v3/files/planilha-1'
+    assert query == {'fields': ['modifiedTime'], 'supportsAllDrives': ['True']}
+
+
+def test_reflects_new_revision(drive, client):
+    drive.files['planilha-1'] = '2026-10-17T12:00:00.000Z'
+    assert fetch_modified_time(client, 'planilha-1', files_url=drive.files_url + '/') == '2026-10-17T12:00:00.000Z'
+
+
+def test_unknown_file_raises(drive, client):
+    with pytest.raises(APIError):
+        fetch_modified_time(client, 'inexistente', files_url=drive.files_url)
@@ -0,0 +1,131 @@
+"""
+Testes do LiveFeed com um banco em memória: limite de streams simultâneos, leitura
+incremental tolerante a commits fora de ordem, retomada com Last-Event-ID e tickets do stream.
+"""
+
+import pytest
+
+from live_feed import LiveFeed, StreamLimitReached, StreamTickets, TableCursor, format_sse, parse_cursor
+
+
+class FakeDB:
+    def __init__(self):
+        self.logs = []
+        self.metrics = []
+
+    def get_stream_cursor(self):
+        return (max((row['id'] for row in self.logs), default=0),
+                max((row['id'] for row in self.metrics), default=0))
+
+    def get_logs_since(self, last_id, limit):
+        return sorted((row for row in self.logs if row['id'] > last_id), key=lambda row: row['id'])[:limit]
+
+    def get_metrics_since(self, last_id, limit):
+        return sorted((row for row in self.metrics if row['id'] > last_id), key=lambda row: row['id'])[:limit]
+
+    def get_latest_scheduler_run(self):
+        return None
+
+
+def drain(subscriber):
+    events = []
+    while not subscriber.empty():
+        events.append(subscriber.get_nowait())
+    return events
+
+
+@pytest.fixture
+def feed():
+    feed = LiveFeed(FakeDB(), interval=60, max_streams=2)
+    # Sem thread de leitura: os testes chamam poll() diretamente.
+    feed._thread = type('Alive', (), {'is_alive': lambda self: True})()
+    return feed
+
+
+def test_stream_limit(feed):
+    first = feed.subscribe()
+    feed.subscribe()
+    with pytest.raises(StreamLimitReached):
+        feed.subscribe()
+    feed.unsubscribe(first)
+    feed.subscribe()
+
+
+def test_poll_publishes_new_rows(feed):
+    subscriber = feed.subscribe()
+    assert [event[1] for event in drain(subscriber)] == ['ready']
+    feed.db.logs.append({'id': 1, 'site_name': 'a'})
+    feed.db.metrics.append({'id': 1, 'site_name': 'a'})
+    feed.poll()
+    assert [(event[1], event[2]['id']) for event in drain(subscriber)] == [('log', 1), ('metric', 1)]
+    feed.poll()
+    assert drain(subscriber) == []
+
+
+def test_row_committed_out_of_order_is_published(feed):
+    subscriber = feed.subscribe()
+    drain(subscriber)
+    # O id 2 foi reservado antes do 3, mas sua transação confirma depois.
+    feed.db.logs += [{'id': 1}, {'id': 3}]
+    feed.poll()
+    assert [event[2]['id'] for event in drain(subscriber)] == [1, 3]
+    feed.db.logs.append({'id': 2})
+    feed.poll()
+    assert [event[2]['id'] for event in drain(subscriber)] == [2]
+    feed.poll()
+    assert drain(subscriber) == []
+    assert feed._logs.mark == 3
+
+
+def test_table_cursor_gives_up_on_gaps_after_grace():
+    cursor = TableCursor(0, grace=30)
+    assert [row['id'] for row in cursor.accept([{'id': 1}, {'id': 3}], now=0)] == [1, 3]
+    assert cursor.mark == 1 and set(cursor.gaps) == {2}
+    assert cursor.accept([{'id': 3}], now=10) == []
+    assert cursor.mark == 1
+    assert cursor.accept([{'id': 3}], now=31) == []
+    assert cursor.mark == 3 and not cursor.gaps and not cursor.seen
+
+
+def test_table_cursor_ignores_auto_increment_jumps():
+    cursor = TableCursor(10)
+    assert [row['id'] for row in cursor.accept([{'id': 5000}])] == [5000]
+    assert cursor.mark == 5000 and not cursor.gaps
+
+
+def test_reconnect_replays_missed_events(feed):
+    first = feed.subscribe()
+    feed.db.logs.append({'id': 1})
+    feed.poll()
+    last_seen = (feed.epoch, drain(first)[-1][0])
+    feed.unsubscribe(first)
+
+    feed.db.logs += [{'id': 2}, {'id': 3}]
+    feed.poll()
+    replay = drain(feed.subscribe(last_seen))
+    assert [(event[1], event[2].get('id')) for event in replay] == [('log', 2), ('log', 3), ('ready', None)]
+
+
+def test_reconnect_from_other_process_resets(feed):
+    events = drain(feed.subscribe(('outra-epoca', 1)))
+    assert [event[1] for event in events] == ['reset', 'ready']
+
+
+def test_format_sse_and_parse_cursor():
+    assert format_sse((7, 'log', {'id': 1}), 'abc') == 'id: abc-7\nevent: log\ndata: {"id": 1}\n\n'
+    assert parse_cursor('abc-7') == ('abc', 7)
+    assert parse_cursor('12:30') is None
+    assert parse_cursor(None) is None
+
+
+def test_stream_ticket_is_single_use():
+    tickets = StreamTickets(ttl_seconds=30)
+    ticket = tickets.issue({'username': 'admin'})
+    assert tickets.redeem(ticket) == {'username': 'admin'}
+    assert tickets.redeem(ticket) is None
+    assert tickets.redeem('desconhecido') is None
+
+
+def test_stream_ticket_expires():
+    tickets = StreamTickets(ttl_seconds=0)
+    assert tickets.redeem(tickets.issue({'username': 'admin'})) is None
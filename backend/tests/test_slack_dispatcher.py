@@ -0,0 +1,162 @@
+"""
+Testes do SlackDispatcher contra um webhook local (http.server em porta livre):
+429 com Retry-After (e o teto), backoff em 5xx, 400 sem nova tentativa, timeout e
+reaproveitamento da conexão keep-alive.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import slack_dispatcher
+from slack_dispatcher import SlackDispatcher
+
+
+class FakeWebhook:
+    """Webhook local que responde, em ordem, com as respostas programadas em `script`."""
+
+    def __init__(self):
+        self.script = []
+        self.requests = []
+        self._lock = threading.Lock()
+        # time.sleep é substituído nos testes; a demora do servidor usa um Event.
+        self._stopped = threading.Event()
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with webhook._lock:
+                    webhook.requests.append({'port': self.client_address[1], 'body': json.loads(body)})
+                    status, headers, delay = webhook.script.pop(0) if webhook.script else (200, {}, 0)
+                if delay:
+                    webhook._stopped.wait(delay)
+                payload = b'ok' if status == 200 else b'error'
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stopped.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook():
+    server = FakeWebhook()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Registra as esperas entre tentativas em vez de dormir de verdade."""
+    recorded = []
+    monkeypatch.setattr(slack_dispatcher.time, 'sleep', recorded.append)
+    return recorded
+
+
+def make_dispatcher(**kwargs):
+    options = {'timeout': 2, 'max_retries': 3, 'max_retry_after': 30}
+    options.update(kwargs)
+    return SlackDispatcher(**options)
+
+
+def test_success_sends_text_payload(webhook, sleeps):
+    dispatcher = make_dispatcher()
+    assert dispatcher.send('olá', webhook.url) is True
+    assert webhook.requests[0]['body'] == {'text': 'olá'}
+    assert sleeps == []
+
+
+def test_429_waits_for_retry_after(webhook, sleeps):
+    webhook.script = [(429, {'Retry-After': '7'}, 0), (200, {}, 0)]
+    dispatcher = make_dispatcher()
+    assert dispatcher.send('msg', webhook.url) is True
+    assert len(webhook.requests) == 2
+    assert sleeps == [7.0]
+
+
+def test_429_retry_after_is_capped(webhook, sleeps):
+    webhook.script = [(429, {'Retry-After': '3600'}, 0), (200, {}, 0)]
+    dispatcher = make_dispatcher(max_retry_after=5)
+    assert dispatcher.send('msg', webhook.url) is True
+    assert sleeps == [5.0]
+
+
+def test_5xx_retries_with_growing_backoff(webhook, sleeps):
+    webhook.script = [(500, {}, 0), (503, {}, 0), (200, {}, 0)]
+    dispatcher = make_dispatcher()
+    assert dispatcher.send('msg', webhook.url) is True
+    assert len(webhook.requests) == 3
+    assert len(sleeps) == 2
+    assert 1 <= sleeps[0] < sleeps[1]
+
+
+def test_5xx_gives_up_after_max_retries(webhook, sleeps):
+    webhook.script = [(502, {}, 0)] * 3
+    dispatcher = make_dispatcher(max_retries=3)
+    assert dispatcher.send('msg', webhook.url) is False
+    assert len(webhook.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_400_is_not_retried(webhook, sleeps):
+    webhook.script = [(400, {}, 0)]
+    dispatcher = make_dispatcher()
+    assert dispatcher.send('msg', webhook.url) is False
+    assert len(webhook.requests) == 1
+    assert sleeps == []
+
+
+def test_timeout_is_retried(webhook, sleeps):
+    webhook.script = [(200, {}, 1.0), (200, {}, 0)]
+    dispatcher = make_dispatcher(timeout=0.2)
+    started = time.monotonic()
+    assert dispatcher.send('msg', webhook.url) is True
+    assert len(webhook.requests) == 2
+    assert len(sleeps) == 1
+    assert time.monotonic() - started < 1.0
+
+
+def test_timeout_gives_up_after_max_retries(webhook, sleeps):
+    webhook.script = [(200, {}, 1.0)]
+    dispatcher = make_dispatcher(timeout=0.2, max_retries=1)
+    assert dispatcher.send('msg', webhook.url) is False
+
+
+def test_keep_alive_connection_is_reused(webhook, sleeps):
+    dispatcher = make_dispatcher()
+    for i in range(3):
+        assert dispatcher.send(f'msg {i}', webhook.url) is True
+    ports = {request['port'] for request in webhook.requests}
+    assert len(webhook.requests) == 3
+    assert len(ports) == 1
+
+
+def test_post_returns_final_status(webhook, sleeps):
+    webhook.script = [(404, {}, 0), (503, {}, 0), (503, {}, 0)]
+    dispatcher = make_dispatcher(max_retries=2)
+    assert dispatcher.post('msg', webhook.url) == 404
+    assert dispatcher.post('msg', webhook.url) == 503
@@ -0,0 +1,67 @@
+"""
+Testes do OutboxDrainer: 4xx definitivos descartam a mensagem na hora; 429, 5xx e
+erros de rede voltam para a fila com backoff.
+"""
+
+import pytest
+
+import slack_outbox
+from slack_outbox import OutboxDrainer, SlackOutbox
+
+
+class FakeDispatcher:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.calls = 0
+
+    def post(self, message, webhook_url, max_retries=None):
+        self.calls += 1
+        if isinstance(self.status_code, Exception):
+            raise self.status_code
+        return self.status_code
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    store = SlackOutbox(str(tmp_path / 'outbox.sqlite3'))
+    store.enqueue('squad/2026-10-17/09:00', 'https://hooks.slack.test/x', 'mensagem')
+    return store
+
+
+def drain_with(monkeypatch, outbox, status_code):
+    dispatcher = FakeDispatcher(status_code)
+    monkeypatch.setattr(slack_outbox, 'get_dispatcher', lambda: dispatcher)
+    delivered = OutboxDrainer(outbox).drain_once()
+    row = outbox._get_connection().execute("SELECT * FROM slack_outbox").fetchone()
+    return delivered, dict(row), dispatcher
+
+
+def test_success_marks_sent(monkeypatch, outbox):
+    delivered, row, _ = drain_with(monkeypatch, outbox, 200)
+    assert delivered == 1
+    assert row['status'] == 'sent'
+
+
+@pytest.mark.parametrize('status_code', [400, 403, 404])
+def test_permanent_4xx_marks_dead(monkeypatch, outbox, status_code):
+    delivered, row, dispatcher = drain_with(monkeypatch, outbox, status_code)
+    assert delivered == 0
+    assert dispatcher.calls == 1
+    assert row['status'] == 'dead'
+    assert outbox.pending_count() == 0
+    assert outbox.claim_due() == []
+
+
+@pytest.mark.parametrize('status_code', [429, 500, 503, None, ConnectionError('falha de rede')])
+def test_transient_failures_are_rescheduled(monkeypatch, outbox, status_code):
+    delivered, row, _ = drain_with(monkeypatch, outbox, status_code)
+    assert delivered == 0
+    assert row['status'] == 'pending'
+    assert row['attempts'] == 1
+    assert outbox.pending_count() == 1
+
+
+def test_exists_reports_enqueued_keys(outbox):
+    assert outbox.exists('squad/2026-10-17/09:00')
+    assert not outbox.exists('squad/2026-10-17/12:00')
+    assert outbox.enqueue('squad/2026-10-17/09:00', 'https://hooks.slack.test/x', 'mensagem') is False
@@ -3,7 +3,7 @@ import { useOutletContext } from 'react-router-dom';
 import { useAuth } from '@/contexts/AuthContext';
 import { dashboardService } from '@/services/dashboard';
 import { sitesService } from '@/services/sites';
-import type { Site, ProcessingLog } from '@/types';
+import type { Site, ProcessingLog, DashboardSummary, SiteCircuit, ProcessJob } from '@/types';
 import { Modal } from '@/components';
 import {
     Building2,
@@ -15,7 +15,8 @@ import {
     Wallet,
     DollarSign,
     TrendingUp,
-    PieChart
+    PieChart,
+    AlertTriangle
 } from 'lucide-react'; 
 import './Dashboard.css';
 
@@ -30,12 +31,44 @@ interface ParsedSiteData {
     receita: string;
     roas: string;
     mc: string;
-    //receitaNum: number;
-    mcNum: number; //linha nova
-    
+    mcNum: number;
 }
 
 
+const formatMoney = (value: number, prefix: string = 'R$') =>
+    `${prefix} ${value.toLocaleString('pt-BR', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
+
+const formatReceita = (real: number, dolar: number) => {
+    if (real > 0 && dolar > 0) return `${formatMoney(real)} / ${formatMoney(dolar, '$')}`;
+    if (dolar > 0) return formatMoney(dolar, '$');
+    return formatMoney(real);
+};
+
+const formatRoas = (value: number) =>
+    value.toLocaleString('pt-BR', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+
+const hasMetrics = (log: ProcessingLog) => log.investimento != null;
+
+const CIRCUIT_LABELS: Record<SiteCircuit['state'], string> = {
+    closed: 'Instável',
+    open: 'Ignorado',
+    half_open: 'Em teste'
+};
+
+const MAX_LIVE_LOGS = 200;
+
+const isJobRunning = (job: ProcessJob | null) => job?.status === 'queued' || job?.status === 'running';
+
+const formatJobSummary = (job: ProcessJob) => {
+    if (job.status === 'skipped' || job.status === 'error') return job.error || 'Processamento não concluído';
+    const { success = 0, unchanged = 0, skipped = 0, error = 0 } = job.counts;
+    return `Último processamento: ${success} atualizado(s), ${unchanged} sem alteração, ${skipped} ignorado(s), ${error} com erro (${job.elapsed ?? 0}s)`;
+};
+
+const formatEpoch = (seconds: number | null) =>
+    seconds ? new Date(seconds * 1000).toLocaleString('pt-BR', { dateStyle: 'short', timeStyle: 'short' }) : '-';
+
+
 const SQUAD_PALETTE = [
     '#8e44ad', // Roxo
     '#2980b9', // Azul Forte
@@ -58,10 +91,13 @@ export default function Dashboard() {
     const { refreshKey } = useOutletContext<OutletContext>();
     const [sites, setSites] = useState<Site[]>([]);
     const [logs, setLogs] = useState<ProcessingLog[]>([]);
+    const [summary, setSummary] = useState<DashboardSummary | null>(null);
+    const [circuits, setCircuits] = useState<SiteCircuit[]>([]);
     const [isLoading, setIsLoading] = useState(true);
 
     const [selectedLog, setSelectedLog] = useState<ProcessingLog | null>(null);
     const [isProcessing, setIsProcessing] = useState(false);
+    const [activeJob, setActiveJob] = useState<ProcessJob | null>(null);
 
 
     const [sortColumn, setSortColumn] = useState<'created_at' | 'site_name' | 'status' | 'squad' | 'inv' | 'rec' | 'roas' | 'mc'>('created_at');
@@ -94,155 +130,103 @@ export default function Dashboard() {
         loadData();
     }, [refreshKey]);
 
+    useEffect(() => {
+        // Logs, métricas e progresso chegam pelo stream; só o resumo é recarregado ao fim de uma execução.
+        const close = dashboardService.openStream({
+            onLog: (log) => setLogs(prev =>
+                prev.some(l => l.id === log.id) ? prev : [log, ...prev].slice(0, MAX_LIVE_LOGS)
+            ),
+            onMetric: (metric) => setLogs(prev => prev.map(log =>
+                log.site_name === metric.site_name && log.metric_date === metric.metric_date && log.slot === metric.slot
+                    ? { ...log, investimento: metric.investimento, receita_real: metric.receita_real,
+                        receita_dolar: metric.receita_dolar, roas: metric.roas, mc: metric.mc }
+                    : log
+            )),
+            onRun: (run) => {
+                if (run.status !== 'running') refreshSummary();
+            },
+            onJob: (job) => {
+                setActiveJob(job);
+                if (!isJobRunning(job)) refreshSummary();
+            },
+            onReset: () => loadData(),
+        });
+        return close;
+    }, []);
+
+    const refreshSummary = async () => {
+        const [summaryData, circuitsData] = await Promise.all([
+            dashboardService.getSummary(3),
+            dashboardService.getCircuits(),
+        ]);
+        setSummary(summaryData);
+        setCircuits(circuitsData);
+    };
+
     const loadData = async () => {
         setIsLoading(true);
 
-        const [sitesData, logsData] = await Promise.all([
+        const [sitesData, logsData, summaryData, circuitsData] = await Promise.all([
             sitesService.getAll(),
             dashboardService.getLogs(),
+            dashboardService.getSummary(3),
+            dashboardService.getCircuits(),
         ]);
 
         setSites(Array.isArray(sitesData) ? sitesData : []);
         setLogs(Array.isArray(logsData) ? logsData : []);
+        setSummary(summaryData);
+        setCircuits(circuitsData);
         setIsLoading(false);
     };
 
 
-    const top3Faturamento = useMemo(() => {
-        const siteDataMap = new Map<string, ParsedSiteData>();
-
-        logs.forEach(log => {
-
-            if (log.site_name.startsWith('[SQUAD]')) return;
-
-
-            const match = log.message.match(/Inv:\s*([^|]+)\|\s*Rec:\s*([^|]+)\|\s*ROAS:\s*([^|]+)\|\s*MC:\s*(.+)/);
-            if (match) {
-                const siteName = log.site_name;
-                const inv = match[1].trim();
-                const rec = match[2].trim();
-                const roas = match[3].trim();
-                const mc = match[4].trim();
-                
-                //const recNum = parseFloat(rec.replace(/[R$\s.]/g, '').replace(',', '.')) || 0;
-                const mcNum = parseFloat(mc.replace(/[R$\s.]/g, '').replace(',', '.')) || 0; //COM MC 
-                
-
-
-                const site = sites.find(s => s.name === siteName);
-                const squadName = site?.squad_name || 'Sem Squad';
-
-
-                if (!siteDataMap.has(siteName)) {
-                    siteDataMap.set(siteName, {
-                        siteName,
-                        squadName,
-                        investimento: inv,
-                        receita: rec,
-                        roas,
-                        mc,
-                        //receitaNum: recNum
-                        mcNum: mcNum // COM MC 
-                    });
-                }
-            }
-        });
-
-
-        return Array.from(siteDataMap.values())
-            //.sort((a, b) => b.receitaNum - a.receitaNum) 
-            .sort((a, b) => b.mcNum - a.mcNum) //COM MC
-            .slice(0, 3);
-    }, [logs, sites]);
+    const top3Faturamento = useMemo<ParsedSiteData[]>(() => {
+        // A API já devolve os sites ordenados por MC (maior primeiro).
+        return (summary?.top_sites || []).map(site => ({
+            siteName: site.site_name,
+            squadName: site.squad_name || 'Sem Squad',
+            investimento: formatMoney(site.investimento),
+            receita: formatReceita(site.receita_real, site.receita_dolar),
+            roas: site.roas != null ? formatRoas(site.roas) : '-',
+            mc: formatMoney(site.mc),
+            mcNum: site.mc
+        }));
+    }, [summary]);
 
 
     const squadsResumo = useMemo(() => {
-        interface SquadData {
-            squadName: string;
-            totalInv: number;
-            totalRec: number;
-            sitesCount: number;
-        }
-        const squadMap = new Map<string, SquadData>();
-
-        logs.forEach(log => {
-
-            if (log.site_name.startsWith('[SQUAD]')) return;
-
-            const match = log.message.match(/Inv:\s*([^|]+)\|\s*Rec:\s*([^|]+)\|\s*ROAS:\s*([^|]+)\|\s*MC:\s*(.+)/);
-            if (match) {
-                const siteName = log.site_name;
-                const site = sites.find(s => s.name === siteName);
-                const squadName = site?.squad_name || 'Sem Squad';
-
-                const invNum = parseFloat(match[1].replace(/[R$\s.]/g, '').replace(',', '.')) || 0;
-                const recNum = parseFloat(match[2].replace(/[R$\s.]/g, '').replace(',', '.')) || 0;
-
-
-                const existingSquad = squadMap.get(squadName);
-                if (!existingSquad) {
-                    squadMap.set(squadName, {
-                        squadName,
-                        totalInv: invNum,
-                        totalRec: recNum,
-                        sitesCount: 1
-                    });
-                } else {
-
-                    const siteKey = `${squadName}-${siteName}`;
-                    if (!squadMap.has(siteKey)) {
-                        squadMap.set(siteKey, { squadName: siteKey, totalInv: 0, totalRec: 0, sitesCount: 0 }); // Marker
-                        existingSquad.totalInv += invNum;
-                        existingSquad.totalRec += recNum;
-                        existingSquad.sitesCount += 1;
-                    }
-                }
-            }
-        });
-
-
-        const result = Array.from(squadMap.values())
-            .filter(s => !s.squadName.includes('-'))
-            .map(s => ({
-                ...s,
-                roas: s.totalInv > 0 ? (s.totalRec / s.totalInv).toFixed(2) : '0.00',
-                mc: (s.totalRec - s.totalInv).toFixed(2)
-            }))
-            .sort((a, b) => b.totalRec - a.totalRec);
-
-        return result;
-    }, [logs, sites]);
+        return (summary?.squads || []).map(squad => ({
+            squadName: squad.squad_name,
+            totalInv: squad.investimento,
+            totalRec: squad.receita_real + squad.receita_dolar,
+            sitesCount: squad.sites_count,
+            roas: squad.roas.toFixed(2),
+            mc: squad.mc.toFixed(2)
+        }));
+    }, [summary]);
 
 
 
 
     const totalSquads = useMemo(() => {
-        const totalInv = squadsResumo.reduce((acc, curr) => acc + curr.totalInv, 0);
-        const totalRec = squadsResumo.reduce((acc, curr) => acc + curr.totalRec, 0);
-        const totalSites = squadsResumo.reduce((acc, curr) => acc + curr.sitesCount, 0);
-        const roas = totalInv > 0 ? (totalRec / totalInv).toFixed(2) : '0.00';
-        const mc = totalRec - totalInv;
-
+        const totals = summary?.totals;
         return {
-            totalInv,
-            totalRec,
-            totalSites,
-            roas,
-            mc: mc.toFixed(2)
+            totalInv: totals?.investimento ?? 0,
+            totalRec: (totals?.receita_real ?? 0) + (totals?.receita_dolar ?? 0),
+            totalSites: totals?.sites_count ?? 0,
+            roas: (totals?.roas ?? 0).toFixed(2),
+            mc: (totals?.mc ?? 0).toFixed(2)
         };
-    }, [squadsResumo]);
+    }, [summary]);
 
 
-    const parseLogValues = (log: ProcessingLog) => {
-        const match = log.message.match(/Inv:\s*([^|]+)\|\s*Rec:\s*([^|]+)\|\s*ROAS:\s*([^|]+)\|\s*MC:\s*(.+)/);
-        const parseNum = (val: string) => parseFloat(val.replace(/[R$\s.]/g, '').replace(',', '.')) || 0;
-        return {
-            inv: match ? parseNum(match[1]) : 0,
-            rec: match ? parseNum(match[2]) : 0,
-            roas: match ? parseNum(match[3]) : 0,
-            mc: match ? parseNum(match[4]) : 0
-        };
-    };
+    const logValues = (log: ProcessingLog) => ({
+        inv: log.investimento ?? 0,
+        rec: (log.receita_real ?? 0) + (log.receita_dolar ?? 0),
+        roas: log.roas ?? 0,
+        mc: log.mc ?? 0
+    });
 
 
     const sortedLogs = useMemo(() => {
@@ -264,8 +248,8 @@ export default function Dashboard() {
                 valA = (siteA?.squad_name || '').toLowerCase();
                 valB = (siteB?.squad_name || '').toLowerCase();
             } else {
-                const valsA = parseLogValues(a);
-                const valsB = parseLogValues(b);
+                const valsA = logValues(a);
+                const valsB = logValues(b);
                 valA = valsA[sortColumn as 'inv' | 'rec' | 'roas' | 'mc'];
                 valB = valsB[sortColumn as 'inv' | 'rec' | 'roas' | 'mc'];
             }
@@ -285,6 +269,12 @@ export default function Dashboard() {
         }
     };
 
+    const handleResetCircuit = async (siteName: string) => {
+        if (await dashboardService.resetCircuit(siteName)) {
+            setCircuits(prev => prev.filter(c => c.site_name !== siteName));
+        }
+    };
+
     const handleManualProcessingClick = () => {
         setConfirmModalOpen(true);
     };
@@ -292,17 +282,17 @@ export default function Dashboard() {
     const confirmManualProcessing = async () => {
         setConfirmModalOpen(false);
         setIsProcessing(true);
-        const success = await dashboardService.triggerManualProcessing();
+        const job = await dashboardService.triggerManualProcessing();
 
         setIsProcessing(false);
-        if (success) {
+        if (job) {
+            setActiveJob(job);
             setInfoModal({
                 open: true,
                 title: 'Processamento Iniciado',
-                message: 'O processamento foi iniciado em segundo plano. Os logs serão atualizados automaticamente conforme o progresso.',
+                message: 'O processamento foi iniciado em segundo plano. O progresso é exibido no botão de execução e os logs chegam em tempo real.',
                 type: 'success'
             });
-            loadData();
         } else {
             setInfoModal({
                 open: true,
@@ -329,15 +319,26 @@ export default function Dashboard() {
         <section className="section active">
             <div className="dashboard-header-actions" style={{ display: 'flex', justifyContent: 'flex-end', marginBottom: '20px' }}>
                 {user?.role === 'admin' && (
-                    <button
-                        className="btn btn-primary"
-                        onClick={handleManualProcessingClick}
-                        disabled={isProcessing}
-                        style={{ display: 'flex', alignItems: 'center', gap: '8px' }}
-                    >
-                        {isProcessing ? 'Iniciando...' : 'Executar Processamento'}
-                        {!isProcessing && <Play size={16} />}
-                    </button>
+                    <div style={{ display: 'flex', alignItems: 'center', gap: '12px' }}>
+                        {activeJob && !isJobRunning(activeJob) && (
+                            <span style={{ fontSize: '0.85em', color: activeJob.status === 'success' ? '#666' : '#c0392b' }}>
+                                {formatJobSummary(activeJob)}
+                            </span>
+                        )}
+                        <button
+                            className="btn btn-primary"
+                            onClick={handleManualProcessingClick}
+                            disabled={isProcessing || isJobRunning(activeJob)}
+                            style={{ display: 'flex', alignItems: 'center', gap: '8px' }}
+                        >
+                            {isProcessing
+                                ? 'Iniciando...'
+                                : isJobRunning(activeJob)
+                                    ? `Processando ${activeJob?.done ?? 0}/${activeJob?.total ?? 0}`
+                                    : 'Executar Processamento'}
+                            {!isProcessing && !isJobRunning(activeJob) && <Play size={16} />}
+                        </button>
+                    </div>
                 )}
             </div>
 
@@ -374,6 +375,47 @@ export default function Dashboard() {
                 </div>
             </div>
 
+            {/* Sites com falhas recorrentes (circuit breaker) */}
+            {circuits.length > 0 && (
+                <div className="card" style={{ marginTop: '20px', border: '1px solid rgba(231, 76, 60, 0.4)' }}>
+                    <div className="card-header">
+                        <h2><AlertTriangle size={20} style={{ display: 'inline', verticalAlign: 'middle', marginRight: '8px', color: '#e74c3c' }} />Sites com Falha Recorrente</h2>
+                    </div>
+                    <div className="card-body">
+                        <div style={{ display: 'flex', flexDirection: 'column', gap: '8px' }}>
+                            {circuits.map((circuit) => (
+                                <div key={circuit.site_name} style={{
+                                    display: 'flex',
+                                    alignItems: 'center',
+                                    gap: '16px',
+                                    padding: '10px 14px',
+                                    borderRadius: '8px',
+                                    background: 'var(--bg-secondary)',
+                                    fontSize: '0.85em'
+                                }}>
+                                    <strong style={{ minWidth: '160px' }}>{circuit.site_name}</strong>
+                                    <span style={{ color: circuit.state === 'closed' ? '#f39c12' : '#e74c3c', fontWeight: 600, minWidth: '80px' }}>
+                                        {CIRCUIT_LABELS[circuit.state]}
+                                    </span>
+                                    <span style={{ color: 'var(--text-muted)' }}>{circuit.failures} falha{circuit.failures !== 1 ? 's' : ''}</span>
+                                    <span style={{ flex: 1, color: 'var(--text-muted)', overflow: 'hidden', textOverflow: 'ellipsis', whiteSpace: 'nowrap' }} title={circuit.last_error || ''}>
+                                        {circuit.last_error || '-'}
+                                    </span>
+                                    {circuit.state === 'open' && (
+                                        <span style={{ color: 'var(--text-muted)' }}>Próximo teste: {formatEpoch(circuit.retry_at)}</span>
+                                    )}
+                                    {user?.role === 'admin' && (
+                                        <button className="btn btn-secondary btn-sm" onClick={() => handleResetCircuit(circuit.site_name)}>
+                                            Reiniciar
+                                        </button>
+                                    )}
+                                </div>
+                            ))}
+                        </div>
+                    </div>
+                </div>
+            )}
+
             {/* Top 3 Faturamento e Resumo Squads */}
             {(top3Faturamento.length > 0 || squadsResumo.length > 0) && (
                 <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(400px, 1fr))', gap: '20px', marginTop: '20px' }}>
@@ -616,15 +658,14 @@ export default function Dashboard() {
                                         const squadName = site?.squad_name || (log.site_name.startsWith('[SQUAD]') ? log.site_name.replace('[SQUAD] ', '') : '');
 
 
-                                        const match = log.message.match(/Inv:\s*([^|]+)\|\s*Rec:\s*([^|]+)\|\s*ROAS:\s*([^|]+)\|\s*MC:\s*(.+)/);
-                                        const inv = match ? match[1].trim() : '-';
-                                        const rec = match ? match[2].trim() : '-';
-                                        const roas = match ? match[3].trim() : '-';
-                                        const mc = match ? match[4].trim() : '-';
+                                        const withMetrics = hasMetrics(log);
+                                        const inv = withMetrics ? formatMoney(log.investimento ?? 0) : '-';
+                                        const rec = withMetrics ? formatReceita(log.receita_real ?? 0, log.receita_dolar ?? 0) : '-';
+                                        const roas = withMetrics && log.roas != null ? formatRoas(log.roas) : '-';
+                                        const mc = withMetrics ? formatMoney(log.mc ?? 0) : '-';
 
 
                                         const isSquadSummary = log.site_name.startsWith('[SQUAD]');
-                                        const summaryMatch = log.message.match(/ROAS\s*([^,]+),\s*MC\s*(.+)/);
 
                                         return (
                                             <tr
@@ -657,8 +698,8 @@ export default function Dashboard() {
                                                 <td>{isSquadSummary ? '📊 Resumo' : log.site_name}</td>
                                                 <td>{isSquadSummary ? '-' : inv}</td>
                                                 <td style={{ color: '#27ae60', fontWeight: 500 }}>{isSquadSummary ? '-' : rec}</td>
-                                                <td>{isSquadSummary && summaryMatch ? summaryMatch[1].trim() : roas}</td>
-                                                <td>{isSquadSummary && summaryMatch ? summaryMatch[2].trim() : mc}</td>
+                                                <td>{roas}</td>
+                                                <td>{mc}</td>
                                                 <td>
                                                     <span className={`badge badge-${log.status === 'success' ? 'success' : log.status === 'error' ? 'danger' : 'info'}`}>
                                                         {log.status === 'success' ? 'Sucesso' : log.status === 'error' ? 'Erro' : 'Info'}
@@ -1,12 +1,24 @@
 import axios, { type AxiosInstance, type AxiosError, type InternalAxiosRequestConfig } from 'axios';
 
-const API_BASE_URL = import.meta.env.VITE_API_URL || '/api';
+export const API_BASE_URL = import.meta.env.VITE_API_URL || '/api';
 
 
 const TOKEN_KEY = 'carga_slack_token';
 const USER_KEY = 'carga_slack_user';
 
 
+export const getStoredToken = (): string | null => {
+    const tokenRaw = localStorage.getItem(TOKEN_KEY);
+    if (!tokenRaw) return null;
+    try {
+        return JSON.parse(tokenRaw);
+    } catch {
+
+        return tokenRaw;
+    }
+};
+
+
 const api: AxiosInstance = axios.create({
     baseURL: API_BASE_URL,
     headers: {
@@ -17,15 +29,9 @@ const api: AxiosInstance = axios.create({
 
 api.interceptors.request.use(
     (config: InternalAxiosRequestConfig) => {
-        const tokenRaw = localStorage.getItem(TOKEN_KEY);
-        if (tokenRaw) {
-            try {
-                const token = JSON.parse(tokenRaw);
-                config.headers.Authorization = `Bearer ${token}`;
-            } catch {
-
-                config.headers.Authorization = `Bearer ${tokenRaw}`;
-            }
+        const token = getStoredToken();
+        if (token) {
+            config.headers.Authorization = `Bearer ${token}`;
         }
         return config;
     },
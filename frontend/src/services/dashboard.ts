@@ -1,5 +1,16 @@
-import api from './api';
-import type { DashboardStats, ApiResponse } from '@/types';
+import api, { API_BASE_URL } from './api';
+import type { DashboardStats, DashboardMetrics, DashboardSummary, ProcessingLog, SiteCircuit, ProcessJob, StreamMetric, SchedulerRun, ApiResponse } from '@/types';
+
+export interface DashboardStreamHandlers {
+    onLog?: (log: ProcessingLog) => void;
+    onMetric?: (metric: StreamMetric) => void;
+    onRun?: (run: SchedulerRun) => void;
+    onJob?: (job: ProcessJob) => void;
+    onReset?: () => void;
+}
+
+// Espera antes de pedir um novo ticket quando o stream cai (ou a API recusa por limite de conexões).
+const STREAM_RETRY_MS = 5000;
 
 export const dashboardService = {
     async getStats(): Promise<DashboardStats | null> {
@@ -12,9 +23,9 @@ export const dashboardService = {
         }
     },
 
-    async getLogs(limit: number = 50): Promise<any[]> {
+    async getLogs(limit: number = 50): Promise<ProcessingLog[]> {
         try {
-            const response = await api.get<ApiResponse<{ logs: any[] }>>(`/dashboard/logs?limit=${limit}`);
+            const response = await api.get<ApiResponse<{ logs: ProcessingLog[] }>>(`/dashboard/logs?limit=${limit}`);
             return response.data.data?.logs || [];
         } catch (error) {
             console.error('Failed to fetch dashboard logs:', error);
@@ -22,13 +33,126 @@ export const dashboardService = {
         }
     },
 
-    async triggerManualProcessing(): Promise<boolean> {
+    async getMetrics(date?: string): Promise<DashboardMetrics | null> {
+        try {
+            const query = date ? `?date=${date}` : '';
+            const response = await api.get<ApiResponse<DashboardMetrics>>(`/dashboard/metrics${query}`);
+            return response.data.data || null;
+        } catch (error) {
+            console.error('Failed to fetch dashboard metrics:', error);
+            return null;
+        }
+    },
+
+    async getSummary(top: number = 3): Promise<DashboardSummary | null> {
+        try {
+            const response = await api.get<ApiResponse<DashboardSummary>>(`/dashboard/summary?top=${top}`);
+            return response.data.data || null;
+        } catch (error) {
+            console.error('Failed to fetch dashboard summary:', error);
+            return null;
+        }
+    },
+
+    async getCircuits(): Promise<SiteCircuit[]> {
+        try {
+            const response = await api.get<ApiResponse<{ circuits: SiteCircuit[] }>>('/circuits');
+            return response.data.data?.circuits || [];
+        } catch (error) {
+            console.error('Failed to fetch site circuits:', error);
+            return [];
+        }
+    },
+
+    async resetCircuit(siteName: string): Promise<boolean> {
         try {
-            await api.post('/process/manual');
+            await api.post(`/circuits/${encodeURIComponent(siteName)}/reset`);
             return true;
         } catch (error) {
-            console.error('Failed to trigger manual processing:', error);
+            console.error('Failed to reset site circuit:', error);
             return false;
         }
     },
+
+    async triggerManualProcessing(): Promise<ProcessJob | null> {
+        try {
+            const response = await api.post<ApiResponse<{ job: ProcessJob; joined: boolean }>>('/process/manual');
+            return response.data.data?.job || null;
+        } catch (error) {
+            console.error('Failed to trigger manual processing:', error);
+            return null;
+        }
+    },
+
+    async getProcessJob(jobId: string): Promise<ProcessJob | null> {
+        try {
+            const response = await api.get<ApiResponse<{ job: ProcessJob }>>(`/process/jobs/${jobId}`);
+            return response.data.data?.job || null;
+        } catch (error) {
+            console.error('Failed to fetch process job:', error);
+            return null;
+        }
+    },
+
+    /**
+     * Abre o stream SSE do dashboard. O EventSource não envia cabeçalhos, então cada conexão
+     * usa um ticket de uso único pedido com o token (que assim não vai na URL). Como o ticket
+     * não serve para a reconexão automática do navegador, uma queda pede outro ticket e
+     * retoma do último evento recebido (last_id). Retorna a função que fecha o stream.
+     */
+    openStream(handlers: DashboardStreamHandlers): () => void {
+        let source: EventSource | null = null;
+        let lastEventId = '';
+        let closed = false;
+        let retryTimer: ReturnType<typeof setTimeout> | undefined;
+
+        const retry = () => {
+            if (!closed) retryTimer = setTimeout(connect, STREAM_RETRY_MS);
+        };
+
+        const connect = async () => {
+            let ticket: string | undefined;
+            try {
+                const response = await api.post<ApiResponse<{ ticket: string }>>('/dashboard/stream/ticket');
+                ticket = response.data.data?.ticket;
+            } catch (error) {
+                console.error('Failed to open dashboard stream:', error);
+            }
+            if (closed) return;
+            if (!ticket) {
+                retry();
+                return;
+            }
+
+            const resume = lastEventId ? `&last_id=${encodeURIComponent(lastEventId)}` : '';
+            const stream = new EventSource(`${API_BASE_URL}/dashboard/stream?ticket=${encodeURIComponent(ticket)}${resume}`);
+            source = stream;
+            const listen = <T>(event: string, handler?: (data: T) => void) => {
+                stream.addEventListener(event, (e) => {
+                    const message = e as MessageEvent;
+                    if (message.lastEventId) lastEventId = message.lastEventId;
+                    handler?.(JSON.parse(message.data));
+                });
+            };
+
+            listen('ready');
+            listen('log', handlers.onLog);
+            listen('metric', handlers.onMetric);
+            listen('run', handlers.onRun);
+            listen('job', handlers.onJob);
+            listen('reset', handlers.onReset);
+            stream.onerror = () => {
+                stream.close();
+                if (source === stream) source = null;
+                retry();
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retryTimer);
+            source?.close();
+        };
+    },
 };
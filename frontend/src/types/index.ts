@@ -73,10 +73,14 @@ export interface UpdateSiteRequest {
 
 
 export interface DashboardStats {
+    metric_date: string;
     total_sites: number;
     active_sites: number;
+    inactive_sites: number;
     total_users: number;
-    recent_activity: ActivityItem[];
+    sites_with_data: number;
+    last_update: string | null;
+    last_successful_run: { slot: string; trigger_type: 'schedule' | 'catchup'; finished_at: string } | null;
 }
 
 export interface ActivityItem {
@@ -92,4 +96,97 @@ export interface ProcessingLog {
     status: 'success' | 'error' | 'info';
     message: string;
     created_at: string;
+    metric_date?: string | null;
+    slot?: string | null;
+
+    investimento?: number | null;
+    receita_real?: number | null;
+    receita_dolar?: number | null;
+    roas?: number | null;
+    mc?: number | null;
+}
+
+export interface SiteMetrics {
+    site_name: string;
+    squad_name: string | null;
+    metric_date: string;
+    slot: string;
+    investimento: number;
+    receita_real: number;
+    receita_dolar: number;
+    roas: number | null;
+    mc: number;
+}
+
+export interface StreamMetric extends SiteMetrics {
+    id: number;
+}
+
+export interface SchedulerRun {
+    id: number;
+    slot: string;
+    scheduled_for: string;
+    trigger_type: 'schedule' | 'catchup';
+    status: 'running' | 'success' | 'skipped' | 'error';
+    started_at: string | null;
+    finished_at: string | null;
+    error: string | null;
+}
+
+export interface SquadMetrics {
+    squad_name: string;
+    sites_count: number;
+    investimento: number;
+    receita_real: number;
+    receita_dolar: number;
+    roas: number;
+    mc: number;
+}
+
+export interface DashboardMetrics {
+    date: string;
+    sites: SiteMetrics[];
+    squads: SquadMetrics[];
+}
+
+export interface DashboardSummary {
+    date: string;
+    top_sites: SiteMetrics[];
+    squads: SquadMetrics[];
+    totals: Omit<SquadMetrics, 'squad_name'>;
+    last_run: { metric_date: string; slot: string; completed_at: number } | null;
+}
+
+export interface SiteCircuit {
+    site_name: string;
+    state: 'closed' | 'open' | 'half_open';
+    failures: number;
+    opened_at: number | null;
+    last_error: string | null;
+    last_failure_at: number | null;
+    retry_at: number | null;
+}
+
+export interface ProcessJobSite {
+    site_name: string;
+    status: 'pending' | 'success' | 'unchanged' | 'skipped' | 'error';
+    elapsed: number | null;
+    error: string | null;
+    finished_at: number | null;
+}
+
+export interface ProcessJob {
+    id: string;
+    status: 'queued' | 'running' | 'success' | 'skipped' | 'error';
+    requested_by: string | null;
+    slot: string | null;
+    error: string | null;
+    created_at: number;
+    started_at: number | null;
+    finished_at: number | null;
+    elapsed: number | null;
+    total: number;
+    done: number;
+    counts: Record<string, number>;
+    sites?: ProcessJobSite[];
 }